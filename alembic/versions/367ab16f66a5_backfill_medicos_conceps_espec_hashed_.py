@@ -38,6 +38,13 @@ def _get_hasher():
             "Instalá passlib o corregí PYTHONPATH en alembic/env.py."
         ) from e
 
+def _hashear(hash_password, plains):
+    try:
+        from app.services.mantenimiento import hashear_todos  # type: ignore
+    except Exception:
+        return [hash_password(p) for p in plains]
+    return hashear_todos(plains)
+
 def upgrade():
     bind = op.get_bind()
     session = Session(bind=bind)
@@ -95,15 +102,15 @@ def upgrade():
         """)
     ).fetchall()
 
-    updated_pw = 0
-    for (med_id, matricula) in rows:
-        plain = str(matricula).strip()
-        hp = hash_password(plain)
+    # pbkdf2 de 480k rondas: en paralelo en un pool de procesos y UPDATE por lotes (executemany)
+    hashes = _hashear(hash_password, [str(matricula).strip() for (_, matricula) in rows])
+    params = [{"hp": hp, "id": med_id} for (med_id, _), hp in zip(rows, hashes)]
+    for i in range(0, len(params), 1000):
         session.execute(
             sa.text(f"UPDATE {table} SET hashed_password = :hp WHERE ID = :id"),
-            {"hp": hp, "id": med_id},
+            params[i:i + 1000],
         )
-        updated_pw += 1
+    updated_pw = len(params)
 
     session.commit()
     ctx.impl.static_output(f"[hashed_password] actualizados: {updated_pw}")
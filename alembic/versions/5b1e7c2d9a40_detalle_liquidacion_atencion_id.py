@@ -0,0 +1,55 @@
+"""detalle_liquidacion.atencion_id (int indexado) con backfill por lotes
+
+Revision ID: 5b1e7c2d9a40
+Revises: 20251221_add_tipo_to_noticias
+Create Date: 2026-10-17 10:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e7c2d9a40'
+down_revision: Union[str, Sequence[str], None] = '20251221_add_tipo_to_noticias'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHUNK = 20_000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('detalle_liquidacion', sa.Column('atencion_id', sa.Integer(), nullable=True))
+
+    bind = op.get_bind()
+    ctx = op.get_context()
+    lo, hi = bind.execute(sa.text("SELECT MIN(id), MAX(id) FROM detalle_liquidacion")).one()
+
+    # Backfill por rangos de PK: cada UPDATE toca a lo sumo CHUNK filas.
+    # Mismo criterio que debitos._parse_atencion_id: dígitos iniciales de prestacion_id.
+    actualizados = 0
+    if lo is not None:
+        for desde in range(int(lo), int(hi) + 1, CHUNK):
+            res = bind.execute(
+                sa.text("""
+                    UPDATE detalle_liquidacion
+                    SET atencion_id = CAST(REGEXP_SUBSTR(TRIM(prestacion_id), '^[0-9]+') AS UNSIGNED)
+                    WHERE id >= :desde AND id < :hasta
+                      AND atencion_id IS NULL
+                """),
+                {"desde": desde, "hasta": desde + CHUNK},
+            )
+            actualizados += res.rowcount or 0
+    ctx.impl.static_output(f"[detalle_liquidacion.atencion_id] actualizados: {actualizados}")
+
+    # índice al final: más barato que mantenerlo durante el backfill
+    op.create_index('idx_det_atencion', 'detalle_liquidacion', ['atencion_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_det_atencion', table_name='detalle_liquidacion')
+    op.drop_column('detalle_liquidacion', 'atencion_id')
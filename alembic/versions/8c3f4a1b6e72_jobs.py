@@ -0,0 +1,44 @@
+"""tabla jobs (cola de trabajos largos)
+
+Revision ID: 8c3f4a1b6e72
+Revises: 5b1e7c2d9a40
+Create Date: 2026-10-17 11:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c3f4a1b6e72'
+down_revision: Union[str, Sequence[str], None] = '5b1e7c2d9a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('jobs',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('tipo', sa.String(length=50), nullable=False),
+    sa.Column('estado', sa.Enum('pendiente', 'en_curso', 'ok', 'error', name='job_estado'), server_default='pendiente', nullable=False),
+    sa.Column('params', sa.JSON(), nullable=False),
+    sa.Column('resultado', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('progreso_actual', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('progreso_total', sa.Integer(), nullable=True),
+    sa.Column('worker', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_jobs_estado_id', 'jobs', ['estado', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_jobs_estado_id', table_name='jobs')
+    op.drop_table('jobs')
@@ -0,0 +1,36 @@
+"""tabla mantenimiento_checkpoint (backfills reanudables)
+
+Revision ID: a3f9c6e2b814
+Revises: e7a2c5d18f40
+Create Date: 2026-10-17 18:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f9c6e2b814'
+down_revision: Union[str, Sequence[str], None] = 'e7a2c5d18f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('mantenimiento_checkpoint',
+    sa.Column('tarea', sa.String(length=100), nullable=False),
+    sa.Column('ultimo_id', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('procesados', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('actualizados', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('terminado', sa.Boolean(), server_default=sa.text('0'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('tarea')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('mantenimiento_checkpoint')
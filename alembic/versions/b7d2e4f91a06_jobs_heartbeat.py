@@ -0,0 +1,28 @@
+"""jobs.heartbeat_at (detección de workers muertos)
+
+Revision ID: b7d2e4f91a06
+Revises: a3f9c6e2b814
+Create Date: 2026-10-17 21:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4f91a06'
+down_revision: Union[str, Sequence[str], None] = 'a3f9c6e2b814'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs', 'heartbeat_at')
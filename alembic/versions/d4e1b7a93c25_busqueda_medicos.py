@@ -0,0 +1,61 @@
+"""búsqueda de médicos: columnas generadas + FULLTEXT ngram + índices de prefijo
+
+Revision ID: d4e1b7a93c25
+Revises: 8c3f4a1b6e72
+Create Date: 2026-10-17 15:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e1b7a93c25'
+down_revision: Union[str, Sequence[str], None] = '8c3f4a1b6e72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # STORED: MySQL las calcula en cada INSERT/UPDATE (también desde el sistema viejo)
+    op.add_column('listado_medico', sa.Column(
+        'busqueda', sa.String(length=240, collation='utf8_spanish2_ci'),
+        sa.Computed("LOWER(CONCAT_WS(' ', NOMBRE, apellido, nombre_, MAIL_PARTICULAR))", persisted=True),
+        nullable=True,
+    ))
+    op.add_column('listado_medico', sa.Column(
+        'nro_socio_txt', sa.String(length=11, collation='utf8_spanish2_ci'),
+        sa.Computed('CAST(NRO_SOCIO AS CHAR)', persisted=True),
+        nullable=True,
+    ))
+    op.add_column('listado_medico', sa.Column(
+        'matricula_prov_txt', sa.String(length=11, collation='utf8_spanish2_ci'),
+        sa.Computed('CAST(MATRICULA_PROV AS CHAR)', persisted=True),
+        nullable=True,
+    ))
+    op.create_index('idx_medico_nro_socio_txt', 'listado_medico', ['nro_socio_txt'], unique=False)
+    op.create_index('idx_medico_matricula_prov_txt', 'listado_medico', ['matricula_prov_txt'], unique=False)
+    op.create_index('idx_medico_documento', 'listado_medico', ['DOCUMENTO'], unique=False)
+
+    # La lista de stopwords se fija al crear el índice. Con ngram, un bigrama que contiene una
+    # stopword (p.ej. "a", "i") no se indexa: sin desactivarlas "garcia" no se encontraría.
+    op.execute("SET SESSION innodb_ft_enable_stopword = OFF")
+    op.create_index(
+        'ft_medico_busqueda', 'listado_medico', ['busqueda'], unique=False,
+        mysql_prefix='FULLTEXT', mysql_with_parser='ngram',
+    )
+    op.execute("SET SESSION innodb_ft_enable_stopword = ON")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ft_medico_busqueda', table_name='listado_medico')
+    op.drop_index('idx_medico_documento', table_name='listado_medico')
+    op.drop_index('idx_medico_matricula_prov_txt', table_name='listado_medico')
+    op.drop_index('idx_medico_nro_socio_txt', table_name='listado_medico')
+    op.drop_column('listado_medico', 'matricula_prov_txt')
+    op.drop_column('listado_medico', 'nro_socio_txt')
+    op.drop_column('listado_medico', 'busqueda')
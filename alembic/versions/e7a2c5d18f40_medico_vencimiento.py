@@ -0,0 +1,48 @@
+"""tabla medico_vencimiento (vencimientos materializados)
+
+Revision ID: e7a2c5d18f40
+Revises: d4e1b7a93c25
+Create Date: 2026-10-17 16:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a2c5d18f40'
+down_revision: Union[str, Sequence[str], None] = 'd4e1b7a93c25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('medico_vencimiento',
+    sa.Column('medico_id', mysql.INTEGER(display_width=11), nullable=False),
+    sa.Column('tipo', sa.Enum('malapraxis', 'anssal', 'cobertura', name='vencimiento_tipo'), nullable=False),
+    sa.Column('fecha_vencimiento', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['medico_id'], ['listado_medico.ID'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('medico_id', 'tipo')
+    )
+    op.create_index('idx_venc_tipo_fecha', 'medico_vencimiento', ['tipo', 'fecha_vencimiento', 'medico_id'], unique=False)
+
+    # carga inicial (la misma que hace app.services.vencimientos.sincronizar)
+    for tipo, col in (
+        ('malapraxis', 'VENCIMIENTO_MALAPRAXIS'),
+        ('anssal', 'VENCIMIENTO_ANSSAL'),
+        ('cobertura', 'VENCIMIENTO_COBERTURA'),
+    ):
+        op.execute(
+            f"INSERT INTO medico_vencimiento (medico_id, tipo, fecha_vencimiento) "
+            f"SELECT ID, '{tipo}', {col} FROM listado_medico WHERE {col} > '1900-01-01'"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_venc_tipo_fecha', table_name='medico_vencimiento')
+    op.drop_table('medico_vencimiento')
@@ -17,6 +17,8 @@ from app.api.v1.publicidad_medicos import router as publicidades_medico_router
 from app.api.v1.padrones import router as padrones_router
 
 from app.api.v1.rbac import router as rbac_router
+from app.api.v1.jobs import router as jobs_router
+from app.api.v1.sistema import router as sistema_router
 
 
 
@@ -35,6 +37,8 @@ api_router.include_router(debitos_router,     prefix="/debitos_creditos",     ta
 api_router.include_router(descuentos_router,  prefix="/descuentos",  tags=["Descuentos"])
 api_router.include_router(exports_router, prefix="/exports", tags=["exports"])
 api_router.include_router(liquidacion_router, prefix="/liquidacion", tags=["Liquidacion"])
+api_router.include_router(jobs_router, prefix="/jobs", tags=["Jobs"])
+api_router.include_router(sistema_router, prefix="/sistema", tags=["Sistema"])
 api_router.include_router(asignaciones_router,    prefix="/medicos", tags=["Asignaciones Médico"])
 api_router.include_router(periodos_router,    prefix="/periodos", tags=["Periodos"])
 api_router.include_router(rbac_router,    prefix="/admin/rbac", tags=["Rbac"])
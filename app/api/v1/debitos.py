@@ -1,4 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from pathlib import Path
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 from pydantic import BaseModel
 from typing import Optional, Literal
 from decimal import Decimal
@@ -7,11 +11,15 @@ from sqlalchemy import select
 from app.db.database import get_db
 from app.db.models import DetalleLiquidacion, Debito_Credito, GuardarAtencion, Liquidacion
 
-from app.schemas.debitos_creditos_schema import DebCreByDetalleIn, DebCreByDetalleOut, DebCreByDetalleRecalcOut, DebCreResumenOut, DebCreRowOut
-from app.services.liquidaciones import recomputar_totales_de_liquidacion, recomputar_totales_de_resumen
+from app.schemas.debitos_creditos_schema import DebCreByDetalleIn, DebCreByDetalleOut, DebCreByDetalleRecalcOut, DebCreImportOut, DebCreResumenOut, DebCreRowOut
+from app.services.debitos_import import importar_debitos_creditos, leer_filas
+from app.services.liquidaciones import aplicar_delta_dc
 from app.services.liquidaciones_calc import _calc_row_total, _dec
+from app.services.uploads import guardar_upload
 router_dc = APIRouter()
 
+IMPORT_TMP_DIR = Path("uploads") / "tmp" / "debitos_import"
+
 
 def _parse_atencion_id(prestacion_id: str | int) -> int:
     # robusto: " 37591 " -> 37591 ; "37591-XYZ" -> 37591 si sólo hay dígitos al inicio
@@ -35,7 +43,9 @@ async def upsert_by_detalle(
     payload: DebCreByDetalleIn,
     db: AsyncSession = Depends(get_db),
 ):
-    det = await db.get(DetalleLiquidacion, detalle_id)
+    # FOR UPDATE: dos ediciones del mismo detalle se serializan y la segunda calcula su
+    # delta sobre el DC que dejó la primera (si no, ambas parten del mismo `antes`)
+    det = await db.get(DetalleLiquidacion, detalle_id, with_for_update=True)
     if not det:
         raise HTTPException(404, "Detalle de liquidacion no encontrada")
     liq = await db.get(Liquidacion, det.liquidacion_id)
@@ -46,16 +56,21 @@ async def upsert_by_detalle(
 
     tipo_in = (payload.tipo or "").lower()
 
+    # DC actual del detalle (para el delta de totales)
+    dc = (
+        await db.get(Debito_Credito, det.debito_credito_id, with_for_update=True)
+        if det.debito_credito_id else None
+    )
+    antes = (dc.tipo, dc.monto) if dc else None
+
     # Quitar DC
     if tipo_in == "n" or payload.monto <= 0:
-        if det.debito_credito_id:
-            dc = await db.get(Debito_Credito, det.debito_credito_id)
-            if dc:
-                await db.delete(dc)
+        if dc:
+            await db.delete(dc)
         det.debito_credito_id = None
-        await recomputar_totales_de_liquidacion(db, liq.id)
-        await recomputar_totales_de_resumen(db,liq.resumen_id)
-        
+        await db.flush()
+        await aplicar_delta_dc(db, liq, antes, None)
+
         await db.commit()
 
         row_total = await _calc_row_total(db, det, liq)
@@ -81,13 +96,12 @@ async def upsert_by_detalle(
         )
 
     # Upsert DC (igual a lo que ya tenías) --------------------
-    atencion_id = _parse_atencion_id(det.prestacion_id)
+    atencion_id = det.atencion_id if det.atencion_id is not None else _parse_atencion_id(det.prestacion_id)
     guardar_atencion_item = await db.get(GuardarAtencion, atencion_id)
     if not guardar_atencion_item:
         raise HTTPException(404, "Atención (GuardarAtencion) inexistente")
 
     if det.debito_credito_id:
-        dc = await db.get(Debito_Credito, det.debito_credito_id)
         if not dc:
             dc = Debito_Credito(
                 tipo=tipo_in,
@@ -123,9 +137,7 @@ async def upsert_by_detalle(
         await db.flush()
         det.debito_credito_id = dc.id
 
-    await recomputar_totales_de_liquidacion(db, liq.id)
-    await recomputar_totales_de_resumen(db,liq.resumen_id)
-    
+    await aplicar_delta_dc(db, liq, antes, (dc.tipo, dc.monto))
 
     await db.commit()
 
@@ -156,7 +168,7 @@ async def upsert_by_detalle(
 
 @router_dc.delete("/by_detalle/{detalle_id}", response_model=DebCreByDetalleRecalcOut)
 async def delete_by_detalle(detalle_id: int, db: AsyncSession = Depends(get_db)):
-    det = await db.get(DetalleLiquidacion, detalle_id)
+    det = await db.get(DetalleLiquidacion, detalle_id, with_for_update=True)   # ver upsert_by_detalle
     if not det:
         raise HTTPException(404, "Detalle de liquidacion no encontrada")
 
@@ -167,14 +179,16 @@ async def delete_by_detalle(detalle_id: int, db: AsyncSession = Depends(get_db))
     if liq.estado != "A":
         raise HTTPException(409, "La liquidación está cerrada")
 
+    antes = None
     if det.debito_credito_id:
-        dc = await db.get(Debito_Credito, det.debito_credito_id)
+        dc = await db.get(Debito_Credito, det.debito_credito_id, with_for_update=True)
         if dc:
+            antes = (dc.tipo, dc.monto)
             await db.delete(dc)
         det.debito_credito_id = None
+    await db.flush()
 
-    await recomputar_totales_de_liquidacion(db, liq.id)
-    await recomputar_totales_de_resumen(db,liq.resumen_id)
+    await aplicar_delta_dc(db, liq, antes, None)
 
     await db.commit()
 
@@ -199,6 +213,28 @@ async def delete_by_detalle(detalle_id: int, db: AsyncSession = Depends(get_db))
             total_neto=_dec(liq.total_neto),
         ),
     )
+@router_dc.post("/liquidacion/{liquidacion_id}/importar", response_model=DebCreImportOut)
+async def importar_por_liquidacion(
+    liquidacion_id: int,
+    file: UploadFile = File(...),                     # CSV / XLSX / JSON de auditoría
+    created_by_user: Optional[int] = Form(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Carga masiva de débitos/créditos: columnas prestacion_id, tipo (d/c/n), monto, observacion
+    (+ medico_id / detalle_id opcionales). Devuelve aceptación/rechazo por fila.
+    """
+    # a disco por chunks con el límite de uploads (413 si se pasa); se parsea desde ahí
+    saved = await guardar_upload(file, IMPORT_TMP_DIR, f"{uuid4().hex}.upload")
+    try:
+        filas = await asyncio.to_thread(leer_filas, file.filename, file.content_type, saved.ruta)
+    finally:
+        saved.ruta.unlink(missing_ok=True)
+    if not filas:
+        raise HTTPException(400, "El archivo no tiene filas")
+    return await importar_debitos_creditos(db, liquidacion_id, filas, created_by_user=created_by_user)
+
+
 # Alias: POST hace lo mismo que PUT (upsert)
 # @router_dc.post("/by_detalle/{detalle_id}", response_model=DebCreByDetalleOut, status_code=201)
 # async def create_by_detalle(
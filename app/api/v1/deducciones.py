@@ -2,9 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, Body, status
 from pydantic import BaseModel
 from typing import Optional, Literal, List, Dict
 from decimal import Decimal
-from sqlalchemy import select, text, func, case
+import json
+from sqlalchemy import select, text, func, case, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.db.database import get_db
 from app.db.models import (
     Debito_Credito, LiquidacionResumen, Descuentos, DeduccionColegio,
@@ -14,6 +17,8 @@ from app.db.models import (
 
 router = APIRouter()
 
+BULK_CHUNK = 1000
+
 class OverrideValores(BaseModel):
     monto: Optional[Decimal] = None
     porcentaje: Optional[Decimal] = None
@@ -46,6 +51,73 @@ async def _medicos_asociados_a_nro_concepto(db: AsyncSession, nro_concepto: int)
     rows = (await db.execute(sql, {"n": int(nro_concepto)})).all()
     return [int(r[0]) for r in rows]
 
+async def _generar_descuento_en_lote(
+    db: AsyncSession,
+    resumen_id: int,
+    desc_id: int,
+    monto_snap: Decimal,
+    pct_snap: Decimal,
+    med_ids: List[int],
+    base_por_med: dict[int, Decimal],
+) -> tuple[int, int, Decimal]:
+    """
+    Carga el descuento del mes para todos los médicos en lotes:
+      - DeduccionColegio: INSERT ... ON DUPLICATE KEY UPDATE con el snapshot (uq_med_res_desc)
+      - DeduccionSaldo:   INSERT ... ON DUPLICATE KEY UPDATE saldo = saldo + calculado
+    Devuelve (creados, actualizados, total_cargado).
+    """
+    tipo, concepto_id = _tipo_id_for_desc(desc_id)
+    calculados = {
+        med_id: (monto_snap + (base_por_med.get(med_id, Decimal("0")) * pct_snap / Decimal("100"))).quantize(Decimal("0.01"))
+        for med_id in med_ids
+    }
+    if not calculados:
+        return 0, 0, Decimal("0")
+
+    # snapshots ya cargados para este resumen/descuento (sólo para informar altas vs. modificaciones)
+    existentes = set((await db.execute(
+        select(DeduccionColegio.medico_id).where(
+            DeduccionColegio.resumen_id == resumen_id,
+            DeduccionColegio.descuento_id == desc_id,
+            DeduccionColegio.especialidad_id.is_(None),
+        )
+    )).scalars().all())
+
+    items = list(calculados.items())
+    for i in range(0, len(items), BULK_CHUNK):
+        lote = items[i:i + BULK_CHUNK]
+
+        ins = mysql_insert(DeduccionColegio).values([
+            {
+                "medico_id": med_id,
+                "resumen_id": resumen_id,
+                "descuento_id": desc_id,
+                "especialidad_id": None,
+                "monto_aplicado": monto_snap,
+                "porcentaje_aplicado": pct_snap,
+                "calculado_total": calculado,
+            }
+            for med_id, calculado in lote
+        ])
+        await db.execute(ins.on_duplicate_key_update(
+            monto_aplicado=ins.inserted.monto_aplicado,
+            porcentaje_aplicado=ins.inserted.porcentaje_aplicado,
+            calculado_total=ins.inserted.calculado_total,
+        ))
+
+        ins_saldo = mysql_insert(DeduccionSaldo).values([
+            {"medico_id": med_id, "concepto_tipo": tipo, "concepto_id": concepto_id, "saldo": calculado}
+            for med_id, calculado in lote
+        ])
+        await db.execute(ins_saldo.on_duplicate_key_update(
+            saldo=DeduccionSaldo.saldo + ins_saldo.inserted.saldo,
+        ))
+
+    actualizados = sum(1 for med_id in calculados if med_id in existentes)
+    total_cargado = sum(calculados.values(), Decimal("0"))
+    return len(calculados) - actualizados, actualizados, total_cargado
+
+
 @router.post("/{resumen_id}/colegio/bulk_generar_descuento/{desc_id}",
              status_code=status.HTTP_201_CREATED)
 async def bulk_generar_descuento(
@@ -74,58 +146,9 @@ async def bulk_generar_descuento(
       # Base bruta del mes (para %); si no hay actividad, base=0
       base_por_med = await _base_bruto_por_medico_en_resumen(db, resumen_id)
 
-      tipo, concepto_id = _tipo_id_for_desc(desc_id)
-
-      creados, actualizados = 0, 0
-      total_cargado = Decimal("0")
-
-      for med_id in med_ids:
-          base = base_por_med.get(med_id, Decimal("0"))
-          calculado = (monto_snap + (base * pct_snap / Decimal("100"))).quantize(Decimal("0.01"))
-          # Upsert snapshot del mes (DeduccionColegio)
-          row = (await db.execute(
-              select(DeduccionColegio).where(
-                  DeduccionColegio.resumen_id == resumen_id,
-                  DeduccionColegio.medico_id == med_id,
-                  DeduccionColegio.descuento_id == desc_id,
-                  DeduccionColegio.especialidad_id.is_(None),
-              )
-          )).scalars().first()
-          if row:
-              row.monto_aplicado = monto_snap
-              row.porcentaje_aplicado = pct_snap
-              row.calculado_total = calculado
-              actualizados += 1
-          else:
-              db.add(DeduccionColegio(
-                  medico_id=med_id,
-                  resumen_id=resumen_id,
-                  descuento_id=desc_id,
-                  especialidad_id=None,
-                  monto_aplicado=monto_snap,
-                  porcentaje_aplicado=pct_snap,
-                  calculado_total=calculado,
-              ))
-              creados += 1
-          total_cargado += calculado
-          
-          # Upsert saldo (sumar calculado)
-          saldo = (await db.execute(
-              select(DeduccionSaldo).where(
-                  DeduccionSaldo.medico_id == med_id,
-                  DeduccionSaldo.concepto_tipo == tipo,
-                  DeduccionSaldo.concepto_id == concepto_id,
-              ).with_for_update()
-          )).scalars().first()
-          if saldo:
-              saldo.saldo = (Decimal(str(saldo.saldo or 0)) + calculado).quantize(Decimal("0.01"))
-          else:
-              db.add(DeduccionSaldo(
-                  medico_id=med_id,
-                  concepto_tipo=tipo,
-                  concepto_id=concepto_id,
-                  saldo=calculado,
-              ))
+      creados, actualizados, total_cargado = await _generar_descuento_en_lote(
+          db, resumen_id, desc_id, monto_snap, pct_snap, med_ids, base_por_med
+      )
 
       # No tocamos aún total_deduccion del resumen; eso lo hace /aplicar
       return {
@@ -173,73 +196,151 @@ async def _disponible_por_medico_en_resumen(db: AsyncSession, resumen_id: int) -
         out[k] = (bruto_map.get(k, Decimal("0")) - deb_map.get(k, Decimal("0")) + cred_map.get(k, Decimal("0")))
     return out
 
-@router.post("/{resumen_id}/colegio/aplicar")
-async def aplicar_deducciones_resumen(resumen_id: int, db: AsyncSession = Depends(get_db)):
+def _nros_colegio_servicios() -> List[int]:
+    try:
+        with open(settings.SERVICIOS_JSON, encoding="utf-8") as fh:
+            return [int(x["nro_colegio"]) for x in json.load(fh)]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise HTTPException(500, f"No se pudo leer {settings.SERVICIOS_JSON}: {e}")
+
+
+@router.post("/{resumen_id}/colegio/bulk_generar_descuentos",
+             status_code=status.HTTP_201_CREATED)
+async def bulk_generar_descuentos_servicios(resumen_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Genera en una pasada todos los conceptos listados en servicios_json.json, con el
+    precio/porcentaje vigente en `descuentos`. Los conceptos en 0 (sin precio ni %) se omiten.
+    """
+    nros = _nros_colegio_servicios()
     async with db.begin():
-        res = await db.get(LiquidacionResumen, resumen_id)
-        if not res:
-            raise HTTPException(404, "Resumen no encontrado")
+      res = await db.get(LiquidacionResumen, resumen_id)
+      if not res:
+          raise HTTPException(404, "Resumen no encontrado")
 
-        disponible = await _disponible_por_medico_en_resumen(db, resumen_id)  # {med: Decimal}
+      descs = (await db.execute(
+          select(Descuentos).where(Descuentos.nro_colegio.in_(nros)).order_by(Descuentos.id)
+      )).scalars().all()
 
-        aplicados_total = Decimal("0")
-        medicos_afectados = set()
+      base_por_med = await _base_bruto_por_medico_en_resumen(db, resumen_id)
 
-        # Traer TODOS los saldos > 0 para los médicos que tengan algo en este momento
-        rows = (await db.execute(
-            select(DeduccionSaldo).where(DeduccionSaldo.saldo > 0)
-        )).scalars().all()
+      conceptos, omitidos = [], []
+      total_general = Decimal("0")
+      for desc in descs:
+          monto_snap = Decimal(str(desc.precio or 0))
+          pct_snap = Decimal(str(desc.porcentaje or 0))
+          if monto_snap == 0 and pct_snap == 0:
+              omitidos.append(desc.id)
+              continue
+          med_ids = await _medicos_asociados_a_nro_concepto(db, int(desc.nro_colegio))
+          creados, actualizados, total_cargado = await _generar_descuento_en_lote(
+              db, resumen_id, desc.id, monto_snap, pct_snap, med_ids, base_por_med
+          )
+          total_general += total_cargado
+          conceptos.append({
+              "id_aplicado": desc.id,
+              "nro_colegio": desc.nro_colegio,
+              "nombre": desc.nombre,
+              "generados": creados,
+              "actualizados": actualizados,
+              "cargado_total": float(total_cargado),
+          })
+
+      encontrados = {int(d.nro_colegio) for d in descs}
+      return {
+          "resumen_id": resumen_id,
+          "tipo": "descuento",
+          "conceptos": conceptos,
+          "omitidos": omitidos,
+          "no_encontrados": [n for n in nros if n not in encontrados],
+          "cargado_total": float(total_general),
+          "nota": "Se cargó el mes y se actualizó el saldo. Ejecutá /colegio/aplicar para descontar según disponible."
+      }
 
-        # Agrupar por médico y ordenar por saldo desc (maximiza descuento)
-        saldos_by_med: dict[int, List[DeduccionSaldo]] = {}
-        for s in rows:
-            saldos_by_med.setdefault(int(s.medico_id), []).append(s)
-        for med in saldos_by_med:
-            saldos_by_med[med].sort(key=lambda r: Decimal(str(r.saldo or 0)), reverse=True)
 
-        for med_id, sal_list in saldos_by_med.items():
-            disp = Decimal(str(disponible.get(med_id, Decimal("0")) or 0))
+def _asignar_deducciones(
+    disponible: dict[int, Decimal],
+    saldos: List[tuple[int, int, str, int, Decimal]],
+) -> tuple[dict[int, Decimal], dict[tuple[int, str, int], Decimal]]:
+    """
+    Asignación greedy en memoria.
+    saldos: (saldo_id, medico_id, concepto_tipo, concepto_id, saldo) en orden de id.
+    Por médico, los saldos se consumen de mayor a menor (maximiza descuento) hasta agotar
+    lo disponible. Devuelve ({saldo_id: saldo_nuevo}, {(medico, tipo, concepto): aplicado}).
+    """
+    by_med: dict[int, List[tuple[int, int, str, int, Decimal]]] = {}
+    for row in saldos:
+        by_med.setdefault(int(row[1]), []).append(row)
+
+    nuevos: dict[int, Decimal] = {}
+    aplicado: dict[tuple[int, str, int], Decimal] = {}
+    for med_id, sal_list in by_med.items():
+        disp = Decimal(str(disponible.get(med_id, Decimal("0")) or 0))
+        if disp <= 0:
+            continue
+        sal_list.sort(key=lambda r: r[4], reverse=True)
+        for saldo_id, _, tipo, concepto_id, saldo_actual in sal_list:
             if disp <= 0:
+                break
+            if saldo_actual <= 0:
                 continue
+            aplicar = min(disp, saldo_actual)
+            nuevos[saldo_id] = (saldo_actual - aplicar).quantize(Decimal("0.01"))
+            key = (med_id, tipo, concepto_id)
+            aplicado[key] = aplicado.get(key, Decimal("0")) + aplicar
+            disp -= aplicar
+    return nuevos, aplicado
+
 
-            for s in sal_list:
-                if disp <= 0:
-                    break
-                saldo_actual = Decimal(str(s.saldo or 0))
-                if saldo_actual <= 0:
-                    continue
-
-                aplicar = min(disp, saldo_actual)
-                if aplicar <= 0:
-                    continue
-
-                # ↓ saldo
-                s.saldo = (saldo_actual - aplicar).quantize(Decimal("0.01"))
-
-                # Upsert aplicación del mes
-                apl = (await db.execute(
-                    select(DeduccionAplicacion).where(
-                        DeduccionAplicacion.resumen_id == resumen_id,
-                        DeduccionAplicacion.medico_id == med_id,
-                        DeduccionAplicacion.concepto_tipo == s.concepto_tipo,
-                        DeduccionAplicacion.concepto_id == s.concepto_id,
-                    ).with_for_update()
-                )).scalars().first()
-
-                if apl:
-                    apl.aplicado = (Decimal(str(apl.aplicado or 0)) + aplicar).quantize(Decimal("0.01"))
-                else:
-                    db.add(DeduccionAplicacion(
-                        resumen_id=resumen_id,
-                        medico_id=med_id,
-                        concepto_tipo=s.concepto_tipo,
-                        concepto_id=s.concepto_id,
-                        aplicado=aplicar,
-                    ))
-
-                disp -= aplicar
-                aplicados_total += aplicar
-                medicos_afectados.add(med_id)
+@router.post("/{resumen_id}/colegio/aplicar")
+async def aplicar_deducciones_resumen(resumen_id: int, db: AsyncSession = Depends(get_db)):
+    async with db.begin():
+        res = await db.get(LiquidacionResumen, resumen_id)
+        if not res:
+            raise HTTPException(404, "Resumen no encontrado")
+
+        disponible = await _disponible_por_medico_en_resumen(db, resumen_id)  # {med: Decimal}
+        medicos = sorted(m for m, d in disponible.items() if d > 0)
+
+        # Saldos > 0 sólo de los médicos con disponible en este resumen (bloqueados: una pasada por lote)
+        saldos: List[tuple[int, int, str, int, Decimal]] = []
+        for i in range(0, len(medicos), 1000):
+            q = await db.execute(
+                select(
+                    DeduccionSaldo.id, DeduccionSaldo.medico_id,
+                    DeduccionSaldo.concepto_tipo, DeduccionSaldo.concepto_id, DeduccionSaldo.saldo,
+                )
+                .where(DeduccionSaldo.saldo > 0, DeduccionSaldo.medico_id.in_(medicos[i:i + 1000]))
+                .order_by(DeduccionSaldo.id)
+                .with_for_update()
+            )
+            saldos.extend((r[0], int(r[1]), r[2], int(r[3]), Decimal(str(r[4] or 0))) for r in q)
+
+        nuevos_saldos, aplicado = _asignar_deducciones(disponible, saldos)
+        aplicados_total = sum(aplicado.values(), Decimal("0"))
+        medicos_afectados = {med for med, _, _ in aplicado}
+
+        # ↓ saldos: UPDATE por PK en lote
+        if nuevos_saldos:
+            await db.execute(
+                update(DeduccionSaldo),
+                [{"id": sid, "saldo": saldo} for sid, saldo in nuevos_saldos.items()],
+            )
+
+        # Aplicaciones del mes: un único INSERT ... ON DUPLICATE KEY UPDATE aplicado = aplicado + nuevo
+        if aplicado:
+            ins = mysql_insert(DeduccionAplicacion).values([
+                {
+                    "resumen_id": resumen_id,
+                    "medico_id": med_id,
+                    "concepto_tipo": tipo,
+                    "concepto_id": concepto_id,
+                    "aplicado": monto.quantize(Decimal("0.01")),
+                }
+                for (med_id, tipo, concepto_id), monto in aplicado.items()
+            ])
+            await db.execute(ins.on_duplicate_key_update(
+                aplicado=DeduccionAplicacion.aplicado + ins.inserted.aplicado,
+            ))
 
         # Recalcular total_deduccion del resumen = Σ aplicado del mes
         qsum = await db.execute(
@@ -1,18 +1,35 @@
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from io import BytesIO
+import os
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
-from typing import Any, Dict, List, Optional
+from typing import IO, Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from fastapi import Body
 from datetime import datetime
-from app.services.exports import build_excel_from_liquidacion
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_read_db, sesion_streaming
+from app.db.models import Liquidacion
+from app.services import exports_cache
+from app.services.exports import (
+    build_excel_from_liquidacion, build_excel_from_liquidacion_spooled, csv_spooled_async, iter_archivo, iter_csv,
+    parquet_spooled_async, xlsx_spooled_async,
+)
+from app.services.exports_db import (
+    HOJAS, TIPOS_COLUMNAS, elegir_hoja, hojas_liquidacion_db, hojas_resumen_db, liquidaciones_de_resumen,
+)
 
 router = APIRouter()
 
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+HOJA_QUERY = Query("prestaciones", description="resumen | detalle_por_medico | prestaciones")
+
 @router.post("/exportar_excel_for_liquidacion", summary="Exportar Excel desde Liquidación",
     description="Recibe un JSON de liquidación y devuelve un archivo Excel con Resumen")
 async def exportar_excel_desde_json(
-    data: Dict[str, Any] = Body(..., description="JSON de liquidación")
+    data: Dict[str, Any] = Body(..., description="JSON de liquidación"),
+    stream: bool = Query(True, description="write_only + archivo temporal, enviado en bloques"),
 ):
     """
     Recibe el JSON de la liquidación y devuelve un archivo Excel con:
@@ -20,14 +37,191 @@ async def exportar_excel_desde_json(
     - 'Detalle por médico'
     - 'Prestaciones'
     """
+    filename = f"liquidacion_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
     try:
-        content = build_excel_from_liquidacion(data)
+        if stream:
+            # armado fuera del event loop: CPU + disco
+            fh = await run_in_threadpool(build_excel_from_liquidacion_spooled, data)
+        else:
+            fh = BytesIO(build_excel_from_liquidacion(data))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"No se pudo generar el Excel: {e}")
 
-    filename = f"liquidacion_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
     return StreamingResponse(
-        BytesIO(content),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        iter_archivo(fh),
+        media_type=XLSX_MEDIA_TYPE,
         headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-    )
\ No newline at end of file
+    )
+
+
+MEDIA_TYPES = {
+    "xlsx": XLSX_MEDIA_TYPE,
+    "csv": "text/csv; charset=utf-8",
+    "csv.gz": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _archivo_response(fh, media_type: str, filename: str, extra: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    headers.update(extra or {})
+    return StreamingResponse(iter_archivo(fh), media_type=media_type, headers=headers)
+
+
+def _validar_hoja(hoja: str) -> None:
+    if hoja not in HOJAS:
+        raise HTTPException(status_code=400, detail=f"Hoja inválida; opciones: {', '.join(HOJAS)}")
+
+
+async def _generar(formato: str, hojas: list, hoja: Optional[str]) -> IO[bytes]:
+    if formato == "xlsx":
+        return await xlsx_spooled_async(hojas)
+    _, encabezado, filas = elegir_hoja(hojas, hoja)
+    if formato == "parquet":
+        try:
+            return await parquet_spooled_async(encabezado, filas, TIPOS_COLUMNAS)
+        except RuntimeError as e:   # pyarrow no instalado
+            raise HTTPException(status_code=501, detail=str(e))
+    return await csv_spooled_async(encabezado, filas, comprimir=(formato == "csv.gz"))
+
+
+async def _con_cache(
+    request: Request,
+    entrada: Optional[exports_cache.EntradaCache],
+    generar: Callable[[], Awaitable[IO[bytes]]],
+    media_type: str,
+    filename: str,
+) -> Response:
+    """Sirve desde el caché de disco si la exportación es cacheable (liquidaciones cerradas)."""
+    if entrada is None:
+        return _archivo_response(await generar(), media_type, filename)
+
+    cache_headers = {"ETag": entrada.etag_header, "Cache-Control": "private, no-cache"}
+    if exports_cache.coincide_etag(entrada, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=cache_headers)
+
+    path = await run_in_threadpool(exports_cache.obtener, entrada)
+    try:
+        # se abre ya: si el LRU lo borra mientras se envía, el descriptor sigue siendo válido
+        fh = open(path, "rb") if path else None
+    except FileNotFoundError:
+        fh = None
+    if fh is None:
+        nuevo = await generar()
+        try:
+            path = await run_in_threadpool(exports_cache.guardar, entrada, nuevo)
+        finally:
+            nuevo.close()
+        fh = open(path, "rb")
+    cache_headers["Content-Length"] = str(os.fstat(fh.fileno()).st_size)
+    return _archivo_response(fh, media_type, filename, cache_headers)
+
+
+def _nombre_archivo(nombre: str, formato: str, hoja: Optional[str]) -> str:
+    return f"{nombre}.{formato}" if formato == "xlsx" else f"{nombre}_{hoja}.{formato}"
+
+
+async def _exportar_liquidacion(
+    request: Request, db: AsyncSession, liquidacion_id: int, formato: str, hoja: Optional[str] = None,
+) -> Response:
+    nombre, hojas = await hojas_liquidacion_db(db, liquidacion_id)   # 404 antes de emitir nada
+    liq = await db.get(Liquidacion, liquidacion_id)                  # identity map: sin consulta
+    entrada = exports_cache.entrada_liquidacion(liq, formato, hoja)
+    if entrada is None and formato.startswith("csv"):
+        # abierta: CSV directo del cursor, sin pasar por disco
+        return _csv_response(lambda s: hojas_liquidacion_db(s, liquidacion_id), nombre, hoja, formato == "csv.gz")
+    return await _con_cache(
+        request, entrada, lambda: _generar(formato, hojas, hoja),
+        MEDIA_TYPES[formato], _nombre_archivo(nombre, formato, hoja),
+    )
+
+
+async def _exportar_resumen(
+    request: Request, db: AsyncSession, resumen_id: int, formato: str, hoja: Optional[str] = None,
+) -> Response:
+    nombre, hojas = await hojas_resumen_db(db, resumen_id)
+    entrada = exports_cache.entrada_resumen(resumen_id, await liquidaciones_de_resumen(db, resumen_id), formato, hoja)
+    if entrada is None and formato.startswith("csv"):
+        return _csv_response(lambda s: hojas_resumen_db(s, resumen_id), nombre, hoja, formato == "csv.gz")
+    return await _con_cache(
+        request, entrada, lambda: _generar(formato, hojas, hoja),
+        MEDIA_TYPES[formato], _nombre_archivo(nombre, formato, hoja),
+    )
+
+
+@router.get("/liquidacion/{liquidacion_id}.xlsx", summary="Exportar Excel de una liquidación (desde la base)")
+async def exportar_excel_liquidacion(liquidacion_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
+    """Hojas 'Resumen', 'Detalle por médico' y 'Prestaciones', leídas con cursor del servidor."""
+    return await _exportar_liquidacion(request, db, liquidacion_id, "xlsx")
+
+
+@router.get("/resumen/{resumen_id}.xlsx", summary="Exportar Excel de un resumen (desde la base)")
+async def exportar_excel_resumen(resumen_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
+    """Todas las liquidaciones del resumen; 'Prestaciones' agrega obra social, período y nro."""
+    return await _exportar_resumen(request, db, resumen_id, "xlsx")
+
+
+# ---- CSV / Parquet: una hoja (tabla plana) por archivo ----
+CargarHojas = Callable[[AsyncSession], Awaitable[Tuple[str, list]]]
+
+
+def _csv_response(cargar: CargarHojas, nombre: str, hoja: str, comprimir: bool) -> StreamingResponse:
+    async def gen():
+        async with sesion_streaming() as db:
+            _, hojas = await cargar(db)
+            _, encabezado, filas = elegir_hoja(hojas, hoja)
+            async for chunk in iter_csv(encabezado, filas, comprimir=comprimir):
+                yield chunk
+
+    formato = "csv.gz" if comprimir else "csv"
+    return StreamingResponse(
+        gen(),
+        media_type=MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{_nombre_archivo(nombre, formato, hoja)}"'}
+    )
+
+
+@router.get("/liquidacion/{liquidacion_id}.csv", summary="Exportar una hoja de la liquidación como CSV")
+async def exportar_csv_liquidacion(
+    liquidacion_id: int,
+    request: Request,
+    hoja: str = HOJA_QUERY,
+    gzip: bool = Query(False, description="Comprimir (csv.gz)"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    _validar_hoja(hoja)
+    return await _exportar_liquidacion(request, db, liquidacion_id, "csv.gz" if gzip else "csv", hoja)
+
+
+@router.get("/resumen/{resumen_id}.csv", summary="Exportar una hoja del resumen como CSV")
+async def exportar_csv_resumen(
+    resumen_id: int,
+    request: Request,
+    hoja: str = HOJA_QUERY,
+    gzip: bool = Query(False, description="Comprimir (csv.gz)"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    _validar_hoja(hoja)
+    return await _exportar_resumen(request, db, resumen_id, "csv.gz" if gzip else "csv", hoja)
+
+
+@router.get("/liquidacion/{liquidacion_id}.parquet", summary="Exportar una hoja de la liquidación como Parquet")
+async def exportar_parquet_liquidacion(
+    liquidacion_id: int,
+    request: Request,
+    hoja: str = HOJA_QUERY,
+    db: AsyncSession = Depends(get_read_db),
+):
+    _validar_hoja(hoja)
+    return await _exportar_liquidacion(request, db, liquidacion_id, "parquet", hoja)
+
+
+@router.get("/resumen/{resumen_id}.parquet", summary="Exportar una hoja del resumen como Parquet")
+async def exportar_parquet_resumen(
+    resumen_id: int,
+    request: Request,
+    hoja: str = HOJA_QUERY,
+    db: AsyncSession = Depends(get_read_db),
+):
+    _validar_hoja(hoja)
+    return await _exportar_resumen(request, db, resumen_id, "parquet", hoja)
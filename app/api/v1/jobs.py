@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import get_db
+from app.db.models import Job, LiquidacionResumen
+from app.schemas.jobs_schema import JobEnqueued, JobRead
+from app.schemas.liquidaciones_schema import LiquidacionCreate, RefacturarPayload
+from app.services.jobs import encolar_job
+
+router = APIRouter()
+
+
+@router.post("/liquidaciones/crear", response_model=JobEnqueued, status_code=202)
+async def encolar_crear_liquidacion(payload: LiquidacionCreate, db: AsyncSession = Depends(get_db)):
+    exists_res = await db.execute(
+        select(LiquidacionResumen.id).where(LiquidacionResumen.id == payload.resumen_id).limit(1)
+    )
+    if not exists_res.first():
+        raise HTTPException(400, "resumen_id inválido")
+    job = await encolar_job(db, "crear_liquidacion", payload.model_dump())
+    return JobEnqueued(job_id=job.id, estado=job.estado)
+
+
+@router.post("/liquidaciones/{liquidacion_id}/cerrar", response_model=JobEnqueued, status_code=202)
+async def encolar_cerrar_liquidacion(liquidacion_id: int, db: AsyncSession = Depends(get_db)):
+    job = await encolar_job(db, "cerrar_liquidacion", {"liquidacion_id": liquidacion_id})
+    return JobEnqueued(job_id=job.id, estado=job.estado)
+
+
+@router.post("/liquidaciones/{liquidacion_id}/refacturar", response_model=JobEnqueued, status_code=202)
+async def encolar_refacturar_liquidacion(liquidacion_id: int, payload: RefacturarPayload, db: AsyncSession = Depends(get_db)):
+    job = await encolar_job(
+        db, "refacturar_liquidacion",
+        {"liquidacion_id": liquidacion_id, "nro_liquidacion": payload.nro_liquidacion},
+    )
+    return JobEnqueued(job_id=job.id, estado=job.estado)
+
+
+@router.get("/{job_id}", response_model=JobRead)
+async def obtener_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(404, "Job no encontrado")
+    return job
@@ -1,10 +1,12 @@
 from decimal import Decimal
+import json
 
-from fastapi.responses import JSONResponse
-from app.services.liquidaciones import now_string, reabrir_liquidacion_creando_version, reabrir_liquidacion_simple, recomputar_todo_de_liquidacion, recomputar_totales_de_liquidacion, recomputar_totales_de_resumen
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.services.liquidaciones import cerrar_liquidacion, crear_liquidacion_con_detalles, generar_liquidaciones_resumen, now_string, reconciliar_totales, reabrir_liquidacion_creando_version, reabrir_liquidacion_simple, recomputar_todo_de_liquidacion, recomputar_totales_de_liquidacion, recomputar_totales_de_resumen
 from app.services.liquidaciones_calc import (
     calcular_version_y_formatear_nro,
     construir_detalles_y_totales,
+    stream_vista_detalles_liquidacion,
     vista_detalles_liquidacion
     )
 
@@ -12,7 +14,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Path, Response
 from pydantic import BaseModel, Field
 from typing import Any, List, Dict, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db, sesion_streaming
 # from app.services.liquidaciones import generar_preview, normalizar_periodo_flexible
 from sqlalchemy import select, update, delete, and_
 from sqlalchemy.exc import IntegrityError
@@ -20,7 +22,7 @@ from sqlalchemy.orm import selectinload
 from app.db.models import Debito_Credito, DetalleLiquidacion, LiquidacionResumen, Liquidacion, GuardarAtencion
 # from app.utils.main import normalizar_periodo
 from app.schemas.liquidaciones_schema import (
-    DetalleLiquidacionRead, DetalleVistaRow, LiquidacionResumenCreate, LiquidacionResumenUpdate, LiquidacionResumenRead, LiquidacionResumenWithItems,
+    DetalleLiquidacionRead, DetalleVistaRow, GenerarLiquidacionItem, LiquidacionResumenCreate, LiquidacionResumenUpdate, LiquidacionResumenRead, LiquidacionResumenWithItems,
     LiquidacionCreate, LiquidacionUpdate, LiquidacionRead, PreviewItem, PreviewResponse, RefacturarPayload,
 )
 import datetime as dt
@@ -35,6 +37,11 @@ class GenerarReq(BaseModel):
         ...,
         description="Mapa de obra social -> lista de periodos 'YYYY-MM'"
     )
+class GenerarLiquidacionesReq(GenerarReq):
+    resumen_id: int
+    # opcional: nro base por OS; si falta se toma NRO_FACT_1-NRO_FACT_2 del período
+    nros_liquidacion: Dict[int, str] = Field(default_factory=dict)
+
 # @router.post("/generar")
 # async def generar(req: GenerarReq, db: AsyncSession = Depends(get_db)) -> Any:
 #     salida = await generar_preview(db, req.obra_sociales_con_periodos)
@@ -203,6 +210,20 @@ async def preview_liquidaciones(resumen_id: int, db: AsyncSession = Depends(get_
         }
     }
 
+@router.get("/resumen/{resumen_id}/reconciliar")
+async def reconciliar_resumen(resumen_id: int, db: AsyncSession = Depends(get_db)):
+    # Los totales se mantienen por delta; esto re-agrega desde cero y reporta diferencias.
+    # Sólo lectura: la corrección es el POST.
+    return await reconciliar_totales(db, resumen_id, corregir=False)
+
+@router.post("/resumen/{resumen_id}/reconciliar")
+async def corregir_totales_resumen(resumen_id: int, db: AsyncSession = Depends(get_db)):
+    """Como el GET, pero si hay deriva pisa los totales guardados con los re-agregados."""
+    out = await reconciliar_totales(db, resumen_id, corregir=True)
+    if out["corregido"]:
+        await db.commit()
+    return out
+
 @router.post("/resumen/next", response_model=LiquidacionResumenRead, status_code=201)
 async def crear_resumen_siguiente(db: AsyncSession = Depends(get_db)):
     # 1) obtener el último (año desc, mes desc)
@@ -295,34 +316,38 @@ async def crear_liquidacion(payload: LiquidacionCreate, db: AsyncSession = Depen
     if not exists_res.first():
         raise HTTPException(400, "resumen_id inválido")
 
-    # calcular versión y formatear nro_liquidacion
-    version, nro_fmt = await calcular_version_y_formatear_nro(
-        db, payload.obra_social_id, payload.anio_periodo, payload.mes_periodo, payload.nro_liquidacion
-    )
-
-    obj = Liquidacion(
+    return await crear_liquidacion_con_detalles(
+        db,
         resumen_id=payload.resumen_id,
         obra_social_id=payload.obra_social_id,
-        mes_periodo=payload.mes_periodo,
         anio_periodo=payload.anio_periodo,
-        version=version,
-        nro_liquidacion=nro_fmt,
-        total_bruto=Decimal("0"),
-        total_debitos=Decimal("0"),
-        total_neto=Decimal("0"),
+        mes_periodo=payload.mes_periodo,
+        nro_liquidacion=payload.nro_liquidacion,
     )
-    db.add(obj)
-    await db.flush()  # para obtener obj.id
 
-    # construir detalles + actualizar totales
-    await construir_detalles_y_totales(db, obj.id)
-    await recomputar_totales_de_liquidacion(db, obj.id)
-    await recomputar_totales_de_resumen(db,obj.resumen_id)
 
-    await db.commit()
-    await db.refresh(obj)
-    return obj
+@router.post("/liquidaciones_por_os/crear_lote", response_model=List[GenerarLiquidacionItem], status_code=201)
+async def crear_liquidaciones_lote(
+    payload: GenerarLiquidacionesReq,
+    max_concurrencia: int = Query(4, ge=1, le=8),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Cierre mensual: crea las liquidaciones de todas las OS del pedido en paralelo
+    (una sesión por OS) y recalcula el resumen una sola vez al final.
+    """
+    exists_res = await db.execute(
+        select(LiquidacionResumen.id).where(LiquidacionResumen.id == payload.resumen_id).limit(1)
+    )
+    if not exists_res.first():
+        raise HTTPException(400, "resumen_id inválido")
 
+    return await generar_liquidaciones_resumen(
+        payload.resumen_id,
+        payload.obra_sociales_con_periodos,
+        payload.nros_liquidacion,
+        max_concurrencia=max_concurrencia,
+    )
 
 @router.put("/liquidaciones_por_os/{liquidacion_id}", response_model=LiquidacionRead)
 async def editar_liquidacion(liquidacion_id: int, payload: LiquidacionUpdate, db: AsyncSession = Depends(get_db)):
@@ -402,21 +427,46 @@ async def listar_detalles_liquidacion(
 async def detalles_vista(
     liquidacion_id: int,
     medico_id: Optional[int] = Query(None),
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[int] = Query(None, ge=0, description="Último det_id recibido; devuelve los siguientes"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Tamaño de página (sin límite si se omite)"),
+    db: AsyncSession = Depends(get_read_db),
     response: Response = None,
 ):
     items, total = await vista_detalles_liquidacion(
         db=db,
         liquidacion_id=liquidacion_id,
         medico_id=medico_id,
+        cursor=cursor,
+        limit=limit,
     )
 
     # Headers útiles para el front (opcional mantenerlos)
     response.headers["X-Total-Count"] = str(total)
-    response.headers["Content-Range"] = f"items 0-{max(total-1,0)}/{total}"
+    if cursor is None:
+        response.headers["Content-Range"] = f"items 0-{max(len(items)-1,0)}/{total}"
+    if limit is not None:
+        response.headers["X-Limit"] = str(limit)
+        if len(items) == limit:
+            response.headers["X-Next-Cursor"] = str(items[-1]["det_id"])
 
     return items
 
+@router.get("/liquidaciones_por_os/{liquidacion_id}/detalles_vista/stream")
+async def detalles_vista_stream(
+    liquidacion_id: int,
+    medico_id: Optional[int] = Query(None),
+):
+    """
+    Mismas filas que /detalles_vista, en NDJSON (una fila JSON por línea) leídas con
+    cursor del lado del servidor: la memoria no crece con el tamaño de la liquidación.
+    """
+    async def gen():
+        async with sesion_streaming() as db:
+            async for fila in stream_vista_detalles_liquidacion(db, liquidacion_id, medico_id):
+                yield json.dumps(fila, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(gen(), media_type="application/x-ndjson")
+
 # ---- Débitos/Créditos listado con filtros ----
 @router.get("/debitos_creditos")
 async def listar_debitos_creditos(
@@ -445,19 +495,7 @@ async def cerrar_liquidacion_endpoint(
     liquidacion_id: int,
     db: AsyncSession = Depends(get_db),
 ):
-    liq = await db.get(Liquidacion, liquidacion_id)
-    if not liq:
-        raise HTTPException(404, "Liquidación no encontrada")
-    if liq.estado == "C":
-        raise HTTPException(409, "La liquidación ya está cerrada")
-
-    # 1) calcular pagados detalle por detalle con la lógica nueva
-    await recomputar_todo_de_liquidacion(db, liquidacion_id)
-
-    # 2) sellar estado
-    liq.estado = "C"
-    liq.cierre_timestamp = now_string()
-    await db.commit()
+    await cerrar_liquidacion(db, liquidacion_id)
     return None
 
 @router.post("/liquidaciones_por_os/{liquidacion_id}/reabrir", response_model=LiquidacionRead, status_code=200)
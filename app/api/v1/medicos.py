@@ -1,8 +1,8 @@
+import base64
 from collections import defaultdict
 from datetime import date, datetime,timedelta
 from decimal import Decimal
 import json
-from operator import and_
 import os
 from pathlib import Path
 import re
@@ -16,11 +16,12 @@ from app.utils.main import (
 )
 
 from typing import Any, DefaultDict, Literal, Optional, Dict, List
-from fastapi import APIRouter, Body, Depends, File, Form, Query, HTTPException, Request, UploadFile, status
+from fastapi import APIRouter, Body, Depends, File, Form, Query, HTTPException, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import case, delete, desc, func, literal, select, or_, cast, String, Integer, update
+from sqlalchemy import and_, case, delete, desc, func, literal, select, or_, cast, String, Integer, update
 from app.core.passwords import hash_password
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db, sesion_streaming
 from app.db.models import (
     DeduccionColegio, Descuentos, DetalleLiquidacion, Documento, Especialidad, Liquidacion, ListadoMedico,
     DeduccionSaldo, DeduccionAplicacion, LiquidacionResumen, SolicitudRegistro
@@ -35,6 +36,11 @@ from app.services.email import send_email_resend
 from app.core.config import settings
 from app.utils.main import _parse_date
 from app.services.medicos_register_service import create_medico_and_solicitud, save_medico_admin_draft
+from app.services import medicos_autocomplete
+from app.services.medicos_busqueda import condicion_busqueda
+from app.services.exports import iter_csv
+from app.services import vencimientos
+from app.services.uploads import guardar_upload
 
 router = APIRouter()
 
@@ -207,67 +213,62 @@ MEDICO_EXACT_STRING_FIELDS = {
     dependencies=[Depends(require_scope("medicos:leer"))],
 )
 async def listar_medicos(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     q: Optional[str] = Query(None, description="Buscar por nombre, nro socio o matrículas"),
     estado: Literal["todos", "activos", "inactivos"] = Query("todos"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
 ):
-    # fecha ingreso como texto normalizado
-    fecha_str = func.nullif(
-        func.date_format(ListadoMedico.FECHA_INGRESO, "%Y-%m-%d"),
-        "0000-00-00"
-    ).label("fecha_ingreso")
-
-    # documento como texto
-    doc_str = cast(ListadoMedico.DOCUMENTO, String).label("documento")
-
-    # booleano "activo" calculado en SQL (TRIM + UPPER para datos legacy)
-    activo_expr = case(
-        (func.upper(func.trim(ListadoMedico.EXISTE)) == literal("S"), literal(1)),
-        else_=literal(0),
-    ).label("activo")
-    nro_expr = func.nullif(ListadoMedico.NRO_SOCIO, 0).label("nro_socio")
-    # opcional: traer también el valor crudo por si lo querés ver
-    existe_raw = func.trim(ListadoMedico.EXISTE).label("existe")
-
-    stmt = (
-        select(
-            ListadoMedico.ID.label("id"),
-            nro_expr,
-            ListadoMedico.NOMBRE.label("nombre"),
-            ListadoMedico.MATRICULA_PROV.label("matricula_prov"),
-            doc_str,
-            ListadoMedico.MAIL_PARTICULAR.label("mail_particular"),
-            ListadoMedico.TELE_PARTICULAR.label("tele_particular"),
-            fecha_str,
-            activo_expr,
-            existe_raw,
-        )
-        .order_by(ListadoMedico.NOMBRE.asc())
-        .offset(skip)
-        .limit(limit)
-    )
-
-    if estado == "activos":
-        stmt = stmt.where(func.upper(func.trim(ListadoMedico.EXISTE)) == "S")
-    elif estado == "inactivos":
-        stmt = stmt.where(func.upper(func.trim(ListadoMedico.EXISTE)) != "S")
-    # "todos" => sin filtro
-
-    if q:
-        pattern = f"%{q}%"
-        stmt = stmt.where(
-            or_(
-                ListadoMedico.NOMBRE.ilike(pattern),
-                cast(ListadoMedico.NRO_SOCIO, String).ilike(pattern),
-                cast(ListadoMedico.MATRICULA_PROV, String).ilike(pattern),
-                cast(ListadoMedico.DOCUMENTO, String).ilike(pattern),
-                cast(ListadoMedico.MAIL_PARTICULAR, String).ilike(pattern),
+    # type-ahead: índice en memoria; None si no está fresco -> a la base
+    rows = medicos_autocomplete.buscar(q, estado=estado, skip=skip, limit=limit) if q else None
+    if rows is None:
+        # fecha ingreso como texto normalizado
+        fecha_str = func.nullif(
+            func.date_format(ListadoMedico.FECHA_INGRESO, "%Y-%m-%d"),
+            "0000-00-00"
+        ).label("fecha_ingreso")
+
+        # documento como texto
+        doc_str = cast(ListadoMedico.DOCUMENTO, String).label("documento")
+
+        # booleano "activo" calculado en SQL (TRIM + UPPER para datos legacy)
+        activo_expr = case(
+            (func.upper(func.trim(ListadoMedico.EXISTE)) == literal("S"), literal(1)),
+            else_=literal(0),
+        ).label("activo")
+        nro_expr = func.nullif(ListadoMedico.NRO_SOCIO, 0).label("nro_socio")
+        # opcional: traer también el valor crudo por si lo querés ver
+        existe_raw = func.trim(ListadoMedico.EXISTE).label("existe")
+
+        stmt = (
+            select(
+                ListadoMedico.ID.label("id"),
+                nro_expr,
+                ListadoMedico.NOMBRE.label("nombre"),
+                ListadoMedico.MATRICULA_PROV.label("matricula_prov"),
+                doc_str,
+                ListadoMedico.MAIL_PARTICULAR.label("mail_particular"),
+                ListadoMedico.TELE_PARTICULAR.label("tele_particular"),
+                fecha_str,
+                activo_expr,
+                existe_raw,
             )
+            .order_by(ListadoMedico.NOMBRE.asc())
+            .offset(skip)
+            .limit(limit)
         )
 
-    rows = (await db.execute(stmt)).mappings().all()
+        if estado == "activos":
+            stmt = stmt.where(func.upper(func.trim(ListadoMedico.EXISTE)) == "S")
+        elif estado == "inactivos":
+            stmt = stmt.where(func.upper(func.trim(ListadoMedico.EXISTE)) != "S")
+        # "todos" => sin filtro
+
+        cond = condicion_busqueda(q)
+        if cond is not None:
+            stmt = stmt.where(cond)
+
+        rows = (await db.execute(stmt)).mappings().all()
 
     # saneo mínimo (ya veníamos usando esto para fecha/doc)
     out = []
@@ -325,7 +326,7 @@ MEDICO_TEXT_DATE_FIELDS = set()
 # Strings que deben matchear EXACTO (normalizados)
 MEDICO_EXACT_STRING_FIELDS = {"existe"}  # "S"/"N" o lo que uses
 
-def _parse_date(raw: str):
+def _parse_date_str(raw: str):
     # acepta "YYYY-MM-DD" y "YYYY/MM/DD"
     try:
         raw = str(raw).strip().replace("/", "-")
@@ -354,12 +355,44 @@ def _period_col_yyyymm(col):
     # si no usás "text dates", no lo vas a usar.
     return func.concat(func.date_format(col, "%Y"), func.date_format(col, "%m"))
 
-@router.get("/all", response_model=List[MedicoBase], dependencies=[Depends(require_scope("medicos:leer"))])
+def _encode_cursor(nombre: str, medico_id: int) -> str:
+    raw = json.dumps([nombre, medico_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        nombre, medico_id = json.loads(raw)
+        return str(nombre), int(medico_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _campos_medicos(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return [f for f, col in MEDICO_COLUMNS.items() if col is not None]
+    campos = [f.strip() for f in fields.split(",") if f.strip()]
+    invalidos = [f for f in campos if MEDICO_COLUMNS.get(f) is None]
+    if invalidos:
+        raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(invalidos)}")
+    return list(dict.fromkeys(campos))
+
+@router.get(
+    "/all",
+    response_model=List[MedicoBase],
+    response_model_exclude_unset=True,   # con fields= sólo van las columnas pedidas
+    dependencies=[Depends(require_scope("medicos:leer"))],
+)
 async def listar_medicos_full(
     request: Request,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
+    response: Response = None,
     skip: int = Query(0, ge=0),
     limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor de la página anterior (keyset sobre NOMBRE, ID)"),
+    fields: Optional[str] = Query(None, description="Columnas separadas por coma (default: todas)"),
+    formato: Literal["json", "ndjson", "csv"] = Query("json", description="ndjson/csv: streaming con cursor del servidor"),
     estado: Optional[Literal["todos", "activos", "inactivos"]] = Query(None),
 
     # === NUEVO: flags de vencimientos ===
@@ -375,27 +408,39 @@ async def listar_medicos_full(
     vencimientos_hasta: Optional[str] = Query(None),
 ):
     params = request.query_params
+    if cursor and skip:
+        raise HTTPException(status_code=400, detail="Usar cursor o skip, no ambos")
 
     # build select — casteos para campos “problemáticos”
+    campos = _campos_medicos(fields)
     select_cols = []
-    for field, col in MEDICO_COLUMNS.items():
-        if col is None:
-            continue
+    for field in campos:
+        col = MEDICO_COLUMNS[field]
         if field in ("documento", "codigo_postal"):
             select_cols.append(cast(col, String).label(field))
         else:
             select_cols.append(col.label(field))
+    # clave del keyset: siempre se lee, aunque no esté en fields
+    select_cols += [ListadoMedico.NOMBRE.label("_k_nombre"), ListadoMedico.ID.label("_k_id")]
 
+    # orden total (NOMBRE, ID): el índice NOMBRE ya incluye el PK
     stmt = (
         select(*select_cols)
         .select_from(ListadoMedico)
-        .order_by(ListadoMedico.NOMBRE.asc())
-        .offset(skip)
+        .order_by(ListadoMedico.NOMBRE.asc(), ListadoMedico.ID.asc())
     )
+    if skip:
+        stmt = stmt.offset(skip)
     if limit is not None:
         stmt = stmt.limit(limit)
 
     filters = []
+    if cursor:
+        k_nombre, k_id = _decode_cursor(cursor)
+        filters.append(or_(
+            ListadoMedico.NOMBRE > k_nombre,
+            and_(ListadoMedico.NOMBRE == k_nombre, ListadoMedico.ID > k_id),
+        ))
 
     if estado:
         if estado == "activos":
@@ -424,7 +469,7 @@ async def listar_medicos_full(
 
         if field in MEDICO_DATE_FIELDS:
             # para date exacto (si alguien lo usa)
-            date_val = _parse_date(raw)
+            date_val = _parse_date_str(raw)
             if date_val is None:
                 raise HTTPException(status_code=400, detail=f"Fecha invalida para {field}")
             filters.append(col == date_val)
@@ -451,12 +496,12 @@ async def listar_medicos_full(
         desde = params.get(f"{field}_desde")
         hasta = params.get(f"{field}_hasta")
         if desde:
-            start = _parse_date(desde)
+            start = _parse_date_str(desde)
             if start is None:
                 raise HTTPException(status_code=400, detail=f"Fecha invalida para {field}_desde")
             filters.append(col >= start)
         if hasta:
-            end = _parse_date(hasta)
+            end = _parse_date_str(hasta)
             if end is None:
                 raise HTTPException(status_code=400, detail=f"Fecha invalida para {field}_hasta")
             filters.append(col <= end)
@@ -480,87 +525,114 @@ async def listar_medicos_full(
             filters.append(_period_col_yyyymm(col) <= end)
 
     
-    # === VENCIMIENTOS ===
-    # columnas DATE (ajusta nombres si difieren en tu modelo)
-    col_mala = ListadoMedico.VENCIMIENTO_MALAPRAXIS
-    col_ans = ListadoMedico.VENCIMIENTO_ANSSAL
-    col_cob = ListadoMedico.VENCIMIENTO_COBERTURA
-
-    def _parse_date(s: Optional[str]):
-        if not s:
-            return None
-        try:
-            s = s.strip().replace("/", "-")
-            y, m, d = s.split("-")
-            return f"{int(y):04d}-{int(m):02d}-{int(d):02d}"
-        except Exception:
-            return None
-
+    # === VENCIMIENTOS === (tabla medico_vencimiento, ver app/services/vencimientos.py)
     today = date.today()
-    pv_to = today + timedelta(days=(por_vencer_dias or 30))
-
-    # rango global opcional para la sección vencimientos
-    v_desde = _parse_date(vencimientos_desde)
-    v_hasta = _parse_date(vencimientos_hasta)
-
-    def with_global(col, base):
-      cond = base
-      if v_desde:
-          cond = and_(cond, col >= v_desde)
-      if v_hasta:
-          cond = and_(cond, col <= v_hasta)
-      return cond
-
-    venc_group = []
-
-    # mala praxis
-    if malapraxis_vencida:
-        venc_group.append(with_global(col_mala, col_mala < today))
-    if malapraxis_por_vencer:
-        venc_group.append(with_global(col_mala, and_(col_mala >= today, col_mala <= pv_to)))
-
-    # anssal
-    if anssal_vencido:
-        venc_group.append(with_global(col_ans, col_ans < today))
-    if anssal_por_vencer:
-        venc_group.append(with_global(col_ans, and_(col_ans >= today, col_ans <= pv_to)))
-
-    # cobertura
-    if cobertura_vencida:
-        venc_group.append(with_global(col_cob, col_cob < today))
-    if cobertura_por_vencer:
-        venc_group.append(with_global(col_cob, and_(col_cob >= today, col_cob <= pv_to)))
-
-      # Si hay checks marcados, unimos por OR (cualquiera de los tildados)
-    if venc_group:
-        filters.append(or_(*venc_group))
+    marcados = [
+        (tipo, estado_venc)
+        for flag, tipo, estado_venc in (
+            (malapraxis_vencida, "malapraxis", "vencido"),
+            (malapraxis_por_vencer, "malapraxis", "por_vencer"),
+            (anssal_vencido, "anssal", "vencido"),
+            (anssal_por_vencer, "anssal", "por_vencer"),
+            (cobertura_vencida, "cobertura", "vencido"),
+            (cobertura_por_vencer, "cobertura", "por_vencer"),
+        )
+        if flag
+    ]
+    # Si hay checks marcados, unimos por OR (cualquiera de los tildados)
+    venc_cond = vencimientos.condicion_vencimientos(
+        marcados,
+        hoy=today,
+        hasta_por_vencer=today + timedelta(days=(por_vencer_dias or 30)),
+        desde=_parse_date(vencimientos_desde),   # rango opcional (date) para la sección vencimientos
+        hasta=_parse_date(vencimientos_hasta),
+    )
+    if venc_cond is not None:
+        filters.append(venc_cond)
 
     if filters:
         stmt = stmt.where(*filters)
 
+    if formato != "json":
+        return _medicos_stream(stmt, campos, formato)
+
     rows = (await db.execute(stmt)).mappings().all()
-    return [dict(r) for r in rows]
+    out = []
+    for r in rows:
+        d = dict(r)
+        k_nombre, k_id = d.pop("_k_nombre"), d.pop("_k_id")
+        out.append(d)
+    if limit is not None:
+        response.headers["X-Limit"] = str(limit)
+        if len(rows) == limit:
+            response.headers["X-Next-Cursor"] = _encode_cursor(k_nombre, k_id)
+    return out
+
+
+def _medicos_stream(stmt, campos: List[str], formato: str) -> StreamingResponse:
+    """NDJSON o CSV de /all leído con cursor del servidor (nightly sync sin limit)."""
+    async def filas():
+        async with sesion_streaming() as db:
+            result = await db.stream(stmt.execution_options(yield_per=1000))
+            async for r in result.mappings():
+                yield [r[c] for c in campos]
+
+    if formato == "csv":
+        return StreamingResponse(
+            iter_csv(campos, filas()),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="medicos.csv"'},
+        )
+
+    async def ndjson():
+        async for fila in filas():
+            yield json.dumps(dict(zip(campos, fila)), ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 @router.get("/count", dependencies=[Depends(require_scope("medicos:leer"))])
 async def contar_medicos(
     q: Optional[str] = Query(None, description="Buscar por nombre, nro socio, matrículas o documento"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
+    # mismo origen que listar_medicos: el índice en memoria si está fresco
+    total = medicos_autocomplete.contar(q, estado="activos") if q else None
+    if total is not None:
+        return {"count": total}
     M = ListadoMedico
     stmt = select(func.count()).select_from(M).where(M.EXISTE == "S")
-    if q:
-        like = f"%{q}%"
-        stmt = stmt.where(
-            or_(
-                M.NOMBRE.ilike(like),
-                cast(M.NRO_SOCIO, String).ilike(like),
-                cast(M.MATRICULA_PROV, String).ilike(like),
-                cast(M.DOCUMENTO, String).ilike(like),
-            )
-        )
+    cond = condicion_busqueda(q)
+    if cond is not None:
+        stmt = stmt.where(cond)
     total = (await db.execute(stmt)).scalar_one() or 0
     return {"count": int(total)}
 
+@router.get("/vencimientos", dependencies=[Depends(require_scope("medicos:leer"))])
+async def listar_vencimientos(
+    tipo: Optional[Literal["malapraxis", "anssal", "cobertura"]] = Query(None),
+    estado: Optional[Literal["vencido", "por_vencer"]] = Query(None, description="Sin estado: vencidos y por vencer"),
+    por_vencer_dias: int = Query(30, ge=1, le=365),
+    solo_activos: bool = Query(True),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Vencimientos ordenados por fecha, desde la tabla materializada."""
+    return await vencimientos.listar(
+        db, tipo=tipo, estado=estado, por_vencer_dias=por_vencer_dias,
+        solo_activos=solo_activos, skip=skip, limit=limit,
+    )
+
+
+@router.get("/vencimientos/resumen", dependencies=[Depends(require_scope("medicos:leer"))])
+async def resumen_vencimientos(
+    por_vencer_dias: int = Query(30, ge=1, le=365),
+    solo_activos: bool = Query(True),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """{tipo: {vencidos, por_vencer}} para el dashboard."""
+    return await vencimientos.resumen(db, por_vencer_dias=por_vencer_dias, solo_activos=solo_activos)
+
 # Registro "publico" ========================================================================
 
 @router.post("/register", response_model=RegisterOut)
@@ -1297,22 +1369,18 @@ async def _save_upload_for_medico(medico_id: int, up: UploadFile) -> dict:
         raise HTTPException(400, "Archivo no recibido")
 
     folder_fs = MEDIA_URL / "medicos" / str(medico_id)
-    folder_fs.mkdir(parents=True, exist_ok=True)
-
     safe_name = _safe_name(up.filename)
-    abs_path = folder_fs / safe_name
-
-    content = await up.read()
-    abs_path.write_bytes(content)
+    saved = await guardar_upload(up, folder_fs, safe_name)
 
     rel_path = f"{MEDIA_URL}/medicos/{medico_id}/{safe_name}"  # lo que exponés públicamente
 
     return {
         "safe_name": safe_name,
         "rel_path": rel_path,                  # ej: uploads/medicos/2446/xxx.pdf
-        "size": len(content),
-        "content_type": up.content_type or "application/octet-stream",
-        "abs_path": abs_path,                  # Path en disco
+        "size": saved.size,
+        "sha256": saved.sha256,
+        "content_type": saved.content_type,
+        "abs_path": saved.ruta,                # Path en disco
         "original_name": up.filename or "",
     }
 
@@ -1336,6 +1404,8 @@ async def upload_documento_medico(
     # 2) guardar archivo físico
     try:
         saved = await _save_upload_for_medico(medico_id, up)
+    except HTTPException:
+        raise
     except Exception as e:
         # si algo falla guardando en disco
         raise HTTPException(500, f"Error guardando el archivo: {e}")
@@ -1541,21 +1611,17 @@ async def upload_document(
         raise HTTPException(404, "Médico no encontrado")
 
     folder = MEDIA_URL / "medicos" / str(medico_id)
-    folder.mkdir(parents=True, exist_ok=True)
-
     safe_name = f"{int(datetime.now().timestamp())}_{(file.filename or 'doc').replace(' ','_')}"
-    dest = folder / safe_name
-
-    content = await file.read()
-    dest.write_bytes(content)
+    saved = await guardar_upload(file, folder, safe_name)
+    dest = saved.ruta
 
     doc = Documento(
         medico_id = medico_id,
         label = label,
         original_name = file.filename or "",
         filename = safe_name,
-        content_type = file.content_type or "application/octet-stream",
-        size = len(content),
+        content_type = saved.content_type,
+        size = saved.size,
         path = str(dest),
     )
     db.add(doc)
@@ -1611,21 +1677,17 @@ async def admin_upload_document(medico_id: int,
         raise HTTPException(404, "Médico no encontrado")
 
     folder = MEDIA_URL / "medicos" / str(medico_id)
-    folder.mkdir(parents=True, exist_ok=True)
-
     safe_name = f"{int(datetime.now().timestamp())}_{(file.filename or 'doc').replace(' ','_')}"
-    dest = folder / safe_name
-
-    content = await file.read()
-    dest.write_bytes(content)
+    saved = await guardar_upload(file, folder, safe_name)
+    dest = saved.ruta
 
     doc = Documento(
         medico_id = medico_id,
         label = label,
         original_name = file.filename or "",
         filename = safe_name,
-        content_type = file.content_type or "application/octet-stream",
-        size = len(content),
+        content_type = saved.content_type,
+        size = saved.size,
         path = str(dest),
     )
     db.add(doc)
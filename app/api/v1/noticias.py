@@ -11,6 +11,7 @@ from app.db.database import get_db
 from app.db.models import Noticia as NoticiaModel, DocumentoNoticias as DocNoticiaModel
 from app.schemas.noticias_schema import NoticiaOut, NoticiaDetailOut, DocumentoNoticiasOut
 from app.auth.deps import get_current_user
+from app.services.uploads import guardar_upload
 
 router = APIRouter()
 
@@ -24,14 +25,13 @@ def _is_image(content_type: str | None) -> bool:
 async def _save_file(file: UploadFile) -> dict:
     ext = Path(file.filename or "").suffix.lower() or ".bin"
     name = f"{uuid4().hex}{ext}"
-    dest = WEB_NEWS_DIR / name
-    data = await file.read()
-    dest.write_bytes(data)
+    saved = await guardar_upload(file, WEB_NEWS_DIR, name)
     return {
         "original_name": file.filename or name,
         "filename": name,
         "content_type": file.content_type,
-        "size": len(data),
+        "size": saved.size,
+        "sha256": saved.sha256,
         "path": f"/uploads/web_noticias/{name}",
     }
 
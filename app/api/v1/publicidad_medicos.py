@@ -4,7 +4,7 @@ from pathlib import Path
 from uuid import uuid4
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import String, cast, or_, select, desc
+from sqlalchemy import select, desc
 from sqlalchemy.orm import aliased
 
 from app.db.database import get_db
@@ -13,6 +13,9 @@ from app.schemas.publicidad_medicos_schema import PublicidadMedicoOut
 
 # IMPORTA tu modelo ListadoMedico (así lo vi en tu proyecto)
 from app.db.models import ListadoMedico
+from app.services import medicos_autocomplete
+from app.services.medicos_busqueda import condicion_busqueda
+from app.services.uploads import guardar_upload
 
 router = APIRouter()
 
@@ -25,13 +28,11 @@ def _save_name(orig: str | None) -> str:
 
 async def _save_file(file: UploadFile) -> dict:
     name = _save_name(file.filename)
-    dest = MEDICOS_ADS_DIR / name
-    data = await file.read()
-    dest.write_bytes(data)
+    saved = await guardar_upload(file, MEDICOS_ADS_DIR, name)
     return {
         "adjunto_filename": file.filename or name,
         "adjunto_content_type": file.content_type,
-        "adjunto_size": len(data),
+        "adjunto_size": saved.size,
         "adjunto_path": f"/uploads/medicos_publicidad/{name}",
     }
 
@@ -193,8 +194,15 @@ async def buscar_medicos(
     db: AsyncSession = Depends(get_db),
     limit: int = 20,   # opcional: tope configurable (1..50)
 ):
-    term = f"%{q.strip()}%"
+    limit = max(1, min(limit, 50))
+    rows = medicos_autocomplete.buscar(q, estado="activos", limit=limit)
+    if rows is not None:
+        return [{k: r[k] for k in ("id", "nombre", "nro_socio", "matricula_prov", "matricula_nac", "documento")} for r in rows]
+
     LM = ListadoMedico
+    cond = condicion_busqueda(q)
+    if cond is None:
+        return []
 
     stmt = (
         select(
@@ -207,15 +215,10 @@ async def buscar_medicos(
         )
         .where(
             LM.EXISTE == "S",  # 👈 sólo existentes
-            or_(
-                LM.NOMBRE.like(term),
-                cast(LM.NRO_SOCIO, String).like(term),
-                LM.MATRICULA_PROV.like(term),
-                LM.DOCUMENTO.like(term),
-            ),
+            cond,
         )
         .order_by(LM.NOMBRE.asc())
-        .limit(max(1, min(limit, 50)))
+        .limit(limit)
     )
 
     res = await db.execute(stmt)
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
 from app.db.models import Role, Permission, RolePermission, UserRole, UserPermission
 from app.db.models import ListadoMedico
+from app.auth import permisos_cache
 from app.auth.deps import require_scope
 from app.utils.main import get_effective_permission_codes
 
@@ -39,6 +40,7 @@ async def add_perm_to_role(role_name: str, perm_code: str, db: AsyncSession = De
     if exists: return {"ok": True, "msg": "ya lo tenía"}
     await db.execute(insert(RolePermission).values(role_id=role.id, permission_id=perm.id))
     await db.commit()
+    permisos_cache.invalidar()
     return {"ok": True}
 
 @router.delete("/roles/{role_name}/permissions/{perm_code}", dependencies=[Depends(require_scope("rbac:gestionar"))])
@@ -49,6 +51,7 @@ async def remove_perm_from_role(role_name: str, perm_code: str, db: AsyncSession
     await db.execute(delete(RolePermission).where(
         RolePermission.role_id == role.id, RolePermission.permission_id == perm.id))
     await db.commit()
+    permisos_cache.invalidar()
     return {"ok": True}
 
 # ---- USUARIOS ↔ ROLES ----
@@ -70,6 +73,7 @@ async def add_role_to_user(user_id: int, role_name: str, db: AsyncSession = Depe
     if exists: return {"ok": True, "msg": "ya tenía el rol"}
     await db.execute(insert(UserRole).values(user_id=user_id, role_id=role.id))
     await db.commit()
+    permisos_cache.invalidar()
     return {"ok": True}
 
 @router.delete("/users/{user_id}/roles/{role_name}", dependencies=[Depends(require_scope("rbac:gestionar"))])
@@ -78,6 +82,7 @@ async def remove_role_from_user(user_id: int, role_name: str, db: AsyncSession =
     if not role: raise HTTPException(404, "Rol no existe")
     await db.execute(delete(UserRole).where(UserRole.user_id == user_id, UserRole.role_id == role.id))
     await db.commit()
+    permisos_cache.invalidar()
     return {"ok": True}
 
 # ---- OVERRIDES (allow/deny) ----
@@ -98,6 +103,7 @@ async def set_user_permission_override(user_id: int, perm_code: str, allow: bool
         UserPermission.user_id==user_id, UserPermission.permission_id==perm.id))
     await db.execute(insert(UserPermission).values(user_id=user_id, permission_id=perm.id, allow=allow))
     await db.commit()
+    permisos_cache.invalidar()
     return {"ok": True}
 
 @router.delete("/users/{user_id}/permissions/{perm_code}", dependencies=[Depends(require_scope("rbac:gestionar"))])
@@ -107,6 +113,7 @@ async def clear_user_permission_override(user_id: int, perm_code: str, db: Async
     await db.execute(delete(UserPermission).where(
         UserPermission.user_id==user_id, UserPermission.permission_id==perm.id))
     await db.commit()
+    permisos_cache.invalidar()
     return {"ok": True}
 
 @router.get("/users/{user_id}/permissions/effective", dependencies=[Depends(require_scope("rbac:gestionar"))])
@@ -0,0 +1,14 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+
+from app.auth.deps import require_scope
+from app.db.database import pool_metricas
+
+router = APIRouter()
+
+
+@router.get("/db-pool", dependencies=[Depends(require_scope("rbac:gestionar"))])
+async def metricas_pool_db() -> Dict[str, Dict[str, Any]]:
+    """Por engine (primario / réplica): conexiones en uso, utilización y espera de checkout."""
+    return pool_metricas()
@@ -3,17 +3,20 @@ from datetime import datetime, date,timedelta, UTC
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.params import Query
 from pydantic import BaseModel
-from sqlalchemy import insert, select, func, or_, cast, String, and_
+from sqlalchemy import insert, select, func, and_
 from app.auth import router
+from app.auth import permisos_cache
 from app.auth.deps import require_scope
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List,Dict
 
 from app.schemas.solicitudes_schemas import ApproveIn, RejectIn, SolicitudDetailOut, SolicitudListItem
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.db.models import ListadoMedico, Role, SolicitudRegistro, UserRole
 from app.services.email import send_email_resend
 from app.services.mail_templates import build_approval_email, build_rejection_email
+from app.services.medicos_busqueda import condicion_busqueda
+from app.services import solicitudes_stats
 
 router = APIRouter()
 
@@ -70,15 +73,9 @@ async def listar_solicitudes(
     ).join(M, M.ID == S.medico_id)
 
     # Filtro texto
-    if q:
-        like = f"%{q}%"
-        stmt = stmt.where(
-            or_(
-                M.NOMBRE.ilike(like),
-                M.MAIL_PARTICULAR.ilike(like),
-                cast(M.DOCUMENTO, String).ilike(like),
-            )
-        )
+    cond = condicion_busqueda(q)
+    if cond is not None:
+        stmt = stmt.where(cond)
 
     # Filtro por rango de fechas de creación
     if desde:
@@ -137,7 +134,7 @@ async def solicitudes_stats_counts(
     desde: Optional[datetime] = None,
     hasta: Optional[datetime] = None,
     nuevos_dias: int = 7,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> Dict[str, int]:
     """
     Devuelve conteos por estado "UI":
@@ -147,41 +144,7 @@ async def solicitudes_stats_counts(
       - rechazada  = rechazada
       - total      = suma de todos
     """
-    S, M = SolicitudRegistro, ListadoMedico
-    now = datetime.now(UTC)
-    limite = now - timedelta(days=nuevos_dias)
-
-    def base():
-        stmt = select(func.count()).select_from(S).join(M, M.ID == S.medico_id)
-        if q:
-            like = f"%{q}%"
-            stmt = stmt.where(
-                or_(
-                    M.NOMBRE.ilike(like),
-                    M.MAIL_PARTICULAR.ilike(like),
-                    cast(M.DOCUMENTO, String).ilike(like),
-                )
-            )
-        if desde:
-            stmt = stmt.where(S.created_at >= desde)
-        if hasta:
-            stmt = stmt.where(S.created_at <= hasta)
-        return stmt
-
-    total = (await db.execute(base())).scalar_one() or 0
-    pend_total = (await db.execute(base().where(S.estado == "pendiente"))).scalar_one() or 0
-    nueva = (await db.execute(base().where(and_(S.estado == "pendiente", S.created_at >= limite)))).scalar_one() or 0
-    pendiente = max(pend_total - nueva, 0)
-    aprobada = (await db.execute(base().where(S.estado == "aprobada"))).scalar_one() or 0
-    rechazada = (await db.execute(base().where(S.estado == "rechazada"))).scalar_one() or 0
-
-    return {
-        "total": int(total),
-        "nueva": int(nueva),
-        "pendiente": int(pendiente),
-        "aprobada": int(aprobada),
-        "rechazada": int(rechazada),
-    }
+    return await solicitudes_stats.contar_por_estado(db, q, desde, hasta, nuevos_dias)
 
 @router.get("/stats/monthly")
 async def solicitudes_stats_monthly(
@@ -190,7 +153,7 @@ async def solicitudes_stats_monthly(
     q: Optional[str] = None,
     desde: Optional[datetime] = None,
     hasta: Optional[datetime] = None,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Series mensuales:
@@ -209,15 +172,9 @@ async def solicitudes_stats_monthly(
     if metric == "approved":
         stmt = stmt.where(S.estado == "aprobada")
 
-    if q:
-        like = f"%{q}%"
-        stmt = stmt.where(
-            or_(
-                M.NOMBRE.ilike(like),
-                M.MAIL_PARTICULAR.ilike(like),
-                cast(M.DOCUMENTO, String).ilike(like),
-            )
-        )
+    cond = condicion_busqueda(q)
+    if cond is not None:
+        stmt = stmt.where(cond)
     if desde:
         stmt = stmt.where(field >= desde)
     if hasta:
@@ -339,6 +296,8 @@ async def approve_solicitud(
         await db.execute(insert(UserRole).values(user_id=med.ID, role_id=rol_medico.id))
 
     await db.commit()
+    solicitudes_stats.invalidar()
+    permisos_cache.invalidar()   # el médico ganó el rol "Medico"
 
     # Email al solicitante
     subject = "✅ Solicitud Aprobada — Próximos pasos"
@@ -378,6 +337,7 @@ async def reject_solicitud(
     sol.estado = "rechazada"
     sol.observaciones = body.observaciones
     await db.commit()
+    solicitudes_stats.invalidar()
 
     # Email al solicitante
     subject = "❌ Solicitud Rechazada — Información"
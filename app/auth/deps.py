@@ -3,7 +3,8 @@ from jose import JWTError, ExpiredSignatureError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import decode_token
+from app.auth import permisos_cache, permisos_registro
+from app.core.security import decode_token_cached
 from app.db.database import get_db
 from app.db.models import ListadoMedico, Role, UserRole
 from app.utils.main import get_effective_permission_codes
@@ -12,7 +13,6 @@ from app.utils.main import get_effective_permission_codes
 # cmc_api/app/auth/deps.py
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from app.core.security import decode_token
 
 async def get_current_user_with_scopes(
     authorization: str | None = Header(default=None),
@@ -23,12 +23,12 @@ async def get_current_user_with_scopes(
 
 bearer = HTTPBearer(auto_error=False)
 
-def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer)):
+async def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer)):
     if not creds:
         raise HTTPException(401, "Falta token")
 
     try:
-        data = decode_token(creds.credentials)  # verifica exp
+        data = decode_token_cached(creds.credentials)  # verifica exp
     except ExpiredSignatureError:
         # 👇 esto es CLAVE para que el frontend active /auth/refresh
         raise HTTPException(401, "token_expired")
@@ -38,12 +38,19 @@ def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer)):
     if data.get("type") != "access":
         raise HTTPException(401, "invalid_token_type")
 
-    return {"nro_socio": data["sub"], "scopes": data.get("scopes", [])}
+    scopes = permisos_registro.scopes_del_token(data)
+    if scopes is None and await permisos_registro.recargar_si_corresponde():
+        scopes = permisos_registro.scopes_del_token(data)
+    if scopes is None:
+        # bitmask emitido con otro registro de permisos: que el front haga /auth/refresh
+        raise HTTPException(401, "token_expired")
+
+    return {"nro_socio": data["sub"], "scopes": scopes}
 
 
 def require_scope(scope: str):
     def checker(user=Depends(get_current_user)):
-        if scope not in (user.get("scopes") or []):
+        if scope not in user["scopes"]:     # frozenset: O(1)
             raise HTTPException(403, "No tenés permiso")
         return user
     return checker
@@ -73,7 +80,7 @@ async def get_current_user_with_scopes_and_role(
 
     token = authorization.split(" ", 1)[1].strip()
     try:
-        payload = decode_token(token)
+        payload = decode_token_cached(token)
     except ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expirado")
     except JWTError:
@@ -86,31 +93,51 @@ async def get_current_user_with_scopes_and_role(
     if not sub:
         raise HTTPException(status_code=401, detail="Token inválido (sub)")
 
-    # Buscar usuario por ID (preferido) o por NRO_SOCIO como fallback
-    user = None
-    try:
-        user = (await db.execute(
-            select(ListadoMedico).where(ListadoMedico.NRO_SOCIO == int(sub))
-        )).scalar_one_or_none()
-    except ValueError:
-        user = None
-
-    if not user:
-        try:
-            user = (await db.execute(
-                select(ListadoMedico).where(ListadoMedico.NRO_SOCIO == int(sub))
-            )).scalar_one_or_none()
-        except ValueError:
-            user = None
-
-    if not user:
-        raise HTTPException(status_code=401, detail="Usuario no encontrado")
-
-    scopes = await get_effective_permission_codes(db, user.ID)
+    user = await _usuario_por_sub(db, sub)
+
+    token_scopes = permisos_registro.scopes_del_token(payload) if permisos_cache.token_vigente(payload) else None
+    if token_scopes is not None:
+        # camino rápido: scopes/rol firmados en el token, sin consultas
+        scopes = sorted(token_scopes)
+        role = payload.get("role")
+        if role:
+            return user, scopes, role
+        _, role = await _permisos(db, user.ID)
+    else:
+        scopes, role = await _permisos(db, user.ID)
+        # ① Preferimos el claim del token si viene; ② sino, el de DB
+        role = payload.get("role") or role
 
-    # ① Preferimos el claim del token si viene; ② sino, lo leemos de DB
-    role = payload.get("role") or await get_user_role(db, user.ID)
     if not role:
         raise HTTPException(status_code=409, detail="El usuario no tiene rol asignado")
 
-    return user, scopes, role
\ No newline at end of file
+    return user, scopes, role
+
+
+async def _usuario_por_sub(db: AsyncSession, sub: str) -> permisos_cache.UsuarioAuth:
+    user = permisos_cache.usuarios.get(sub)
+    if user is not None:
+        return user
+    try:
+        row = (await db.execute(
+            select(ListadoMedico.ID, ListadoMedico.NRO_SOCIO, ListadoMedico.NOMBRE)
+            .where(ListadoMedico.NRO_SOCIO == int(sub))
+        )).first()
+    except ValueError:
+        row = None
+    if not row:
+        raise HTTPException(status_code=401, detail="Usuario no encontrado")
+    user = permisos_cache.UsuarioAuth(ID=row.ID, NRO_SOCIO=row.NRO_SOCIO, NOMBRE=row.NOMBRE)
+    permisos_cache.usuarios.put(sub, user)
+    return user
+
+
+async def _permisos(db: AsyncSession, user_id: int) -> tuple[list[str], str | None]:
+    hit = permisos_cache.permisos.get(user_id)
+    if hit is not None:
+        return list(hit[0]), hit[1]
+    ver = permisos_cache.version()
+    scopes = await get_effective_permission_codes(db, user_id)
+    role = await get_user_role(db, user_id)
+    permisos_cache.permisos.put(user_id, (scopes, role), ver=ver)
+    return list(scopes), role
@@ -0,0 +1,84 @@
+"""
+Caché en proceso de la resolución de permisos de get_current_user_with_scopes_and_role.
+
+- Usuarios: (ID, NRO_SOCIO, NOMBRE) por `sub`, LRU con TTL (AUTH_CACHE_TTL_SEG).
+- Permisos: (scopes, role) por user id, válidos mientras no cambie `version()`. Toda
+  mutación de RBAC (app/api/v1/rbac.py, aprobar solicitud) llama a invalidar(), que sube
+  la versión y registra el momento del cambio.
+- Camino rápido: los scopes del access token están firmados; si el token se emitió después
+  del último cambio de RBAC visto por este proceso se usan tal cual (como ya hace
+  require_scope) y no se consulta la base.
+"""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class UsuarioAuth:
+    """Lo que los endpoints usan del usuario autenticado (antes, la fila entera de ListadoMedico)."""
+    ID: int
+    NRO_SOCIO: int
+    NOMBRE: Optional[str]
+
+
+class _LRU(Generic[T]):
+    def __init__(self, versionado: bool) -> None:
+        self._versionado = versionado
+        self._datos: "OrderedDict[Hashable, Tuple[float, int, T]]" = OrderedDict()
+
+    def get(self, clave: Hashable) -> Optional[T]:
+        hit = self._datos.get(clave)
+        if hit is None:
+            return None
+        expira, ver, valor = hit
+        if expira <= time.monotonic() or (self._versionado and ver != _version):
+            del self._datos[clave]
+            return None
+        self._datos.move_to_end(clave)
+        return valor
+
+    def put(self, clave: Hashable, valor: T, ver: Optional[int] = None) -> None:
+        # ver: versión leída ANTES de consultar la base; si hubo un invalidar() en el medio,
+        # la entrada nace vencida
+        ver = _version if ver is None else ver
+        self._datos[clave] = (time.monotonic() + settings.AUTH_CACHE_TTL_SEG, ver, valor)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > settings.AUTH_CACHE_MAX_ENTRADAS:
+            self._datos.popitem(last=False)
+
+    def clear(self) -> None:
+        self._datos.clear()
+
+
+_version = 0
+_ultimo_cambio = 0.0     # epoch del último invalidar(); 0 = sin cambios desde que arrancó
+
+usuarios: _LRU[UsuarioAuth] = _LRU(versionado=False)
+permisos: _LRU[Tuple[List[str], Optional[str]]] = _LRU(versionado=True)
+
+
+def version() -> int:
+    return _version
+
+
+def invalidar() -> None:
+    """Llamar después del commit de cualquier cambio de roles/permisos."""
+    global _version, _ultimo_cambio
+    _version += 1
+    _ultimo_cambio = time.time()
+    permisos.clear()
+
+
+def token_vigente(payload: dict[str, Any]) -> bool:
+    """¿Los scopes firmados en el token reflejan el RBAC actual (emitido después del último cambio)?"""
+    iat = payload.get("iat")
+    firmados = "scopes" in payload or "pm" in payload
+    return firmados and isinstance(iat, (int, float)) and iat > _ultimo_cambio
@@ -0,0 +1,123 @@
+"""
+Registro de permisos (tabla `permissions`) para el claim compacto del access token.
+
+- En lugar de la lista de códigos, el token lleva `pm`: bitmask con el bit `permissions.id`
+  encendido por cada permiso (base64url, little-endian), y `pv`: versión del registro (hash de
+  los pares id/code). Con ~50 permisos son ~10 bytes contra ~1 KB de lista.
+- Un `pm` se decodifica una vez por (pv, pm) a un frozenset: el chequeo de require_scope es
+  un `in` O(1).
+- Si el token trae otra `pv` (se agregó o renombró un permiso), el registro se recarga de la
+  base como mucho cada RECARGA_MIN_SEG; si sigue sin coincidir, scopes_del_token() devuelve
+  None y el caller decide (ir a la base, o 401 para que el front haga /auth/refresh).
+- Los tokens viejos con `scopes` en lista se siguen aceptando.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import logging
+import time
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.db.database import AsyncSessionLocal
+from app.db.models import Permission
+
+log = logging.getLogger(__name__)
+
+RECARGA_MIN_SEG = 30.0
+
+_por_codigo: Dict[str, int] = {}
+_por_id: Dict[int, str] = {}
+_version: Optional[str] = None
+_cargado_en = float("-inf")
+_recarga: Optional[asyncio.Task] = None
+
+
+def version() -> Optional[str]:
+    return _version
+
+
+def armar(filas: Iterable[Tuple[int, str]]) -> None:
+    """Reemplaza el registro con los pares (id, code)."""
+    global _por_codigo, _por_id, _version, _cargado_en
+    filas = sorted((int(i), str(c)) for i, c in filas)
+    _por_id = dict(filas)
+    _por_codigo = {c: i for i, c in filas}
+    _version = hashlib.sha1(";".join(f"{i}:{c}" for i, c in filas).encode()).hexdigest()[:8]
+    _cargado_en = time.monotonic()
+    decodificar.cache_clear()
+
+
+async def cargar() -> None:
+    async with AsyncSessionLocal() as db:
+        filas = (await db.execute(select(Permission.id, Permission.code))).all()
+    armar(filas)
+    log.info("Registro de permisos: %s permisos, versión %s", len(filas), _version)
+
+
+async def iniciar() -> None:
+    """Carga inicial en el lifespan; si falla, los tokens salen con la lista de scopes."""
+    try:
+        await cargar()
+    except Exception:
+        log.exception("Registro de permisos: no se pudo cargar al iniciar")
+
+
+async def recargar_si_corresponde() -> bool:
+    """Recarga si pasó RECARGA_MIN_SEG desde la última; True si recargó."""
+    if time.monotonic() - _cargado_en < RECARGA_MIN_SEG:
+        return False
+    try:
+        await cargar()
+    except Exception:
+        log.exception("Registro de permisos: falló la recarga")
+        return False
+    return True
+
+
+def _disparar_recarga() -> None:
+    global _recarga
+    if _recarga is not None and not _recarga.done():
+        return
+    try:
+        _recarga = asyncio.get_running_loop().create_task(recargar_si_corresponde())
+    except RuntimeError:       # fuera del loop: la próxima llamada con loop la dispara
+        pass
+
+
+def codificar(codigos: Iterable[str]) -> Optional[Tuple[str, str]]:
+    """(pv, pm) para el token, o None si el registro no está cargado o hay un código desconocido."""
+    if _version is None:
+        return None
+    mask = 0
+    for c in codigos:
+        i = _por_codigo.get(c)
+        if i is None:
+            _disparar_recarga()     # permiso nuevo en la base
+            return None
+        mask |= 1 << i
+    crudo = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    return _version, base64.urlsafe_b64encode(crudo).rstrip(b"=").decode("ascii")
+
+
+@lru_cache(maxsize=1024)
+def decodificar(pv: Optional[str], pm: str) -> Optional[FrozenSet[str]]:
+    if pv is None or pv != _version:
+        return None
+    try:
+        mask = int.from_bytes(base64.urlsafe_b64decode(pm + "=" * (-len(pm) % 4)), "little")
+    except (ValueError, TypeError):
+        return None
+    return frozenset(c for i, c in _por_id.items() if mask >> i & 1)
+
+
+def scopes_del_token(payload: Dict[str, Any]) -> Optional[FrozenSet[str]]:
+    """Scopes firmados en el token; None si vienen en bitmask de otra versión del registro."""
+    pm = payload.get("pm")
+    if isinstance(pm, str):
+        return decodificar(payload.get("pv"), pm)
+    return frozenset(payload.get("scopes") or ())
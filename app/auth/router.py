@@ -7,7 +7,7 @@ from app.auth.deps import get_current_user_with_scopes, get_current_user_with_sc
 from app.db.database import get_db
 from app.db.models import ListadoMedico
 from app.core.security import create_access_token, create_refresh_token, decode_token
-from app.core.passwords import verify_and_upgrade, verify_password, hash_password
+from app.core.passwords import hash_password_async, verify_and_upgrade, verify_password_async
 from app.core.config import settings
 import time, json, hmac, hashlib, base64, urllib.parse
 from fastapi import HTTPException
@@ -186,10 +186,10 @@ async def change_password(body: ChangePasswordIn, req: Request, db: AsyncSession
     medico = (await db.execute(stmt)).scalar_one_or_none()
     if not medico:
         raise HTTPException(404, "Usuario no encontrado")
-    if not verify_password(body.old_password, medico.hashed_password):
+    if not await verify_password_async(body.old_password, medico.hashed_password):
         raise HTTPException(400, "La contrasena actual es incorrecta")
 
-    medico.hashed_password = hash_password(body.new_password)
+    medico.hashed_password = await hash_password_async(body.new_password)
     await db.commit()
     return {"ok": True}
 
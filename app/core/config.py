@@ -8,12 +8,28 @@ class Settings(BaseSettings):
     MYSQL_HOST: str
     MYSQL_DB: str
     MYSQL_PORT: int | None = 3306
+    MYSQL_READ_HOST: str | None = None     # réplica de lectura (mismo usuario/base); None = todo al primario
+    DB_URL: str | None = None              # pisa MYSQL_URL (tests: MySQL local o sqlite+aiosqlite)
+    DB_READ_URL: str | None = None         # pisa la URL de la réplica
+    DB_ECHO: bool = False                  # loguear cada SQL
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0          # segundos esperando conexión libre antes de TimeoutError
+    DB_POOL_RECYCLE: int = 1800            # < wait_timeout de MySQL
+    DB_POOL_PRE_PING: bool = True
 
     CORS_ORIGINS: str
     JWT_SECRET: SecretStr                 
     JWT_ALG: str = "HS256"
     ACCESS_MINUTES: int = 15
     REFRESH_DAYS: int = 15
+    AUTH_CACHE_TTL_SEG: float = 60.0       # caché de usuario/permisos en app/auth/deps.py
+    AUTH_CACHE_MAX_ENTRADAS: int = 5000
+    JWT_CACHE_MAX_ENTRADAS: int = 10000    # access tokens ya verificados (app/core/security.py); 0 = sin caché
+    JWT_SCOPES_BITMASK: bool = True        # scopes como bitmask `pm`/`pv` en el token (app/auth/permisos_registro.py)
+    PASSWORD_HASH_POOL: str = "process"    # "process" | "thread": dónde corre pbkdf2 (app/core/passwords.py)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_COLA: int = 32       # hashes en curso por proceso; más -> 503
     
     COOKIE_SAMESITE: str
     COOKIE_SECURE: bool = False  
@@ -29,16 +45,42 @@ class Settings(BaseSettings):
     MEDIA_ROOT: str = "uploads"   
     MEDIA_URL: str = "uploads"        
     MEDIA_BASE_URL: str | None = None   
+    UPLOAD_MAX_MB_PDF: float = 50         # límites por tipo de archivo subido (app/services/uploads.py)
+    UPLOAD_MAX_MB_IMAGEN: float = 10
+    UPLOAD_MAX_MB_OTROS: float = 20
                  
     RESEND_API_KEY: str | None = None     
     EMAIL_NOTIFY_TO: str | None = None
     EMAIL_FROM: str | None = None
+
+    JOBS_WORKERS: int = 2             # workers de jobs por proceso uvicorn (0 = no ejecuta jobs)
+    JOBS_POLL_SECONDS: float = 2.0
+    JOBS_HEARTBEAT_SEG: float = 15.0      # cada cuánto renueva heartbeat_at el worker de un job en_curso
+    JOBS_HEARTBEAT_VENCIDO_SEG: int = 120  # en_curso sin heartbeat hace más que esto -> worker muerto
+
+    EXPORTS_CACHE_MAX_MB: int = 512   # caché de exportaciones de liquidaciones cerradas (MEDIA_ROOT/exports_cache)
+
+    SERVICIOS_JSON: str = "servicios_json.json"   # catálogo de conceptos del colegio (bulk_generar_descuentos)
+
+    MEDICOS_AUTOCOMPLETE_MAX_EDAD_SEG: int = 300  # índice en memoria del type-ahead; más viejo -> a la base (0 = desactivado)
+    SOLICITUDES_STATS_TTL_SEG: float = 15.0        # caché de /solicitudes/stats/counts (0 = sin caché)
     @property
     def MYSQL_URL(self) -> str:
         return (
             f"mysql+aiomysql://{self.MYSQL_USER}:"
             f"{self.MYSQL_PASS}@{self.MYSQL_HOST}/{self.MYSQL_DB}"
         )
+
+    @property
+    def MYSQL_READ_URL(self) -> str | None:
+        if self.DB_READ_URL:
+            return self.DB_READ_URL
+        if self.MYSQL_READ_HOST:
+            return (
+                f"mysql+aiomysql://{self.MYSQL_USER}:"
+                f"{self.MYSQL_PASS}@{self.MYSQL_READ_HOST}/{self.MYSQL_DB}"
+            )
+        return None
 # 
     def CORS_LIST(self) -> list[str]:
         return [o.strip() for o in self.CORS_ORIGINS.split(',') if o.strip()]
@@ -1,9 +1,19 @@
 # security.py
-from typing import Optional
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, TypeVar
+from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
+from app.core.config import settings
 from app.db.models import ListadoMedico
 
+log = logging.getLogger(__name__)
+T = TypeVar("T")
+
 _pwd = CryptContext(
     schemes=["pbkdf2_sha256", "bcrypt", "bcrypt_sha256"],
     deprecated=["bcrypt", "bcrypt_sha256"],
@@ -25,6 +35,67 @@ def needs_update(hashed: Optional[str]) -> bool:
     except Exception:
         return True  # si es raro/desconocido, forzamos migración
 
+# ---------------------------------------------------------------------------
+# Pool de hashing: pbkdf2 con 480k rondas tarda cientos de ms; corrido en el event loop
+# frena todos los requests del worker. Va a un pool de procesos (PASSWORD_HASH_POOL=process)
+# o de threads (hashlib libera el GIL), con una cola acotada: si hay más de
+# PASSWORD_HASH_MAX_COLA en curso se responde 503 en lugar de acumular.
+# ---------------------------------------------------------------------------
+_executor: Optional[Executor] = None
+_en_curso = 0
+
+
+def _crear_executor() -> Executor:
+    workers = settings.PASSWORD_HASH_WORKERS
+    if settings.PASSWORD_HASH_POOL == "process":
+        try:
+            # spawn: el hijo no hereda el loop ni los threads del proceso uvicorn
+            return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        except (OSError, NotImplementedError, ValueError):
+            log.warning("Pool de procesos no disponible para hashing; uso threads", exc_info=True)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwd-hash")
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        _executor = _crear_executor()
+    return _executor
+
+
+def cerrar_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def _en_pool(fn: Callable[..., T], *args) -> T:
+    global _en_curso, _executor
+    if _en_curso >= settings.PASSWORD_HASH_MAX_COLA:
+        raise HTTPException(503, "Servidor ocupado, reintentá en unos segundos", headers={"Retry-After": "2"})
+    _en_curso += 1
+    try:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(_get_executor(), fn, *args)
+        except BrokenProcessPool:
+            # un hijo murió (OOM, kill): seguimos con threads
+            log.error("Pool de procesos de hashing roto; paso a threads")
+            _executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="pwd-hash")
+            return await loop.run_in_executor(_executor, fn, *args)
+    finally:
+        _en_curso -= 1
+
+
+async def hash_password_async(plain: str) -> str:
+    return await _en_pool(hash_password, plain)
+
+
+async def verify_password_async(plain: str, hashed: Optional[str]) -> bool:
+    return await _en_pool(verify_password, plain, hashed)
+
+
 async def verify_and_upgrade(
     db: AsyncSession,
     user: ListadoMedico,
@@ -35,10 +106,10 @@ async def verify_and_upgrade(
     stored = (user.hashed_password or "").strip()
 
     # 1) Intento directo con lo que haya guardado (pbkdf2/bcrypt/bcrypt_sha256)
-    if stored and verify_password(pwd, stored):
+    if stored and await verify_password_async(pwd, stored):
         # Si verificó y el hash está deprecado/antiguo → migrar a pbkdf2
         if needs_update(stored):
-            user.hashed_password = hash_password(pwd)
+            user.hashed_password = await hash_password_async(pwd)
             db.add(user)
             await db.commit()
         return True
@@ -47,7 +118,7 @@ async def verify_and_upgrade(
     if allow_first_time_by_matricula:
         matricula = (str(user.MATRICULA_PROV or "")).strip()
         if matricula and pwd == matricula:
-            user.hashed_password = hash_password(pwd)
+            user.hashed_password = await hash_password_async(pwd)
             db.add(user)
             await db.commit()
             return True
@@ -1,7 +1,12 @@
 # cmc_api/app/core/security.py
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+from typing import Tuple
 from jose import jwt
 from app.core.config import settings
+from app.auth import permisos_registro
 
 def _now_utc():
     return datetime.now(timezone.utc)
@@ -16,12 +21,17 @@ def create_access_token(*, sub: str | int, scopes: list[str] = None, role: str |
     payload = {
         "sub": str(sub),
         "type": "access",
-        "scopes": scopes or [],
         "role": role, 
         "iat": _ts(now),            # emitido en
         "nbf": _ts(now),            # no válido antes de
         "exp": _ts(exp),            # vence en
     }
+    # scopes como bitmask de permissions.id (pv/pm); si el registro no está cargado, en lista
+    compacto = permisos_registro.codificar(scopes or []) if settings.JWT_SCOPES_BITMASK else None
+    if compacto:
+        payload["pv"], payload["pm"] = compacto
+    else:
+        payload["scopes"] = scopes or []
     return jwt.encode(payload, settings.JWT_SECRET.get_secret_value(), algorithm=settings.JWT_ALG)
 
 def create_refresh_token(sub: str, jti: str):
@@ -39,3 +49,27 @@ def create_refresh_token(sub: str, jti: str):
 
 def decode_token(token: str) -> dict:
     return jwt.decode(token, settings.JWT_SECRET.get_secret_value(), algorithms=[settings.JWT_ALG], options={"leeway": 15})
+
+
+# Access tokens ya verificados: sha256(token) -> (payload, exp). Un token adulterado tiene otro
+# digest y pasa por la verificación completa; pasado `exp` la entrada se descarta y decode_token
+# decide (leeway incluido).
+_verificados: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+
+def decode_token_cached(token: str) -> dict:
+    """decode_token con LRU de tokens verificados. El payload es compartido: no modificarlo."""
+    clave = hashlib.sha256(token.encode("utf-8")).digest()
+    hit = _verificados.get(clave)
+    if hit is not None:
+        if hit[1] > time.time():
+            _verificados.move_to_end(clave)
+            return hit[0]
+        del _verificados[clave]
+
+    payload = decode_token(token)
+    exp = payload.get("exp")
+    if settings.JWT_CACHE_MAX_ENTRADAS > 0 and isinstance(exp, (int, float)):
+        _verificados[clave] = (payload, float(exp))
+        while len(_verificados) > settings.JWT_CACHE_MAX_ENTRADAS:
+            _verificados.popitem(last=False)
+    return payload
@@ -1,13 +1,108 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+"""
+Engines y sesiones.
+
+- Primario (AsyncSessionLocal / get_db): lecturas y escrituras.
+- Réplica de lectura opcional (ReadSessionLocal / get_read_db): listados, reportes y
+  exportaciones que toleran unos segundos de atraso. Sin MYSQL_READ_HOST / DB_READ_URL
+  ambos apuntan al mismo engine.
+- Pool (tamaño, overflow, timeout, recycle, pre-ping) y echo salen de Settings.
+- Métricas por pool: espera para obtener conexión y utilización, ver pool_metricas().
+"""
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings   # <-- importas aquí
 
+
+class PoolMetricas:
+    """Checkouts y su espera (incluye abrir conexión nueva cuando hay overflow)."""
+
+    def __init__(self, nombre: str) -> None:
+        self.nombre = nombre
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self._esperas: Deque[float] = deque(maxlen=1024)   # últimas, para percentiles
+
+    def registrar(self, seg: float) -> None:
+        self.checkouts += 1
+        self.espera_total += seg
+        self.espera_max = max(self.espera_max, seg)
+        self._esperas.append(seg)
+
+    def resumen(self, pool: Any) -> Dict[str, Any]:
+        esperas = sorted(self._esperas)
+
+        def pct(p: float) -> float:
+            return round(esperas[int(p / 100 * (len(esperas) - 1))] * 1000, 2) if esperas else 0.0
+
+        capacidad = pool.size() + settings.DB_MAX_OVERFLOW
+        en_uso = pool.checkedout()
+        return {
+            "pool_size": pool.size(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "en_uso": en_uso,
+            "libres": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "utilizacion": round(en_uso / capacidad, 3) if capacidad else 0.0,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "espera_media_ms": round(self.espera_total / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+            "espera_p50_ms": pct(50),
+            "espera_p99_ms": pct(99),
+            "espera_max_ms": round(self.espera_max * 1000, 2),
+        }
+
+
+class _PoolMedido(AsyncAdaptedQueuePool):
+    metricas: Optional[PoolMetricas] = None
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self.metricas is not None:
+                self.metricas.timeouts += 1
+            raise
+        finally:
+            if self.metricas is not None:
+                self.metricas.registrar(time.perf_counter() - t0)
+
+    def recreate(self):
+        # engine.dispose() arma un pool nuevo: las métricas siguen
+        nuevo = super().recreate()
+        nuevo.metricas = self.metricas
+        return nuevo
+
+
+def _crear_engine(url: str, nombre: str) -> AsyncEngine:
+    kwargs: Dict[str, Any] = {"future": True, "echo": settings.DB_ECHO}
+    if make_url(url).get_backend_name() != "sqlite":   # sqlite (tests) usa su pool por defecto
+        kwargs.update(
+            poolclass=_PoolMedido,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    eng = create_async_engine(url, **kwargs)
+    if isinstance(eng.sync_engine.pool, _PoolMedido):
+        eng.sync_engine.pool.metricas = PoolMetricas(nombre)
+    return eng
+
+
 # Aquí usas la URL construida en settings:
-engine = create_async_engine(
-    settings.MYSQL_URL,
-    future=True,
-    echo=True      # opcional: para ver en consola las consultas SQL
-)
+engine = _crear_engine(settings.DB_URL or settings.MYSQL_URL, "primario")
+read_engine = _crear_engine(settings.MYSQL_READ_URL, "replica") if settings.MYSQL_READ_URL else engine
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -15,8 +110,38 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False
 )
 
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_read_db():
+    """Sesión de sólo lectura contra la réplica (o el primario si no hay réplica)."""
+    async with ReadSessionLocal() as session:
+        yield session
+
+def sesion_streaming() -> AsyncSession:
+    """
+    Sesión de lectura para el generador de un StreamingResponse (`async with sesion_streaming()`).
+    La de Depends(get_db / get_read_db) se cierra al volver el endpoint, antes de que arranque el
+    body: el generador tiene que abrir la suya y la cierra al terminar.
+    """
+    return ReadSessionLocal()
+
+
+def pool_metricas() -> Dict[str, Dict[str, Any]]:
+    out = {}
+    for nombre, eng in (("primario", engine), ("replica", read_engine)):
+        pool = eng.sync_engine.pool
+        if nombre == "replica" and eng is engine:
+            continue
+        if isinstance(pool, _PoolMedido) and pool.metricas is not None:
+            out[nombre] = pool.metricas.resumen(pool)
+    return out
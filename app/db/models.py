@@ -2,7 +2,7 @@ from typing import Literal, Optional
 import datetime
 import decimal
 
-from sqlalchemy import DECIMAL, JSON, BigInteger, Boolean, Column, Date, DateTime, Enum, ForeignKey, Index, Integer, String, Text, UniqueConstraint, text
+from sqlalchemy import DECIMAL, JSON, BigInteger, Boolean, Column, Computed, Date, DateTime, Enum, ForeignKey, Index, Integer, String, Text, UniqueConstraint, text
 from sqlalchemy.dialects.mysql import INTEGER, LONGTEXT, VARCHAR
 from decimal import Decimal
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
@@ -317,7 +317,12 @@ class ListadoMedico(Base):
         Index('NRO_ESPECIALIDAD3', 'NRO_ESPECIALIDAD3'),
         Index('NRO_ESPECIALIDAD4', 'NRO_ESPECIALIDAD4'),
         Index('NRO_ESPECIALIDAD5', 'NRO_ESPECIALIDAD5'),
-        Index('NRO_SOCIO', 'NRO_SOCIO')
+        Index('NRO_SOCIO', 'NRO_SOCIO'),
+        # búsqueda (app/services/medicos_busqueda.py)
+        Index('ft_medico_busqueda', 'busqueda', mysql_prefix='FULLTEXT', mysql_with_parser='ngram'),
+        Index('idx_medico_nro_socio_txt', 'nro_socio_txt'),
+        Index('idx_medico_matricula_prov_txt', 'matricula_prov_txt'),
+        Index('idx_medico_documento', 'DOCUMENTO'),
     )
 
     ID: Mapped[int] = mapped_column(INTEGER(11), primary_key=True)
@@ -394,6 +399,18 @@ class ListadoMedico(Base):
     attach_cbu                    = Column(String(512), nullable=True)
     attach_dni                    = Column(String(512), nullable=True)
 
+    # columnas generadas (STORED) para la búsqueda: las mantiene MySQL, el ORM nunca las escribe
+    busqueda: Mapped[Optional[str]] = mapped_column(
+        String(240, 'utf8_spanish2_ci'),
+        Computed("LOWER(CONCAT_WS(' ', NOMBRE, apellido, nombre_, MAIL_PARTICULAR))", persisted=True),
+    )
+    nro_socio_txt: Mapped[Optional[str]] = mapped_column(
+        String(11, 'utf8_spanish2_ci'), Computed("CAST(NRO_SOCIO AS CHAR)", persisted=True)
+    )
+    matricula_prov_txt: Mapped[Optional[str]] = mapped_column(
+        String(11, 'utf8_spanish2_ci'), Computed("CAST(MATRICULA_PROV AS CHAR)", persisted=True)
+    )
+
     # Relación 1–N con documentos
     documentos = relationship("Documento", back_populates="medico", cascade="all, delete-orphan")
     hashed_password = Column(String(255), nullable=False)
@@ -932,6 +949,8 @@ class DetalleLiquidacion(AuditMixin,Base):
     medico_id: Mapped[int] = mapped_column(Integer, index=True)
     obra_social_id: Mapped[int] = mapped_column(Integer, index=True)
     prestacion_id: Mapped[str] = mapped_column(String(16))
+    # mismo valor que prestacion_id pero tipado: join indexado contra guardar_atencion.ID (sin CAST)
+    atencion_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     # NUEVO: encadenamiento con el detalle anterior de la misma prestación (si existió)
     prev_detalle_id: Mapped[Optional[int]] = mapped_column(ForeignKey("detalle_liquidacion.id"), nullable=True)
@@ -958,6 +977,7 @@ class DetalleLiquidacion(AuditMixin,Base):
         UniqueConstraint("prestacion_id", "liquidacion_id", "medico_id", name="uq_det_prest_en_liq"),
         Index("idx_det_os_liq_med", "obra_social_id", "liquidacion_id", "medico_id"),
         Index("idx_det_prest", "prestacion_id"),
+        Index("idx_det_atencion", "atencion_id"),
     )
 
 class Debito_Credito(AuditMixin,Base):
@@ -1167,4 +1187,74 @@ class PublicidadMedico(Base):
     adjunto_path: Mapped[str | None] = mapped_column(String(500), nullable=True)
 
     created_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
\ No newline at end of file
+    updated_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class Job(Base):
+    """
+    Trabajos largos (crear/cerrar/refacturar liquidaciones) ejecutados fuera del request.
+    Los workers los toman con SELECT ... FOR UPDATE SKIP LOCKED: un job corre una sola vez
+    aunque haya varios procesos uvicorn. Mientras corre, el worker renueva heartbeat_at.
+    """
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    tipo: Mapped[str] = mapped_column(String(50), nullable=False)
+    estado: Mapped[Literal["pendiente", "en_curso", "ok", "error"]] = mapped_column(
+        Enum("pendiente", "en_curso", "ok", "error", name="job_estado"),
+        nullable=False, default="pendiente", server_default="pendiente",
+    )
+    params: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    resultado: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    progreso_actual: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    progreso_total: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    worker: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    heartbeat_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("idx_jobs_estado_id", "estado", "id"),
+    )
+
+
+class MedicoVencimiento(Base):
+    """
+    Vencimientos de listado_medico (malapraxis / anssal / cobertura) materializados: una fila
+    por (médico, tipo) con fecha. Los filtros "vencida" / "por vencer" son un rango sobre
+    (tipo, fecha_vencimiento) en lugar de recorrer listado_medico. Ver app/services/vencimientos.py.
+    """
+    __tablename__ = "medico_vencimiento"
+
+    medico_id: Mapped[int] = mapped_column(
+        INTEGER(11), ForeignKey("listado_medico.ID", ondelete="CASCADE"), primary_key=True
+    )
+    tipo: Mapped[Literal["malapraxis", "anssal", "cobertura"]] = mapped_column(
+        Enum("malapraxis", "anssal", "cobertura", name="vencimiento_tipo"), primary_key=True
+    )
+    fecha_vencimiento: Mapped[datetime.date] = mapped_column(Date, nullable=False)
+
+    __table_args__ = (
+        Index("idx_venc_tipo_fecha", "tipo", "fecha_vencimiento", "medico_id"),
+    )
+
+
+class MantenimientoCheckpoint(Base):
+    """
+    Avance de los backfills de mantenimiento (app/services/mantenimiento.py): último ID
+    procesado por tarea, para retomar donde quedó si el proceso se corta.
+    """
+    __tablename__ = "mantenimiento_checkpoint"
+
+    tarea: Mapped[str] = mapped_column(String(100), primary_key=True)
+    ultimo_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    procesados: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    actualizados: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    terminado: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=text("0"))
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
@@ -4,14 +4,29 @@ from app.api.routes import api_router
 from app.core.config import settings
 from app.auth.router import router as auth_router
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+from app.services.jobs import detener_workers, iniciar_workers
+from app.services import medicos_autocomplete
+from app.auth import permisos_registro
+from app.core.passwords import cerrar_pool
 
 import os
 os.environ.setdefault("PASSLIB_BCRYPT_MINIMAL", "1")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    iniciar_workers()
+    await medicos_autocomplete.iniciar()
+    await permisos_registro.iniciar()
+    yield
+    await detener_workers()
+    cerrar_pool()
+
 app = FastAPI(
     title="CMC API",
     version="1.0",
     openapi_url="/openapi.json",
+    lifespan=lifespan,
 )
 
 app.include_router(api_router, prefix="/api")
@@ -23,6 +38,6 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["Content-Type", "Authorization", "X-CSRF-Token"],
-    expose_headers=["X-Total-Count", "Content-Range", "X-Offset", "X-Limit"],
+    expose_headers=["X-Total-Count", "Content-Range", "X-Offset", "X-Limit", "X-Next-Cursor"],
 )
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
\ No newline at end of file
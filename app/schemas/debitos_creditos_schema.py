@@ -77,4 +77,22 @@ class DebCreByDetalleRecalcOut(BaseModel):
     det_id: int
     debito_credito_id: Optional[int] = None
     row: DebCreRowOut
-    resumen: DebCreResumenOut
\ No newline at end of file
+    resumen: DebCreResumenOut
+
+# ---- Importación masiva ----
+class DebCreImportRowOut(BaseModel):
+    fila: int
+    prestacion_id: Optional[str] = None
+    detalle_id: Optional[int] = None
+    status: Literal["ok", "error"]
+    accion: Optional[Literal["alta", "modificacion", "baja", "sin_cambios"]] = None
+    debito_credito_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class DebCreImportOut(BaseModel):
+    liquidacion_id: int
+    procesadas: int
+    aceptadas: int
+    rechazadas: int
+    filas: list[DebCreImportRowOut]
+    resumen: DebCreResumenOut
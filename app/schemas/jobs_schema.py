@@ -0,0 +1,27 @@
+from __future__ import annotations
+from typing import Any, Dict, Literal, Optional
+import datetime
+
+from pydantic import BaseModel
+
+
+class JobEnqueued(BaseModel):
+    job_id: int
+    estado: Literal["pendiente", "en_curso", "ok", "error"]
+
+
+class JobRead(BaseModel):
+    id: int
+    tipo: str
+    estado: Literal["pendiente", "en_curso", "ok", "error"]
+    progreso_actual: int
+    progreso_total: Optional[int] = None
+    resultado: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime.datetime
+    started_at: Optional[datetime.datetime] = None
+    heartbeat_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -157,4 +157,15 @@ class DetalleVistaRow(BaseModel):
 class RefacturarPayload(BaseModel):
     nro_liquidacion: str
 
+class GenerarLiquidacionItem(BaseModel):
+    obra_social_id: int
+    periodo: str
+    status: Literal["ok", "error"]
+    liquidacion_id: Optional[int] = None
+    nro_liquidacion: Optional[str] = None
+    total_bruto: Optional[Decimal] = None
+    total_debitos: Optional[Decimal] = None
+    total_neto: Optional[Decimal] = None
+    detail: Optional[str] = None
+
 
@@ -1,14 +1,26 @@
+"""
+Backfill de listado_medico: conceps_espec por defecto y hashed_password = hash(MATRICULA_PROV)
+para quien no tiene hash. Corre sobre app/services/mantenimiento.py (keyset por ID, checkpoint,
+pool de procesos para el pbkdf2, UPDATE por lotes):
+
+    python -m app.scripts.backfill_medicos [--dry-run] [--batch 500] [--workers N] [--reiniciar]
+
+Si se corta, volver a correrlo sigue desde el último lote commiteado.
+"""
+import argparse
 import asyncio
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Any, Dict
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Sequence
 
-from app.db.database import get_db
-from app.db.models import ListadoMedico
 from app.core.passwords import hash_password
+from app.db.models import ListadoMedico
+from app.services import mantenimiento
 
 DEFAULT_JSON: Dict[str, Any] = {"espec": [], "conceps": []}
 
+TAREA = "backfill_medicos"
+
+
 def needs_json_fix(v) -> bool:
     if v is None:
         return True
@@ -19,55 +31,47 @@ def needs_json_fix(v) -> bool:
         return not all(k in v for k in ("espec", "conceps"))
     return True
 
+
 def looks_hashed(v: str | None) -> bool:
     if not v or not isinstance(v, str):
         return False
-    # heurística simple: bcrypt/argon
-    return v.startswith("$2a$") or v.startswith("$2b$") or v.startswith("$2y$") or v.startswith("$argon2")
-
-async def run():
-    async with get_db() as db:
-        BATCH = 500
-        offset = 0
-        total_updates = 0
-
-        while True:
-            rows = (await db.execute(
-                select(ListadoMedico).order_by(ListadoMedico.ID).offset(offset).limit(BATCH)
-            )).scalars().all()
-            if not rows:
-                break
-
-            changed = 0
-            for m in rows:
-                # 1) conceps_espec
-                if needs_json_fix(getattr(m, "CONCEPS_ESPEC", None) or getattr(m, "conceps_espec", None)):
-                    # acepta mayúsculas/minúsculas según tu modelo
-                    if hasattr(m, "conceps_espec"):
-                        m.conceps_espec = DEFAULT_JSON
-                    else:
-                        m.CONCEPS_ESPEC = DEFAULT_JSON
-                    changed += 1
-
-                # 2) hashed_password desde MATRICULA_PROV
-                hp = getattr(m, "hashed_password", None) or getattr(m, "HASHED_PASSWORD", None)
-                if not looks_hashed(hp):
-                    raw = getattr(m, "MATRICULA_PROV", None) or getattr(m, "matricula_prov", None)
-                    if raw:
-                        new_hash = hash_password(str(raw))
-                        if hasattr(m, "hashed_password"):
-                            m.hashed_password = new_hash
-                        else:
-                            m.HASHED_PASSWORD = new_hash
-                        changed += 1
-
-            if changed:
-                await db.commit()
-                total_updates += changed
-
-            offset += BATCH
-
-        print(f"Backfill completo. Registros actualizados: {total_updates}")
+    # heurística simple: pbkdf2 (el esquema actual), bcrypt/argon
+    return v.startswith(("$pbkdf2", "$2a$", "$2b$", "$2y$", "$argon2"))
+
+
+async def procesar(filas: Sequence[Any], pool: Executor) -> List[Dict[str, Any]]:
+    cambios: Dict[int, Dict[str, Any]] = {}
+    a_hashear: List[tuple[int, str]] = []
+    for medico_id, conceps, hashed, matricula in filas:
+        # 1) conceps_espec
+        if needs_json_fix(conceps):
+            cambios[medico_id] = {"conceps_espec": DEFAULT_JSON}
+        # 2) hashed_password desde MATRICULA_PROV
+        if not looks_hashed(hashed) and matricula:
+            a_hashear.append((medico_id, str(matricula)))
+
+    hashes = await mantenimiento.en_pool(pool, hash_password, [raw for _, raw in a_hashear])
+    for (medico_id, _), h in zip(a_hashear, hashes):
+        cambios.setdefault(medico_id, {})["hashed_password"] = h
+    return [{"ID": medico_id, **c} for medico_id, c in cambios.items()]
+
+
+async def run(batch: int, workers: int | None, dry_run: bool, reiniciar: bool) -> None:
+    M = ListadoMedico
+    tarea = mantenimiento.Tarea(
+        nombre=TAREA,
+        modelo=M,
+        columnas=(M.conceps_espec, M.hashed_password, M.MATRICULA_PROV),
+        procesar=procesar,
+    )
+    await mantenimiento.correr(tarea, batch=batch, workers=workers, dry_run=dry_run, reiniciar=reiniciar)
+
 
 if __name__ == "__main__":
-    asyncio.run(run())
\ No newline at end of file
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batch", type=int, default=500)
+    ap.add_argument("--workers", type=int, default=None, help="procesos para el hashing (default: CPUs)")
+    ap.add_argument("--dry-run", action="store_true", help="calcula sin escribir ni mover el checkpoint")
+    ap.add_argument("--reiniciar", action="store_true", help="ignora el checkpoint y arranca desde ID 0")
+    args = ap.parse_args()
+    asyncio.run(run(args.batch, args.workers, args.dry_run, args.reiniciar))
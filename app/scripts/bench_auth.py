@@ -0,0 +1,74 @@
+"""
+Benchmark del costo por request de la dependencia de auth (get_current_user + require_scope),
+sin base: el registro de permisos se arma con permisos de mentira.
+
+  - antes  : decode_token (HMAC + JSON) en cada request y scopes en lista (búsqueda lineal)
+  - después: LRU de tokens verificados + bitmask pm/pv decodificado a frozenset
+
+    python -m app.scripts.bench_auth --permisos 60 --scopes 40 --n 20000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.auth import permisos_registro
+from app.auth.deps import get_current_user, require_scope
+from app.core import security
+from app.core.config import settings
+
+
+def _percentil(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+async def _medir(fn: Callable[[], Awaitable[None]], n: int) -> List[float]:
+    lat = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await fn()
+        lat.append((time.perf_counter() - t0) * 1e6)
+    return lat
+
+
+async def run(permisos: int, scopes: int, n: int) -> None:
+    codigos = [f"modulo{i // 5}:accion{i % 5}" for i in range(permisos)]
+    permisos_registro.armar(enumerate(codigos, start=1))
+    del_usuario = sorted(codigos[:scopes])
+    scope = del_usuario[-1]          # el peor caso para la lista
+
+    settings.JWT_SCOPES_BITMASK = False
+    tok_lista = security.create_access_token(sub="1234", scopes=del_usuario, role="Medico")
+    settings.JWT_SCOPES_BITMASK = True
+    tok_mask = security.create_access_token(sub="1234", scopes=del_usuario, role="Medico")
+
+    async def antes():
+        data = security.decode_token(tok_lista)
+        if scope not in (data.get("scopes") or []):
+            raise RuntimeError
+
+    checker = require_scope(scope)
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=tok_mask)
+
+    async def despues():
+        checker(await get_current_user(creds))
+
+    print(f"{permisos} permisos, {scopes} del usuario, {n} requests")
+    print(f"token: lista {len(tok_lista)} bytes, bitmask {len(tok_mask)} bytes")
+    print(f"{'modo':<8} {'p50 µs':>8} {'p99 µs':>8} {'media µs':>9}")
+    for nombre, fn in (("antes", antes), ("después", despues)):
+        lat = await _medir(fn, n)
+        print(f"{nombre:<8} {statistics.median(lat):>8.1f} {_percentil(lat, 99):>8.1f} {statistics.fmean(lat):>9.1f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--permisos", type=int, default=60)
+    ap.add_argument("--scopes", type=int, default=40)
+    ap.add_argument("--n", type=int, default=20000)
+    args = ap.parse_args()
+    asyncio.run(run(args.permisos, args.scopes, args.n))
@@ -0,0 +1,108 @@
+"""
+Benchmark de la búsqueda de médicos: ILIKE '%q%' (como era antes) vs FULLTEXT ngram + prefijos.
+
+Arma términos como los del type-ahead (prefijos de 2..6 letras de nombres reales y prefijos
+de nro socio / documento), corre cada consulta (listado de 50 + count, como el front) y
+reporta p50 / p99 en ms y cuántos términos devolvieron distinta cantidad de filas.
+
+    python -m app.scripts.bench_busqueda_medicos --terminos 200 --repeticiones 3
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Callable, List, Optional
+
+from sqlalchemy import String, cast, func, or_, select
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db.database import AsyncSessionLocal
+from app.db.models import ListadoMedico
+from app.services.medicos_busqueda import condicion_busqueda
+
+M = ListadoMedico
+Filtro = Callable[[str], Optional[ColumnElement[bool]]]
+
+
+def filtro_ilike(q: str) -> ColumnElement[bool]:
+    like = f"%{q}%"
+    return or_(
+        M.NOMBRE.ilike(like),
+        cast(M.NRO_SOCIO, String).ilike(like),
+        cast(M.MATRICULA_PROV, String).ilike(like),
+        cast(M.DOCUMENTO, String).ilike(like),
+        M.MAIL_PARTICULAR.ilike(like),
+    )
+
+
+async def _terminos(n: int) -> List[str]:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(M.NOMBRE, M.NRO_SOCIO, M.DOCUMENTO).order_by(func.rand()).limit(n)
+        )).all()
+    out: List[str] = []
+    for nombre, socio, doc in rows:
+        r = random.random()
+        if r < 0.6 and nombre:
+            palabra = random.choice(nombre.split() or [nombre])
+            out.append(palabra[: random.randint(2, 6)].lower())
+        elif r < 0.8 and socio:
+            s = str(socio)
+            out.append(s[: random.randint(1, len(s))])
+        elif doc and doc.strip("0"):
+            out.append(doc[: random.randint(3, len(doc))])
+    return out
+
+
+def _percentil(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+async def _medir(filtro: Filtro, terminos: List[str], repeticiones: int) -> tuple[List[float], List[int]]:
+    tiempos: List[float] = []
+    cantidades: List[int] = []
+    async with AsyncSessionLocal() as db:
+        for t in terminos:
+            cond = filtro(t)
+            for _ in range(repeticiones):
+                t0 = time.perf_counter()
+                await db.execute(select(M.ID, M.NOMBRE).where(cond).order_by(M.NOMBRE).limit(50))
+                total = (await db.execute(select(func.count()).select_from(M).where(cond))).scalar_one()
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            cantidades.append(int(total))
+    return tiempos, cantidades
+
+
+async def run(n: int, repeticiones: int) -> None:
+    terminos = await _terminos(n)
+    if not terminos:
+        print("listado_medico vacío")
+        return
+
+    resultados = {}
+    for nombre, filtro in (("ilike", filtro_ilike), ("fulltext", condicion_busqueda)):
+        resultados[nombre] = await _medir(filtro, terminos, repeticiones)
+
+    print(f"{len(terminos)} términos x {repeticiones} repeticiones (listado 50 + count)")
+    print(f"{'método':<10} {'p50 ms':>8} {'p99 ms':>8} {'media ms':>9}")
+    for nombre, (tiempos, _) in resultados.items():
+        print(f"{nombre:<10} {_percentil(tiempos, 50):>8.1f} {_percentil(tiempos, 99):>8.1f} "
+              f"{statistics.fmean(tiempos):>9.1f}")
+
+    # los dígitos pasan de "contiene" a "empieza con": es esperable que difieran algunos
+    distintos = [
+        (t, a, b) for t, a, b in zip(terminos, resultados["ilike"][1], resultados["fulltext"][1]) if a != b
+    ]
+    print(f"términos con distinta cantidad de resultados: {len(distintos)}")
+    for t, a, b in distintos[:10]:
+        print(f"  {t!r}: ilike={a} fulltext={b}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--terminos", type=int, default=200)
+    ap.add_argument("--repeticiones", type=int, default=3)
+    args = ap.parse_args()
+    asyncio.run(run(args.terminos, args.repeticiones))
@@ -0,0 +1,119 @@
+"""
+Benchmark de construir_detalles_y_totales: modo bulk (INSERT ... SELECT) vs. por fila (ORM).
+
+Siembra atenciones sintéticas para una obra social ficticia, construye la liquidación
+con cada modo, compara que los detalles generados sean idénticos y borra todo al final.
+
+    python -m app.scripts.bench_construir_detalles --sizes 10000 100000 1000000
+    python -m app.scripts.bench_construir_detalles --sizes 10000 --modos bulk fila
+
+¡Usar contra una base de pruebas! Escribe y borra filas reales.
+"""
+import argparse
+import asyncio
+import random
+import time
+from decimal import Decimal
+
+from sqlalchemy import delete, insert, select
+
+from app.db.database import AsyncSessionLocal
+from app.db.models import DetalleLiquidacion, GuardarAtencion, Liquidacion, LiquidacionResumen
+from app.services.liquidaciones_calc import construir_detalles_y_totales
+
+OS_BENCH = 999_001        # NRO_OBRA_SOCIAL ficticio, no debe existir en producción
+ANIO, MES = 1999, 1
+CHUNK = 5_000
+
+
+async def sembrar_atenciones(n: int) -> None:
+    rnd = random.Random(n)
+    async with AsyncSessionLocal() as db:
+        for start in range(0, n, CHUNK):
+            rows = []
+            for _ in range(min(CHUNK, n - start)):
+                con_ay = rnd.random() < 0.3
+                con_ay2 = con_ay and rnd.random() < 0.3
+                rows.append({
+                    "NRO_SOCIO": rnd.randint(1, 3000),
+                    "NRO_OBRA_SOCIAL": OS_BENCH,
+                    "ANIO_PERIODO": ANIO,
+                    "MES_PERIODO": MES,
+                    "EXISTE": "S",
+                    "CANTIDAD": rnd.choice((0, 1, 1, 2)),
+                    "CANT_TRATAMIENTO": rnd.choice((0, 1, 1, 3)),
+                    "VALOR_CIRUJIA": Decimal(rnd.randint(0, 500_000)) / 100,
+                    "AYUDANTE": rnd.randint(3001, 6000) if con_ay else 0,
+                    "VALOR_AYUDANTE": Decimal(rnd.randint(0, 100_000)) / 100 if con_ay else Decimal("0"),
+                    "AYUDANTE_2": rnd.randint(6001, 9000) if con_ay2 else 0,
+                    "VALOR_AYUDANTE_2": Decimal(rnd.randint(0, 50_000)) / 100 if con_ay2 else Decimal("0"),
+                })
+            await db.execute(insert(GuardarAtencion), rows)
+        await db.commit()
+
+
+async def limpiar() -> None:
+    async with AsyncSessionLocal() as db:
+        liq_ids = select(Liquidacion.id).where(Liquidacion.obra_social_id == OS_BENCH).scalar_subquery()
+        await db.execute(delete(DetalleLiquidacion).where(DetalleLiquidacion.liquidacion_id.in_(liq_ids)))
+        await db.execute(delete(Liquidacion).where(Liquidacion.obra_social_id == OS_BENCH))
+        await db.execute(delete(GuardarAtencion).where(GuardarAtencion.NRO_OBRA_SOCIAL == OS_BENCH))
+        await db.execute(delete(LiquidacionResumen).where(LiquidacionResumen.anio == ANIO, LiquidacionResumen.mes == MES))
+        await db.commit()
+
+
+async def correr_modo(bulk: bool) -> tuple[float, list[tuple]]:
+    async with AsyncSessionLocal() as db:
+        res = LiquidacionResumen(anio=ANIO, mes=MES)
+        db.add(res)
+        await db.flush()
+        liq = Liquidacion(
+            resumen_id=res.id, obra_social_id=OS_BENCH, anio_periodo=ANIO, mes_periodo=MES,
+            version=0, nro_liquidacion="000-BENCH",
+        )
+        db.add(liq)
+        await db.commit()
+
+        t0 = time.perf_counter()
+        await construir_detalles_y_totales(db, liq.id, bulk=bulk)
+        elapsed = time.perf_counter() - t0
+
+        filas = (await db.execute(
+            select(
+                DetalleLiquidacion.prestacion_id, DetalleLiquidacion.medico_id,
+                DetalleLiquidacion.prev_detalle_id, DetalleLiquidacion.importe,
+            ).where(DetalleLiquidacion.liquidacion_id == liq.id)
+        )).all()
+
+        # dejar la OS limpia para el siguiente modo (mantiene las atenciones)
+        await db.execute(delete(DetalleLiquidacion).where(DetalleLiquidacion.liquidacion_id == liq.id))
+        await db.execute(delete(Liquidacion).where(Liquidacion.id == liq.id))
+        await db.execute(delete(LiquidacionResumen).where(LiquidacionResumen.id == res.id))
+        await db.commit()
+    return elapsed, sorted(tuple(f) for f in filas)
+
+
+async def run(sizes: list[int], modos: list[str]) -> None:
+    for n in sizes:
+        await limpiar()
+        await sembrar_atenciones(n)
+        try:
+            resultados = {}
+            for modo in modos:
+                elapsed, filas = await correr_modo(bulk=(modo == "bulk"))
+                resultados[modo] = filas
+                print(f"n={n:>9,} modo={modo:<5} detalles={len(filas):>9,} "
+                      f"t={elapsed:8.2f}s atenciones/s={n / elapsed:12,.0f}")
+            if len(resultados) == 2:
+                iguales = resultados["bulk"] == resultados["fila"]
+                print(f"n={n:>9,} paridad bulk/fila: {'OK' if iguales else 'DIFERENTE'}")
+        finally:
+            await limpiar()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--modos", nargs="+", choices=["bulk", "fila"], default=["bulk", "fila"])
+    args = ap.parse_args()
+    asyncio.run(run(args.sizes, args.modos))
@@ -0,0 +1,104 @@
+"""
+Benchmark de formatos de exportación: xlsx (write_only), csv, csv.gz y parquet.
+
+Mide filas/s, tamaño del archivo y pico de memoria Python (tracemalloc, en una corrida aparte
+para no distorsionar el tiempo) sobre la hoja Prestaciones.
+
+    python -m app.scripts.bench_exports --filas 100000            # filas sintéticas
+    python -m app.scripts.bench_exports --liquidacion-id 123      # desde la base
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Sequence
+
+from app.services.exports import iter_archivo, iter_csv, parquet_spooled_async, pa, xlsx_spooled_async
+from app.services.exports_db import COLS_PRESTACIONES, TIPOS_COLUMNAS, elegir_hoja, hojas_liquidacion_db
+
+Fuente = Callable[[], Awaitable[tuple[List[str], AsyncIterator[Sequence[Any]]]]]
+
+
+def _fuente_sintetica(n: int) -> Fuente:
+    async def filas() -> AsyncIterator[Sequence[Any]]:
+        for i in range(n):
+            yield [
+                i, 1000 + i % 3000, f"MEDICO {i % 3000}", 5000 + i % 3000, str(700000 + i), "2025-01-15", "420101",
+                f"{i:010d}", f"AFILIADO {i}", "1-1", 100.0, 1234.56, 0.0, 0.0,
+                1234.56, "N", 0.0, None, 1234.56,
+            ]
+
+    async def cargar():
+        return COLS_PRESTACIONES, filas()
+    return cargar
+
+
+def _fuente_db(liquidacion_id: int) -> Fuente:
+    from app.db.database import AsyncSessionLocal
+
+    async def cargar():
+        db = AsyncSessionLocal()   # queda abierta durante la corrida; el proceso termina al final
+        _, hojas = await hojas_liquidacion_db(db, liquidacion_id)
+        _, encabezado, filas = elegir_hoja(hojas, "prestaciones")
+        return encabezado, filas
+    return cargar
+
+
+async def _xlsx(encabezado, filas) -> int:
+    fh = await xlsx_spooled_async([("Prestaciones", encabezado, filas)])
+    return sum(len(b) for b in iter_archivo(fh))
+
+
+async def _csv(encabezado, filas, comprimir: bool = False) -> int:
+    return sum([len(b) async for b in iter_csv(encabezado, filas, comprimir=comprimir)])
+
+
+async def _parquet(encabezado, filas) -> int:
+    fh = await parquet_spooled_async(encabezado, filas, TIPOS_COLUMNAS)
+    return sum(len(b) for b in iter_archivo(fh))
+
+
+async def _contadas(filas: AsyncIterator[Sequence[Any]], contador: List[int]) -> AsyncIterator[Sequence[Any]]:
+    async for row in filas:
+        contador[0] += 1
+        yield row
+
+
+async def run(fuente: Fuente) -> None:
+    formatos = {
+        "xlsx": _xlsx,
+        "csv": _csv,
+        "csv.gz": lambda e, f: _csv(e, f, comprimir=True),
+        "parquet": _parquet,
+    }
+    if pa is None:
+        formatos.pop("parquet")
+        print("(pyarrow no instalado: se omite parquet)")
+
+    print(f"{'formato':<8} {'seg':>8} {'filas/s':>10} {'MB':>8} {'pico MB':>8}")
+    for nombre, fn in formatos.items():
+        encabezado, filas = await fuente()
+        n = [0]
+        t0 = time.perf_counter()
+        size = await fn(encabezado, _contadas(filas, n))
+        seg = time.perf_counter() - t0
+
+        encabezado, filas = await fuente()
+        tracemalloc.start()
+        await fn(encabezado, filas)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"{nombre:<8} {seg:>8.2f} {n[0] / seg if seg else 0:>10.0f} "
+              f"{size / 1e6:>8.2f} {pico / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--filas", type=int, default=100_000, help="filas sintéticas")
+    ap.add_argument("--liquidacion-id", type=int)
+    args = ap.parse_args()
+    if args.liquidacion_id:
+        asyncio.run(run(_fuente_db(args.liquidacion_id)))
+    else:
+        asyncio.run(run(_fuente_sintetica(args.filas)))
@@ -0,0 +1,76 @@
+"""
+Benchmark del hashing de contraseñas: latencia de "otros requests" mientras corre una ráfaga
+de logins (verify pbkdf2_sha256 de 480k rondas).
+
+Un probe simula un request liviano cada 10 ms y mide cuánto tarda el event loop en
+atenderlo. Se compara:
+  - inline : verify_password directo en el loop (como era antes)
+  - thread : pool de threads
+  - process: pool de procesos
+
+    python -m app.scripts.bench_password_hashing --logins 16 --workers 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from app.core import passwords
+from app.core.config import settings
+
+
+def _percentil(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+async def _probe(stop: asyncio.Event, lat: List[float], intervalo: float = 0.01) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        lat.append((time.perf_counter() - t0 - intervalo) * 1000)
+
+
+async def _rafaga(modo: str, hashed: str, n: int) -> None:
+    if modo == "inline":
+        async def login():
+            passwords.verify_password("secreto123", hashed)
+    else:
+        async def login():
+            await passwords.verify_password_async("secreto123", hashed)
+    await asyncio.gather(*(login() for _ in range(n)))
+
+
+async def run(logins: int, workers: int) -> None:
+    hashed = passwords.hash_password("secreto123")
+    settings.PASSWORD_HASH_WORKERS = workers
+    settings.PASSWORD_HASH_MAX_COLA = max(settings.PASSWORD_HASH_MAX_COLA, logins)
+
+    print(f"{logins} logins concurrentes, {workers} workers")
+    print(f"{'modo':<8} {'ráfaga s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for modo in ("inline", "thread", "process"):
+        if modo != "inline":
+            passwords.cerrar_pool()
+            settings.PASSWORD_HASH_POOL = modo
+            await passwords.verify_password_async("secreto123", hashed)   # calienta el pool
+        lat: List[float] = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(stop, lat))
+        await asyncio.sleep(0.05)
+        t0 = time.perf_counter()
+        await _rafaga(modo, hashed, logins)
+        dur = time.perf_counter() - t0
+        stop.set()
+        await probe
+        print(f"{modo:<8} {dur:>9.2f} {statistics.median(lat):>8.1f} "
+              f"{_percentil(lat, 99):>8.1f} {max(lat):>8.1f}")
+    passwords.cerrar_pool()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--logins", type=int, default=16)
+    ap.add_argument("--workers", type=int, default=2)
+    args = ap.parse_args()
+    asyncio.run(run(args.logins, args.workers))
@@ -0,0 +1,53 @@
+"""
+Paridad del recálculo de `pagado`: UPDATE único (bulk) vs. detalle por detalle.
+
+Corre ambos caminos sobre la misma liquidación dentro de transacciones que se
+descartan (rollback), compara los `pagado` resultantes y mide el tiempo de cada uno.
+
+    python -m app.scripts.check_pagados_liquidacion 123 456
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+
+from app.db.database import AsyncSessionLocal
+from app.db.models import DetalleLiquidacion
+from app.services.liquidaciones import recomputar_pagados_de_liquidacion
+
+
+async def _pagados(liquidacion_id: int, bulk: bool) -> tuple[float, dict[int, object]]:
+    async with AsyncSessionLocal() as db:
+        try:
+            t0 = time.perf_counter()
+            await recomputar_pagados_de_liquidacion(db, liquidacion_id, bulk=bulk)
+            elapsed = time.perf_counter() - t0
+            filas = (await db.execute(
+                select(DetalleLiquidacion.id, DetalleLiquidacion.pagado)
+                .where(DetalleLiquidacion.liquidacion_id == liquidacion_id)
+            )).all()
+            return elapsed, {int(i): p for i, p in filas}
+        finally:
+            await db.rollback()
+
+
+async def run(liquidacion_ids: list[int]) -> int:
+    errores = 0
+    for liq_id in liquidacion_ids:
+        t_bulk, bulk = await _pagados(liq_id, bulk=True)
+        t_fila, fila = await _pagados(liq_id, bulk=False)
+        difs = [i for i in fila if bulk.get(i) != fila[i]]
+        errores += len(difs)
+        print(f"liq={liq_id} detalles={len(fila):,} bulk={t_bulk:.3f}s fila={t_fila:.3f}s "
+              f"diferencias={len(difs)}")
+        for i in difs[:20]:
+            print(f"    det_id={i} bulk={bulk.get(i)} fila={fila[i]}")
+    return errores
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("liquidacion_ids", type=int, nargs="+")
+    args = ap.parse_args()
+    raise SystemExit(1 if asyncio.run(run(args.liquidacion_ids)) else 0)
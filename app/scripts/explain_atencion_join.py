@@ -0,0 +1,78 @@
+"""
+EXPLAIN + tiempos: join por CAST(prestacion_id) vs. join por detalle_liquidacion.atencion_id.
+
+Para cada consulta caliente imprime el plan de MySQL de la forma anterior (CAST) y de la
+nueva (entero indexado), y el tiempo medio de ejecución de cada una.
+
+    python -m app.scripts.explain_atencion_join --liquidacion-id 123 --repeticiones 5
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import String, cast, exists, func, select, text
+from sqlalchemy.dialects import mysql
+
+from app.db.database import AsyncSessionLocal
+from app.db.models import DetalleLiquidacion as DL, GuardarAtencion as GA, Liquidacion
+
+
+def _consultas(liq: Liquidacion) -> dict[str, tuple]:
+    filtros = (
+        GA.NRO_OBRA_SOCIAL == liq.obra_social_id,
+        GA.ANIO_PERIODO == liq.anio_periodo,
+        GA.MES_PERIODO == liq.mes_periodo,
+    )
+
+    def vista(cond):
+        return (
+            select(DL.id, GA.NOMBRE_PRESTADOR, GA.FECHA_PRESTACION, GA.CODIGO_PRESTACION)
+            .select_from(DL).join(GA, cond, isouter=True)
+            .where(DL.liquidacion_id == liq.id)
+        )
+
+    def no_liquidadas(cond):
+        return select(func.count(GA.ID)).where(*filtros, ~exists().where(cond))
+
+    return {
+        "vista_detalles": (
+            vista(DL.prestacion_id == cast(GA.ID, String(16))),
+            vista(DL.atencion_id == GA.ID),
+        ),
+        "excluir_ya_liquidadas": (
+            no_liquidadas(DL.prestacion_id == cast(GA.ID, String)),
+            no_liquidadas(DL.atencion_id == GA.ID),
+        ),
+    }
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+async def run(liquidacion_id: int, repeticiones: int) -> None:
+    async with AsyncSessionLocal() as db:
+        liq = await db.get(Liquidacion, liquidacion_id)
+        if not liq:
+            raise SystemExit(f"Liquidación {liquidacion_id} no encontrada")
+
+        for nombre, (antes, despues) in _consultas(liq).items():
+            print(f"=== {nombre}")
+            for etiqueta, stmt in (("CAST", antes), ("atencion_id", despues)):
+                sql = _sql(stmt)
+                plan = (await db.execute(text("EXPLAIN " + sql))).mappings().all()
+                t0 = time.perf_counter()
+                for _ in range(repeticiones):
+                    (await db.execute(text(sql))).all()
+                ms = (time.perf_counter() - t0) * 1000 / repeticiones
+                print(f"--- {etiqueta}: {ms:.1f} ms promedio")
+                for p in plan:
+                    print(f"    table={p['table']} type={p['type']} key={p['key']} rows={p['rows']} extra={p['Extra']}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--liquidacion-id", type=int, required=True)
+    ap.add_argument("--repeticiones", type=int, default=5)
+    args = ap.parse_args()
+    asyncio.run(run(args.liquidacion_id, args.repeticiones))
@@ -0,0 +1,25 @@
+"""
+Reconstrucción nocturna de medico_vencimiento desde listado_medico (cron):
+
+    python -m app.scripts.reconstruir_vencimientos
+
+Lo que se escribe por el ORM ya se sincroniza en la misma transacción; esto levanta lo que
+entra por fuera (sistema viejo, cargas manuales).
+"""
+import asyncio
+import time
+
+from app.db.database import AsyncSessionLocal
+from app.services.vencimientos import sincronizar
+
+
+async def run() -> None:
+    t0 = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        filas = await sincronizar(db)
+        await db.commit()
+    print(f"medico_vencimiento: {filas} filas en {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
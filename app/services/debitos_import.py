@@ -0,0 +1,403 @@
+"""
+Importación masiva de débitos/créditos (archivos de auditoría de las obras sociales).
+
+Formato (CSV, XLSX o JSON), una fila por prestación. El archivo se lee desde disco (el endpoint
+lo guarda con app/services/uploads.py, con el mismo límite de tamaño que el resto de los uploads):
+    prestacion_id, tipo (d/c/n), monto, observacion
+Opcionales para desambiguar cuando la atención tiene varios actores (ayudantes):
+    medico_id, detalle_id
+
+Todo se resuelve contra UNA liquidación: detalles en una consulta, DC existentes en otra,
+altas/modificaciones/bajas en lotes y totales recalculados una sola vez al final.
+Los detalles se leen con FOR UPDATE: una edición puntual del mismo detalle espera al import.
+Las altas son un INSERT executemany por lote (sin RETURNING en MySQL, el ORM haría un INSERT
+por fila para conocer cada id); los ids se recuperan con una consulta por lote.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, TextIO, Tuple
+
+from fastapi import HTTPException
+from openpyxl import load_workbook
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Debito_Credito, DetalleLiquidacion, Liquidacion
+from app.services.liquidaciones import recomputar_totales_de_liquidacion, recomputar_totales_de_resumen
+
+BATCH = 1000
+
+# encabezado normalizado -> campo
+_ALIAS = {
+    "prestacion_id": "prestacion_id",
+    "prestacion": "prestacion_id",
+    "atencion_id": "prestacion_id",
+    "id_atencion": "prestacion_id",
+    "detalle_id": "detalle_id",
+    "det_id": "detalle_id",
+    "medico_id": "medico_id",
+    "tipo": "tipo",
+    "monto": "monto",
+    "importe": "monto",
+    "observacion": "observacion",
+    "obs": "observacion",
+}
+
+
+# ---------------------------
+# Lectura del archivo
+# ---------------------------
+def _norm_header(h: Any) -> str:
+    s = unicodedata.normalize("NFKD", str(h or "")).encode("ascii", "ignore").decode()
+    s = s.strip().lower().replace(" ", "_").replace("-", "_")
+    return _ALIAS.get(s, s)
+
+
+def _filas_csv(f: TextIO) -> Iterable[Tuple[int, Dict[str, Any]]]:
+    muestra = f.read(4096)
+    f.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(f, dialect)
+    header = [_norm_header(h) for h in next(reader, [])]
+    for n, values in enumerate(reader, start=2):
+        if any((v or "").strip() for v in values):
+            yield n, dict(zip(header, values))
+
+
+def _filas_xlsx(f: BinaryIO) -> Iterable[Tuple[int, Dict[str, Any]]]:
+    wb = load_workbook(f, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [_norm_header(h) for h in next(rows, ())]
+        for n, values in enumerate(rows, start=2):
+            if any(v not in (None, "") for v in values):
+                yield n, dict(zip(header, values))
+    finally:
+        wb.close()
+
+
+def _filas_json(f: TextIO) -> Iterable[Tuple[int, Dict[str, Any]]]:
+    data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("items") or data.get("filas") or []
+    if not isinstance(data, list):
+        raise HTTPException(400, "JSON inválido: se espera una lista de filas")
+    for n, item in enumerate(data, start=1):
+        if isinstance(item, dict):
+            yield n, {_norm_header(k): v for k, v in item.items()}
+
+
+def leer_filas(filename: str, content_type: Optional[str], ruta: Path) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    Devuelve [(nro_fila, {campo: valor})] del archivo en `ruta`, según la extensión original
+    (o el content-type). Es bloqueante: llamarla con asyncio.to_thread.
+    """
+    nombre = (filename or "").lower()
+    ctype = (content_type or "").lower()
+    try:
+        if nombre.endswith(".xlsx") or "spreadsheetml" in ctype:
+            # un file object: con una ruta openpyxl exige la extensión .xlsx
+            with open(ruta, "rb") as f:
+                return list(_filas_xlsx(f))
+        if nombre.endswith(".json") or "json" in ctype:
+            with open(ruta, encoding="utf-8-sig") as f:
+                return list(_filas_json(f))
+        if nombre.endswith((".csv", ".txt")) or "csv" in ctype or "text/plain" in ctype:
+            with open(ruta, encoding="utf-8-sig", errors="replace", newline="") as f:
+                return list(_filas_csv(f))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(400, f"No se pudo leer el archivo: {e}")
+    raise HTTPException(415, "Formato no soportado (CSV, XLSX o JSON)")
+
+
+# ---------------------------
+# Validación de filas
+# ---------------------------
+def _monto(v: Any) -> Decimal:
+    if isinstance(v, (int, float, Decimal)):
+        return Decimal(str(v))
+    s = str(v or "").strip().replace("$", "").replace(" ", "")
+    if "," in s and "." in s:
+        # el último separador es el decimal: 1.234,56 | 1,234.56
+        s = s.replace(".", "").replace(",", ".") if s.rfind(",") > s.rfind(".") else s.replace(",", "")
+    elif "," in s:
+        s = s.replace(",", ".")
+    return Decimal(s)
+
+
+def _entero(v: Any) -> Optional[int]:
+    if v is None or str(v).strip() == "":
+        return None
+    if isinstance(v, float):
+        return int(v)
+    s = str(v).strip()
+    digits = ""
+    for ch in s:
+        if ch.isdigit():
+            digits += ch
+        else:
+            break
+    if not digits:
+        raise ValueError(s)
+    return int(digits)
+
+
+def _validar(fila: int, raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Fila normalizada; si no es válida, 'error' trae el motivo."""
+    out: Dict[str, Any] = {
+        "fila": fila,
+        "prestacion_id": None if raw.get("prestacion_id") is None else str(raw.get("prestacion_id")).strip(),
+        "error": None,
+    }
+    try:
+        out["atencion_id"] = _entero(raw.get("prestacion_id"))
+        out["detalle_id"] = _entero(raw.get("detalle_id"))
+        out["medico_id"] = _entero(raw.get("medico_id"))
+    except ValueError as e:
+        out["error"] = f"Identificador no numérico: {e}"
+        return out
+    if out["atencion_id"] is None and out["detalle_id"] is None:
+        out["error"] = "Falta prestacion_id"
+        return out
+
+    tipo = str(raw.get("tipo") or "").strip().lower()[:1]
+    if tipo not in ("d", "c", "n"):
+        out["error"] = "tipo debe ser d, c o n"
+        return out
+    out["tipo"] = tipo
+
+    try:
+        monto = _monto(raw.get("monto")) if tipo != "n" else Decimal("0")
+    except (InvalidOperation, ValueError):
+        out["error"] = "monto inválido"
+        return out
+    if tipo != "n" and monto <= 0:
+        out["error"] = "monto debe ser mayor a 0 (use tipo n para quitar)"
+        return out
+    out["monto"] = monto.quantize(Decimal("0.01"))
+
+    obs = raw.get("observacion")
+    out["observacion"] = str(obs).strip()[:255] if obs not in (None, "") else None
+    return out
+
+
+def _lotes(items: List[Any], n: int = BATCH) -> Iterable[List[Any]]:
+    for i in range(0, len(items), n):
+        yield items[i:i + n]
+
+
+# ---------------------------
+# Importación
+# ---------------------------
+async def _detalles_de(db: AsyncSession, liquidacion_id: int, filas: List[Dict[str, Any]]):
+    DL = DetalleLiquidacion
+    atenciones = sorted({f["atencion_id"] for f in filas if f["atencion_id"] is not None})
+    det_ids = sorted({f["detalle_id"] for f in filas if f["detalle_id"] is not None})
+    cols = (DL.id, DL.atencion_id, DL.medico_id, DL.debito_credito_id)
+
+    por_id: Dict[int, Any] = {}
+    for lote in _lotes(atenciones):
+        for r in (await db.execute(
+            select(*cols).where(DL.liquidacion_id == liquidacion_id, DL.atencion_id.in_(lote)).with_for_update()
+        )).all():
+            por_id[r.id] = r
+    for lote in _lotes(det_ids):
+        for r in (await db.execute(
+            select(*cols).where(DL.liquidacion_id == liquidacion_id, DL.id.in_(lote)).with_for_update()
+        )).all():
+            por_id[r.id] = r
+
+    por_atencion: Dict[int, List[Any]] = {}
+    for r in por_id.values():
+        por_atencion.setdefault(r.atencion_id, []).append(r)
+    return por_id, por_atencion
+
+
+async def _insertar_altas(
+    db: AsyncSession,
+    valores: List[Dict[str, Any]],
+    obra_social_id: int,
+    periodo: str,
+) -> List[int]:
+    """
+    INSERT executemany de `valores` y sus ids en el mismo orden. Los ids salen de una consulta:
+    DC de estas atenciones/período con id mayor al máximo previo. Una atención con varios
+    actores puede tener varias altas en el lote: dentro de un INSERT los ids crecen en el orden
+    de las filas, así que se asignan en orden por atención.
+    """
+    DC = Debito_Credito
+    max_previo = (await db.execute(select(func.coalesce(func.max(DC.id), 0)))).scalar_one()
+    await db.execute(insert(DC), valores)
+
+    atenciones = sorted({v["id_atencion"] for v in valores})
+    ids_por_atencion: Dict[int, List[int]] = {}
+    for dc_id, id_atencion in (await db.execute(
+        select(DC.id, DC.id_atencion)
+        .where(
+            DC.id > max_previo,
+            DC.id_atencion.in_(atenciones),
+            DC.obra_social_id == obra_social_id,
+            DC.periodo == periodo,
+        )
+        .order_by(DC.id)
+    )).all():
+        ids_por_atencion.setdefault(id_atencion, []).append(dc_id)
+
+    ids: List[int] = []
+    for v in valores:
+        pendientes = ids_por_atencion.get(v["id_atencion"])
+        if not pendientes:
+            break
+        ids.append(pendientes.pop(0))
+    if len(ids) != len(valores) or any(ids_por_atencion.values()):
+        # otro proceso insertó DC de las mismas atenciones en el medio: no se puede asignar
+        await db.rollback()
+        raise HTTPException(409, "Débitos/créditos modificados en paralelo; reintentar la importación")
+    return ids
+
+
+async def importar_debitos_creditos(
+    db: AsyncSession,
+    liquidacion_id: int,
+    filas_raw: List[Tuple[int, Dict[str, Any]]],
+    created_by_user: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Aplica las filas sobre la liquidación (abierta) y devuelve el reporte por fila.
+    Las filas rechazadas no impiden aplicar las demás. Commitea.
+    """
+    liq = await db.get(Liquidacion, liquidacion_id)
+    if not liq:
+        raise HTTPException(404, "Liquidación no encontrada")
+    if liq.estado != "A":
+        raise HTTPException(409, "La liquidación está cerrada")
+
+    filas = [_validar(n, raw) for n, raw in filas_raw]
+    validas = [f for f in filas if not f["error"]]
+
+    # 1) detalles de la liquidación, en una pasada
+    por_id, por_atencion = await _detalles_de(db, liq.id, validas)
+    usados: Dict[int, int] = {}
+    for f in validas:
+        if f["detalle_id"] is not None:
+            cands = [por_id[f["detalle_id"]]] if f["detalle_id"] in por_id else []
+            if cands and f["atencion_id"] is not None and cands[0].atencion_id != f["atencion_id"]:
+                cands = []
+        else:
+            cands = por_atencion.get(f["atencion_id"], [])
+        if f["medico_id"] is not None:
+            cands = [c for c in cands if int(c.medico_id) == f["medico_id"]]
+        if not cands:
+            f["error"] = "Prestación inexistente en la liquidación"
+        elif len(cands) > 1:
+            f["error"] = "Prestación con varios actores: indicar medico_id o detalle_id"
+        elif cands[0].id in usados:
+            f["error"] = f"Detalle repetido (ya aplicado en fila {usados[cands[0].id]})"
+        else:
+            f["det"] = cands[0]
+            usados[cands[0].id] = f["fila"]
+
+    aplicables = [f for f in filas if not f["error"]]
+
+    # 2) DC existentes, en una pasada
+    dc_ids = sorted({f["det"].debito_credito_id for f in aplicables if f["det"].debito_credito_id})
+    existentes: Dict[int, Debito_Credito] = {}
+    for lote in _lotes(dc_ids):
+        for dc in (await db.execute(select(Debito_Credito).where(Debito_Credito.id.in_(lote)))).scalars():
+            existentes[dc.id] = dc
+
+    periodo = f"{liq.anio_periodo:04d}-{liq.mes_periodo:02d}"
+    modificar: List[Dict[str, Any]] = []
+    altas: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    bajas: List[int] = []
+    enlaces: List[Dict[str, Any]] = []
+
+    for f in aplicables:
+        det = f["det"]
+        dc = existentes.get(det.debito_credito_id) if det.debito_credito_id else None
+        f["detalle_id"] = det.id
+        if f["tipo"] == "n":
+            if dc:
+                bajas.append(dc.id)
+                enlaces.append({"id": det.id, "debito_credito_id": None})
+                f["accion"] = "baja"
+            else:
+                f["accion"] = "sin_cambios"
+        elif dc:
+            modificar.append({
+                "id": dc.id, "tipo": f["tipo"], "monto": f["monto"], "observacion": f["observacion"],
+                "obra_social_id": liq.obra_social_id, "periodo": periodo,
+            })
+            f["accion"] = "modificacion"
+            f["debito_credito_id"] = dc.id
+        else:
+            altas.append((f, {
+                "tipo": f["tipo"],
+                "id_atencion": det.atencion_id,
+                "obra_social_id": liq.obra_social_id,
+                "periodo": periodo,
+                "monto": f["monto"],
+                "observacion": f["observacion"],
+                "created_by_user": created_by_user,
+            }))
+            f["accion"] = "alta"
+
+    # 3) escritura en lotes
+    for lote in _lotes(modificar):
+        await db.execute(update(Debito_Credito), lote)
+
+    for lote in _lotes(altas):
+        for (f, _), dc_id in zip(lote, await _insertar_altas(db, [v for _, v in lote], liq.obra_social_id, periodo)):
+            f["debito_credito_id"] = dc_id
+            enlaces.append({"id": f["detalle_id"], "debito_credito_id": dc_id})
+
+    for lote in _lotes(enlaces):
+        await db.execute(update(DetalleLiquidacion), lote)
+
+    for lote in _lotes(bajas):
+        await db.execute(delete(Debito_Credito).where(Debito_Credito.id.in_(lote)))
+
+    # 4) totales una sola vez
+    if modificar or altas or bajas:
+        await recomputar_totales_de_liquidacion(db, liq.id)
+        await recomputar_totales_de_resumen(db, liq.resumen_id)
+    await db.commit()
+    await db.refresh(liq)
+
+    reporte = [
+        {
+            "fila": f["fila"],
+            "prestacion_id": f["prestacion_id"],
+            "detalle_id": f.get("detalle_id") if not f["error"] else None,
+            "status": "error" if f["error"] else "ok",
+            "accion": f.get("accion"),
+            "debito_credito_id": f.get("debito_credito_id"),
+            "detail": f["error"],
+        }
+        for f in filas
+    ]
+    aceptadas = sum(1 for r in reporte if r["status"] == "ok")
+    return {
+        "liquidacion_id": liq.id,
+        "procesadas": len(reporte),
+        "aceptadas": aceptadas,
+        "rechazadas": len(reporte) - aceptadas,
+        "filas": reporte,
+        "resumen": {
+            "liquidacion_id": liq.id,
+            "nro_liquidacion": liq.nro_liquidacion,
+            "total_bruto": float(liq.total_bruto or 0),
+            "total_debitos": float(liq.total_debitos or 0),
+            "total_neto": float(liq.total_neto or 0),
+        },
+    }
@@ -1,11 +1,21 @@
-from typing import Any, Dict, List
+from typing import IO, Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from io import BytesIO
+import csv
+import io
+import tempfile
+import zlib
 
+from fastapi.concurrency import run_in_threadpool
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment
 from openpyxl.utils import get_column_letter
 
-
+try:  # opcional: sólo para exportar a Parquet
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = pq = None
 
 
 # ---------------------------
@@ -29,6 +39,326 @@ def _header(ws, row: int, values: List[str]) -> None:
         c.alignment = Alignment(vertical="center")
 
 
+# ---------------------------
+# Escritura en streaming (write_only)
+# ---------------------------
+MUESTRA_ANCHOS = 500                 # filas usadas para estimar anchos de columna
+SPOOL_MAX_BYTES = 8 * 1024 * 1024    # por encima de esto el xlsx se vuelca a disco
+CHUNK_BYTES = 64 * 1024
+
+Hoja = Tuple[str, List[str], Iterable[Sequence[Any]]]   # (título, encabezado, filas)
+HojaAsync = Tuple[str, List[str], AsyncIterator[Sequence[Any]]]
+
+
+class _HojaStream:
+    """
+    Hoja write_only. Los anchos se miden fila a fila, pero openpyxl escribe <cols> antes
+    de la primera fila: se retienen las primeras `muestra` filas, se fijan los anchos y a
+    partir de ahí cada fila va directo al archivo temporal de la hoja.
+    """
+
+    def __init__(self, wb: Workbook, titulo: str, encabezado: List[str], muestra: int = MUESTRA_ANCHOS):
+        self.ws = wb.create_sheet(titulo)
+        self.muestra = muestra
+        self.anchos = [len(str(h)) for h in encabezado]
+        self.pendientes: Optional[List[Sequence[Any]]] = [[_celda_header(self.ws, h) for h in encabezado]]
+
+    def _medir(self, row: Sequence[Any]) -> None:
+        for i, val in enumerate(row):
+            n = 0 if val is None else len(str(val))
+            if i >= len(self.anchos):
+                self.anchos.append(n)
+            elif n > self.anchos[i]:
+                self.anchos[i] = n
+
+    def _volcar(self) -> None:
+        for i, ancho in enumerate(self.anchos, start=1):
+            self.ws.column_dimensions[get_column_letter(i)].width = min(ancho + 2, 60)
+        for row in self.pendientes:
+            self.ws.append(row)
+        self.pendientes = None
+
+    def append(self, row: Sequence[Any]) -> None:
+        if self.pendientes is None:
+            self.ws.append(row)
+            return
+        self._medir(row)
+        self.pendientes.append(row)
+        if len(self.pendientes) > self.muestra:
+            self._volcar()
+
+    def extend(self, rows: Iterable[Sequence[Any]]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def cerrar(self) -> None:
+        if self.pendientes is not None:
+            self._volcar()
+
+
+def _celda_header(ws, value: Any) -> WriteOnlyCell:
+    c = WriteOnlyCell(ws, value=value)
+    c.font = Font(bold=True)
+    c.alignment = Alignment(vertical="center")
+    return c
+
+
+def escribir_xlsx(hojas: Iterable[Hoja], destino: IO[bytes]) -> None:
+    """Escribe las hojas con un Workbook write_only; memoria acotada sin importar la cantidad de filas."""
+    wb = Workbook(write_only=True)
+    for titulo, encabezado, filas in hojas:
+        hoja = _HojaStream(wb, titulo, encabezado)
+        for row in filas:
+            hoja.append(row)
+        hoja.cerrar()
+    wb.save(destino)
+
+
+def xlsx_spooled(hojas: Iterable[Hoja]) -> IO[bytes]:
+    """Genera el xlsx en un SpooledTemporaryFile (en RAM hasta SPOOL_MAX_BYTES) posicionado al inicio."""
+    fh = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        escribir_xlsx(hojas, fh)
+    except Exception:
+        fh.close()
+        raise
+    fh.seek(0)
+    return fh
+
+
+async def xlsx_spooled_async(hojas: Iterable[HojaAsync], lote: int = 1000) -> IO[bytes]:
+    """
+    Versión para filas que llegan de un cursor async (DB): se leen de a `lote` filas y
+    cada lote se escribe en el threadpool, así el event loop no queda bloqueado.
+    """
+    fh = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        wb = Workbook(write_only=True)
+        for titulo, encabezado, filas in hojas:
+            hoja = _HojaStream(wb, titulo, encabezado)
+            buf: List[Sequence[Any]] = []
+            async for row in filas:
+                buf.append(row)
+                if len(buf) >= lote:
+                    await run_in_threadpool(hoja.extend, buf)
+                    buf = []
+            if buf:
+                await run_in_threadpool(hoja.extend, buf)
+            hoja.cerrar()
+        await run_in_threadpool(wb.save, fh)
+    except BaseException:
+        fh.close()
+        raise
+    fh.seek(0)
+    return fh
+
+
+def iter_archivo(fh: IO[bytes], chunk: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """Lee el archivo en bloques para StreamingResponse y lo cierra al terminar."""
+    try:
+        while True:
+            data = fh.read(chunk)
+            if not data:
+                break
+            yield data
+    finally:
+        fh.close()
+
+
+# ---------------------------
+# CSV (streaming, gzip opcional) y Parquet (pyarrow opcional)
+# ---------------------------
+async def iter_csv(
+    encabezado: List[str],
+    filas: AsyncIterator[Sequence[Any]],
+    comprimir: bool = False,
+    lote: int = 1000,
+) -> AsyncIterator[bytes]:
+    """CSV UTF-8 emitido de a `lote` filas; con comprimir=True sale como gzip incremental."""
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None   # wbits=31 -> formato gzip
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+
+    def _salida(final: bool = False) -> bytes:
+        data = buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+        if gz is None:
+            return data
+        return gz.compress(data) + (gz.flush() if final else b"")
+
+    writer.writerow(encabezado)
+    n = 0
+    async for row in filas:
+        writer.writerow(row)
+        n += 1
+        if n % lote == 0:
+            chunk = _salida()
+            if chunk:
+                yield chunk
+    chunk = _salida(final=True)
+    if chunk:
+        yield chunk
+
+
+async def csv_spooled_async(
+    encabezado: List[str],
+    filas: AsyncIterator[Sequence[Any]],
+    comprimir: bool = False,
+) -> IO[bytes]:
+    """El mismo CSV de iter_csv, a un archivo temporal (para cachearlo o medir su tamaño)."""
+    fh = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        async for chunk in iter_csv(encabezado, filas, comprimir=comprimir):
+            fh.write(chunk)
+    except BaseException:
+        fh.close()
+        raise
+    fh.seek(0)
+    return fh
+
+
+def _pa_tipo(tipo: str):
+    return {"int": pa.int64(), "float": pa.float64()}.get(tipo, pa.string())
+
+
+def _coaccionar(tipo: str, v: Any) -> Any:
+    if v is None or v == "":
+        return None
+    if tipo == "int":
+        return int(v)
+    if tipo == "float":
+        return float(v)
+    return str(v)
+
+
+def _tabla_parquet(schema, tipos: List[str], rows: List[Sequence[Any]]):
+    cols = list(zip(*rows)) if rows else [[] for _ in tipos]
+    arrays = [
+        pa.array([_coaccionar(t, v) for v in col], type=_pa_tipo(t))
+        for t, col in zip(tipos, cols)
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+async def parquet_spooled_async(
+    encabezado: List[str],
+    filas: AsyncIterator[Sequence[Any]],
+    tipos_por_columna: Optional[Dict[str, str]] = None,
+    row_group: int = 50_000,
+) -> IO[bytes]:
+    """
+    Parquet (snappy) escrito por row groups de `row_group` filas a medida que llegan del cursor.
+    tipos_por_columna: {encabezado: "int" | "float" | "str"}; lo que no figura va como texto.
+    Requiere pyarrow (dependencia opcional).
+    """
+    if pa is None:
+        raise RuntimeError("Exportar a Parquet requiere pyarrow (pip install pyarrow)")
+    tipos = [(tipos_por_columna or {}).get(c, "str") for c in encabezado]
+    schema = pa.schema([(c, _pa_tipo(t)) for c, t in zip(encabezado, tipos)])
+
+    fh = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    writer = pq.ParquetWriter(fh, schema, compression="snappy")
+    try:
+        buf: List[Sequence[Any]] = []
+        async for row in filas:
+            buf.append(row)
+            if len(buf) >= row_group:
+                await run_in_threadpool(lambda b=buf: writer.write_table(_tabla_parquet(schema, tipos, b)))
+                buf = []
+        if buf:
+            await run_in_threadpool(lambda b=buf: writer.write_table(_tabla_parquet(schema, tipos, b)))
+        writer.close()
+    except BaseException:
+        writer.close()
+        fh.close()
+        raise
+    fh.seek(0)
+    return fh
+
+
+# ---------------------------
+# Filas de la liquidación (JSON)
+# ---------------------------
+def _validar_payload(payload: Dict[str, Any]) -> None:
+    if payload.get("status") != "ok":
+        raise ValueError(payload.get("message") or "Payload inválido (status != ok)")
+
+
+def _filas_resumen(payload: Dict[str, Any]) -> Iterator[List[Any]]:
+    solicitud: Dict[str, Any] = payload.get("solicitud", {})
+    resumen: Dict[str, Any] = payload.get("resumen", {})
+    yield ["Obras sociales", ", ".join(solicitud.get("obra_sociales", []))]
+    yield ["Períodos", ", ".join(solicitud.get("periodos_normalizados", []))]
+    for k_print, k_key in [
+        ("Total prestaciones incluidas", "total_prestaciones_incluidas"),
+        ("Total bruto", "total_bruto"),
+        ("Total descuentos", "total_descuentos"),
+        ("Total neto", "total_neto"),
+    ]:
+        yield [k_print, resumen.get(k_key, 0)]
+
+
+def _filas_detalle_medico(por_medico: List[Dict[str, Any]]) -> Iterator[List[Any]]:
+    # una fila por médico→OS→periodo con totales del periodo
+    for medico in por_medico:
+        medico_id = medico.get("medico_id")
+        medico_nombre = medico.get("medico_nombre")
+        for os_block in medico.get("obras_sociales", []):
+            os_name = os_block.get("obra_social")
+            for periodo_block in os_block.get("periodos", []):
+                tot = periodo_block.get("totales", {}) or {}
+                yield [
+                    medico_id, medico_nombre, os_name, periodo_block.get("periodo"),
+                    round(float(tot.get("bruto", 0) or 0), 2),
+                    round(float(tot.get("descuentos", 0) or 0), 2),
+                    round(float(tot.get("neto", 0) or 0), 2),
+                ]
+
+
+def _filas_prestaciones(por_medico: List[Dict[str, Any]]) -> Iterator[List[Any]]:
+    # cada prestación en una fila
+    for medico in por_medico:
+        medico_id = medico.get("medico_id")
+        medico_nombre = medico.get("medico_nombre")
+        for os_block in medico.get("obras_sociales", []):
+            os_name = os_block.get("obra_social")
+            for periodo_block in os_block.get("periodos", []):
+                periodo = periodo_block.get("periodo")
+                for p in periodo_block.get("prestaciones", []):
+                    bruto = round(float(p.get("bruto", 0) or 0), 2)
+                    descuentos = round(float(p.get("descuentos", 0) or 0), 2)
+                    neto = round(float(p.get("neto", bruto - descuentos) or (bruto - descuentos)), 2)
+                    yield [
+                        medico_id, medico_nombre, os_name, periodo,
+                        p.get("id_atencion"), p.get("codigo_prestacion"), p.get("fecha"),
+                        bruto, descuentos, neto,
+                    ]
+
+
+def hojas_liquidacion(payload: Dict[str, Any]) -> List[Hoja]:
+    _validar_payload(payload)
+    por_medico: List[Dict[str, Any]] = payload.get("por_medico", [])
+    return [
+        ("Resumen", ["Campo", "Valor"], _filas_resumen(payload)),
+        ("Detalle por médico", [
+            "Médico ID", "Médico", "Obra social", "Período",
+            "Bruto periodo", "Descuentos periodo", "Neto periodo",
+        ], _filas_detalle_medico(por_medico)),
+        ("Prestaciones", [
+            "Médico ID", "Médico",
+            "Obra social", "Período",
+            "Atención ID", "Código prestación", "Fecha",
+            "Bruto", "Descuentos", "Neto",
+        ], _filas_prestaciones(por_medico)),
+    ]
+
+
+def build_excel_from_liquidacion_spooled(payload: Dict[str, Any]) -> IO[bytes]:
+    """Igual que build_excel_from_liquidacion pero write_only y a un archivo temporal (para streaming)."""
+    return xlsx_spooled(hojas_liquidacion(payload))
+
+
 # ---------------------------
 # Armado del Excel
 # ---------------------------
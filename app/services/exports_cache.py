@@ -0,0 +1,148 @@
+"""
+Caché en disco de exportaciones de liquidaciones cerradas (MEDIA_ROOT/exports_cache).
+
+Una liquidación cerrada no cambia hasta que se reabre o refactura, así que el archivo queda
+determinado por (liquidacion_id, version, cierre_timestamp, formato[, hoja]). El ETag es el hash
+de esa clave: un If-None-Match que coincide se contesta 304 sin tocar el disco.
+
+- LRU acotado por tamaño (EXPORTS_CACHE_MAX_MB): cada hit actualiza el mtime; al guardar se
+  borran los archivos más viejos hasta entrar en el límite.
+- invalidar_liquidacion() se llama desde reabrir_liquidacion_simple / _creando_version.
+- Resumen: sólo se cachea si TODAS sus liquidaciones están cerradas; la clave incluye la
+  (id, version, cierre) de cada una.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Optional, Sequence
+
+from app.core.config import settings
+from app.db.models import Liquidacion
+
+
+def _root() -> Path:
+    return Path(settings.MEDIA_ROOT) / "exports_cache"
+
+
+@dataclass(frozen=True)
+class EntradaCache:
+    carpeta: str     # "liq_<id>" | "res_<id>": unidad de invalidación
+    etag: str
+    ext: str
+
+    @property
+    def path(self) -> Path:
+        return _root() / self.carpeta / f"{self.etag}.{self.ext}"
+
+    @property
+    def etag_header(self) -> str:
+        return f'"{self.etag}"'
+
+
+def _etag(*partes: object) -> str:
+    return hashlib.sha256("|".join(str(p) for p in partes).encode()).hexdigest()[:40]
+
+
+def _ext(formato: str, hoja: Optional[str]) -> str:
+    return f"{hoja}.{formato}" if hoja else formato
+
+
+def entrada_liquidacion(liq: Liquidacion, formato: str, hoja: Optional[str] = None) -> Optional[EntradaCache]:
+    """None si la liquidación no es cacheable (abierta)."""
+    if liq.estado != "C":
+        return None
+    return EntradaCache(
+        carpeta=f"liq_{liq.id}",
+        etag=_etag("liq", liq.id, liq.version, liq.cierre_timestamp, formato, hoja),
+        ext=_ext(formato, hoja),
+    )
+
+
+def entrada_resumen(resumen_id: int, liqs: Sequence[Liquidacion], formato: str, hoja: Optional[str] = None) -> Optional[EntradaCache]:
+    if not liqs or any(l.estado != "C" for l in liqs):
+        return None
+    versiones = sorted((l.id, l.version, l.cierre_timestamp) for l in liqs)
+    return EntradaCache(
+        carpeta=f"res_{resumen_id}",
+        etag=_etag("res", resumen_id, versiones, formato, hoja),
+        ext=_ext(formato, hoja),
+    )
+
+
+def coincide_etag(entrada: EntradaCache, if_none_match: Optional[str]) -> bool:
+    if not if_none_match:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or entrada.etag_header in tags
+
+
+def obtener(entrada: EntradaCache) -> Optional[Path]:
+    path = entrada.path
+    try:
+        os.utime(path)           # LRU: el mtime es el último acceso
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def guardar(entrada: EntradaCache, fh: IO[bytes]) -> Path:
+    """Copia `fh` (desde su posición actual) al caché de forma atómica y aplica el límite de tamaño."""
+    path = entrada.path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(fh, out, 1024 * 1024)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    _podar(settings.EXPORTS_CACHE_MAX_MB * 1024 * 1024, conservar=path)
+    return path
+
+
+def _podar(max_bytes: int, conservar: Optional[Path] = None) -> None:
+    archivos = []
+    total = 0
+    for carpeta in _root().glob("*/"):
+        try:
+            contenido = list(carpeta.iterdir())
+        except FileNotFoundError:      # invalidada en paralelo
+            continue
+        for f in contenido:
+            if f.suffix == ".tmp":     # escritura en curso de otro request
+                continue
+            try:
+                st = f.stat()
+            except FileNotFoundError:
+                continue
+            archivos.append((st.st_mtime, st.st_size, f))
+            total += st.st_size
+    if total <= max_bytes:
+        return
+    for _, size, f in sorted(archivos):
+        if f == conservar:
+            continue
+        f.unlink(missing_ok=True)
+        total -= size
+        if total <= max_bytes:
+            break
+
+
+def _borrar_carpeta(carpeta: str) -> None:
+    shutil.rmtree(_root() / carpeta, ignore_errors=True)
+
+
+def invalidar_liquidacion(liquidacion_id: int, resumen_id: Optional[int] = None) -> None:
+    """
+    Descarta lo cacheado de la liquidación (y de su resumen, que la incluye). Si algo no se
+    pudo borrar no es grave: la clave incluye version/cierre y no vuelve a coincidir.
+    """
+    _borrar_carpeta(f"liq_{liquidacion_id}")
+    if resumen_id is not None:
+        _borrar_carpeta(f"res_{resumen_id}")
@@ -0,0 +1,188 @@
+"""
+Hojas de exportación armadas desde la base (sin JSON del front).
+
+Cada hoja es (título, encabezado, filas async). Las prestaciones salen de la misma consulta
+que `detalles_vista` (DetalleLiquidacion ⋈ GuardarAtencion ⋈ Debito_Credito), leída con
+cursor del lado del servidor; los totales por médico son un GROUP BY chico.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import (
+    Debito_Credito, DetalleLiquidacion, ListadoMedico, Liquidacion, LiquidacionResumen, ObrasSociales,
+)
+from app.services.exports import HojaAsync
+from app.services.liquidaciones_calc import stream_vista_detalles_liquidacion
+
+COLS_PRESTACIONES = [
+    "Det ID", "Médico ID", "Médico", "Matrícula", "Nro orden", "Fecha", "Código",
+    "Nro afiliado", "Afiliado", "Cant.", "%", "Honorarios", "Gastos", "Coseguro",
+    "Importe", "Tipo D/C", "Monto D/C", "Observación", "Total",
+]
+COLS_LIQUIDACION = ["Obra social", "Período", "Nro liquidación"]
+COLS_POR_MEDICO = [
+    "Médico ID", "Médico", "Obra social", "Período",
+    "Prestaciones", "Bruto", "Débitos", "Créditos", "Neto",
+]
+
+# tipos para Parquet (el resto de las columnas va como texto)
+TIPOS_COLUMNAS: Dict[str, str] = {
+    "Det ID": "int", "Médico ID": "int", "Versión": "int", "Prestaciones": "int",
+    **{c: "float" for c in (
+        "%", "Honorarios", "Gastos", "Coseguro", "Importe", "Monto D/C", "Total",
+        "Bruto", "Débitos", "Créditos", "Neto", "Total bruto", "Total débitos", "Total neto",
+    )},
+}
+
+# clave de URL -> título de hoja
+HOJAS = {
+    "resumen": "Resumen",
+    "detalle_por_medico": "Detalle por médico",
+    "prestaciones": "Prestaciones",
+}
+
+
+def _periodo(liq: Liquidacion) -> str:
+    return f"{int(liq.anio_periodo):04d}-{int(liq.mes_periodo):02d}"
+
+
+def _fila_prestacion(f: Dict[str, Any]) -> List[Any]:
+    return [
+        f["det_id"], f["socio"], f["nombreSocio"], f["matri"], f["nroOrden"], f["fecha"], f["codigo"],
+        f["nroAfiliado"], f["afiliado"], f["xCant"], f["porcentaje"], f["honorarios"], f["gastos"], f["coseguro"],
+        f["importe"], f["tipo"], f["monto"], f["obs"], f["total"],
+    ]
+
+
+async def _nombres_os(db: AsyncSession, os_ids: Sequence[int]) -> Dict[int, str]:
+    if not os_ids:
+        return {}
+    rows = await db.execute(
+        select(ObrasSociales.NRO_OBRASOCIAL, ObrasSociales.OBRA_SOCIAL)
+        .where(ObrasSociales.NRO_OBRASOCIAL.in_(sorted(set(os_ids))))
+    )
+    return {int(nro): (nombre or "").strip() for nro, nombre in rows}
+
+
+# ---------------------------
+# Filas
+# ---------------------------
+async def _filas_resumen_liquidaciones(
+    liqs: List[Liquidacion], nombres_os: Dict[int, str]
+) -> AsyncIterator[List[Any]]:
+    z = Decimal("0")
+    bruto = debitos = neto = z
+    for liq in liqs:
+        bruto += liq.total_bruto or z
+        debitos += liq.total_debitos or z
+        neto += liq.total_neto or z
+        yield [
+            nombres_os.get(int(liq.obra_social_id), str(liq.obra_social_id)), _periodo(liq),
+            liq.nro_liquidacion, liq.version, liq.estado,
+            float(liq.total_bruto or 0), float(liq.total_debitos or 0), float(liq.total_neto or 0),
+        ]
+    if len(liqs) > 1:
+        yield ["TOTAL", None, None, None, None, float(bruto), float(debitos), float(neto)]
+
+
+async def _filas_por_medico(
+    db: AsyncSession, liq_ids: List[int], nombres_os: Dict[int, str]
+) -> AsyncIterator[List[Any]]:
+    DL, DC = DetalleLiquidacion, Debito_Credito
+    debitos = func.coalesce(func.sum(case((DC.tipo == "d", DC.monto), else_=0)), 0)
+    creditos = func.coalesce(func.sum(case((DC.tipo == "c", DC.monto), else_=0)), 0)
+    q = await db.execute(
+        select(
+            DL.medico_id, ListadoMedico.NOMBRE,
+            Liquidacion.obra_social_id, Liquidacion.anio_periodo, Liquidacion.mes_periodo,
+            func.count(DL.id), func.coalesce(func.sum(DL.importe), 0), debitos, creditos,
+        )
+        .select_from(DL)
+        .join(Liquidacion, Liquidacion.id == DL.liquidacion_id)
+        .join(ListadoMedico, ListadoMedico.ID == DL.medico_id, isouter=True)
+        .join(DC, DL.debito_credito_id == DC.id, isouter=True)
+        .where(DL.liquidacion_id.in_(liq_ids))
+        .group_by(
+            DL.medico_id, ListadoMedico.NOMBRE,
+            Liquidacion.obra_social_id, Liquidacion.anio_periodo, Liquidacion.mes_periodo,
+        )
+        .order_by(ListadoMedico.NOMBRE, DL.medico_id, Liquidacion.obra_social_id)
+    )
+    for med_id, nombre, os_id, anio, mes, cant, bruto, deb, cred in q:
+        bruto, deb, cred = Decimal(str(bruto)), Decimal(str(deb)), Decimal(str(cred))
+        yield [
+            med_id, (nombre or "").strip(), nombres_os.get(int(os_id), str(os_id)), f"{int(anio):04d}-{int(mes):02d}",
+            int(cant), float(bruto), float(deb), float(cred), float(bruto - deb + cred),
+        ]
+
+
+async def _filas_prestaciones(
+    db: AsyncSession, liqs: List[Liquidacion], nombres_os: Dict[int, str], con_liquidacion: bool
+) -> AsyncIterator[List[Any]]:
+    # un cursor del servidor por liquidación, en orden
+    for liq in liqs:
+        prefijo = [nombres_os.get(int(liq.obra_social_id), str(liq.obra_social_id)), _periodo(liq), liq.nro_liquidacion]
+        async for f in stream_vista_detalles_liquidacion(db, liq.id):
+            fila = _fila_prestacion(f)
+            yield prefijo + fila if con_liquidacion else fila
+
+
+# ---------------------------
+# Hojas
+# ---------------------------
+def _hojas(
+    db: AsyncSession, liqs: List[Liquidacion], nombres_os: Dict[int, str], con_liquidacion: bool
+) -> List[HojaAsync]:
+    return [
+        ("Resumen", [
+            "Obra social", "Período", "Nro liquidación", "Versión", "Estado",
+            "Total bruto", "Total débitos", "Total neto",
+        ], _filas_resumen_liquidaciones(liqs, nombres_os)),
+        ("Detalle por médico", COLS_POR_MEDICO, _filas_por_medico(db, [l.id for l in liqs], nombres_os)),
+        ("Prestaciones",
+         (COLS_LIQUIDACION + COLS_PRESTACIONES) if con_liquidacion else COLS_PRESTACIONES,
+         _filas_prestaciones(db, liqs, nombres_os, con_liquidacion)),
+    ]
+
+
+def elegir_hoja(hojas: List[HojaAsync], clave: str) -> HojaAsync:
+    titulo = HOJAS.get(clave)
+    for hoja in hojas:
+        if hoja[0] == titulo:
+            return hoja
+    raise HTTPException(400, f"Hoja inválida; opciones: {', '.join(HOJAS)}")
+
+
+async def hojas_liquidacion_db(db: AsyncSession, liquidacion_id: int) -> Tuple[str, List[HojaAsync]]:
+    """(nombre de archivo sin extensión, hojas) de una liquidación."""
+    liq = await db.get(Liquidacion, liquidacion_id)
+    if not liq:
+        raise HTTPException(404, "Liquidación no encontrada")
+    nombres_os = await _nombres_os(db, [liq.obra_social_id])
+    nombre = f"liquidacion_{liq.id}_{liq.obra_social_id}_{_periodo(liq)}"
+    return nombre, _hojas(db, [liq], nombres_os, con_liquidacion=False)
+
+
+async def liquidaciones_de_resumen(db: AsyncSession, resumen_id: int) -> List[Liquidacion]:
+    return list((await db.execute(
+        select(Liquidacion)
+        .where(Liquidacion.resumen_id == resumen_id)
+        .order_by(Liquidacion.obra_social_id, Liquidacion.anio_periodo, Liquidacion.mes_periodo, Liquidacion.version)
+    )).scalars().all())
+
+
+async def hojas_resumen_db(db: AsyncSession, resumen_id: int) -> Tuple[str, List[HojaAsync]]:
+    """(nombre de archivo sin extensión, hojas) de todas las liquidaciones de un resumen."""
+    res = await db.get(LiquidacionResumen, resumen_id)
+    if not res:
+        raise HTTPException(404, "LiquidacionResumen no encontrado")
+    liqs = await liquidaciones_de_resumen(db, resumen_id)
+    nombres_os = await _nombres_os(db, [l.obra_social_id for l in liqs])
+    nombre = f"resumen_{res.id}_{int(res.anio):04d}-{int(res.mes):02d}"
+    return nombre, _hojas(db, liqs, nombres_os, con_liquidacion=True)
@@ -0,0 +1,304 @@
+# app/services/jobs.py
+"""
+Cola de trabajos en la base (tabla `jobs`) + pool de workers dentro del proceso.
+
+- encolar_job(): inserta el job en estado 'pendiente' y devuelve su id.
+- Cada proceso uvicorn levanta settings.JOBS_WORKERS workers (iniciar_workers en el lifespan).
+- Un worker toma el próximo pendiente con SELECT ... FOR UPDATE SKIP LOCKED, así un job
+  lo ejecuta un solo worker aunque haya varios procesos.
+- Los handlers reportan progreso con el callback `progreso`. Crear / cerrar / refacturar son
+  sentencias sobre conjuntos (INSERT ... SELECT, UPDATE con JOIN) sin lotes intermedios, así
+  que cuentan fases: crear = detalles insertados, totales; cerrar = pagados fijados, cierre;
+  refacturar = detalles clonados, totales. La cantidad de detalles va en el resultado.
+  Reconciliar cuenta liquidaciones y reconstruir_vencimientos, filas.
+- Mientras un job corre, su worker renueva heartbeat_at cada JOBS_HEARTBEAT_SEG. Un job
+  'en_curso' sin heartbeat hace más de JOBS_HEARTBEAT_VENCIDO_SEG quedó huérfano (el proceso
+  murió): si su tipo es reintentable vuelve a 'pendiente'; si no (crear / refacturar crean
+  una liquidación o versión nueva y pueden haber commiteado a medias) pasa a 'error' para
+  revisarlo a mano. Lo revisa cada proceso al arrancar y después periódicamente.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import os
+import socket
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.db.models import DetalleLiquidacion, Job, Liquidacion
+from app.services import vencimientos
+from app.services.liquidaciones import (
+    cerrar_liquidacion,
+    crear_liquidacion_con_detalles,
+    reabrir_liquidacion_creando_version,
+    reconciliar_totales,
+)
+
+log = logging.getLogger(__name__)
+
+Progreso = Callable[[int, Optional[int]], Awaitable[None]]
+Handler = Callable[[AsyncSession, Dict[str, Any], Progreso], Awaitable[Dict[str, Any]]]
+
+_HANDLERS: Dict[str, Handler] = {}
+_REINTENTABLES: Set[str] = set()
+_tasks: List[asyncio.Task] = []
+_stop = asyncio.Event()
+
+
+def job_handler(tipo: str, *, reintentable: bool = True):
+    """reintentable=False: si el worker muere a mitad de camino el job no se vuelve a correr."""
+    def deco(fn: Handler) -> Handler:
+        _HANDLERS[tipo] = fn
+        if reintentable:
+            _REINTENTABLES.add(tipo)
+        return fn
+    return deco
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _liq_out(liq: Liquidacion) -> Dict[str, Any]:
+    # JSON: los Decimal van como string
+    return {
+        "liquidacion_id": liq.id,
+        "resumen_id": liq.resumen_id,
+        "nro_liquidacion": liq.nro_liquidacion,
+        "estado": liq.estado,
+        "total_bruto": str(liq.total_bruto or Decimal("0")),
+        "total_debitos": str(liq.total_debitos or Decimal("0")),
+        "total_neto": str(liq.total_neto or Decimal("0")),
+    }
+
+
+async def _contar_detalles(db: AsyncSession, liquidacion_id: int) -> int:
+    q = await db.execute(
+        select(func.count(DetalleLiquidacion.id)).where(DetalleLiquidacion.liquidacion_id == liquidacion_id)
+    )
+    return int(q.scalar_one() or 0)
+
+
+# ==============================
+# Handlers
+# ==============================
+@job_handler("crear_liquidacion", reintentable=False)
+async def _job_crear_liquidacion(db: AsyncSession, params: Dict[str, Any], progreso: Progreso) -> Dict[str, Any]:
+    await progreso(0, 2)
+    liq = await crear_liquidacion_con_detalles(
+        db,
+        resumen_id=int(params["resumen_id"]),
+        obra_social_id=int(params["obra_social_id"]),
+        anio_periodo=int(params["anio_periodo"]),
+        mes_periodo=int(params["mes_periodo"]),
+        nro_liquidacion=str(params["nro_liquidacion"]),
+        avance=lambda: progreso(1),
+    )
+    await progreso(2)
+    return {**_liq_out(liq), "detalles": await _contar_detalles(db, liq.id)}
+
+
+@job_handler("cerrar_liquidacion")
+async def _job_cerrar_liquidacion(db: AsyncSession, params: Dict[str, Any], progreso: Progreso) -> Dict[str, Any]:
+    liquidacion_id = int(params["liquidacion_id"])
+    await progreso(0, 2)
+    liq = await cerrar_liquidacion(db, liquidacion_id, avance=lambda: progreso(1))
+    await progreso(2)
+    return {**_liq_out(liq), "detalles": await _contar_detalles(db, liquidacion_id)}
+
+
+@job_handler("refacturar_liquidacion", reintentable=False)
+async def _job_refacturar_liquidacion(db: AsyncSession, params: Dict[str, Any], progreso: Progreso) -> Dict[str, Any]:
+    liquidacion_id = int(params["liquidacion_id"])
+    await progreso(0, 2)
+    nueva = await reabrir_liquidacion_creando_version(
+        db, liquidacion_id, str(params["nro_liquidacion"]), avance=lambda: progreso(1)
+    )
+    await db.commit()
+    await db.refresh(nueva)
+    await progreso(2)
+    return {**_liq_out(nueva), "detalles": await _contar_detalles(db, nueva.id)}
+
+
+@job_handler("reconciliar_totales")
+async def _job_reconciliar_totales(db: AsyncSession, params: Dict[str, Any], progreso: Progreso) -> Dict[str, Any]:
+    out = await reconciliar_totales(db, int(params["resumen_id"]), corregir=bool(params.get("corregir", False)))
+    if out["corregido"]:
+        await db.commit()
+    await progreso(out["liquidaciones"], out["liquidaciones"])
+    return out
+
+
+@job_handler("reconstruir_vencimientos")
+async def _job_reconstruir_vencimientos(db: AsyncSession, params: Dict[str, Any], progreso: Progreso) -> Dict[str, Any]:
+    filas = await vencimientos.sincronizar(db)
+    await db.commit()
+    await progreso(filas, filas)
+    return {"filas": filas}
+
+
+# ==============================
+# API del módulo
+# ==============================
+async def encolar_job(db: AsyncSession, tipo: str, params: Dict[str, Any]) -> Job:
+    if tipo not in _HANDLERS:
+        raise ValueError(f"Tipo de job desconocido: {tipo}")
+    job = Job(tipo=tipo, estado="pendiente", params=params, progreso_actual=0)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+async def _tomar_siguiente(worker: str) -> Optional[int]:
+    async with AsyncSessionLocal() as db:
+        job = (await db.execute(
+            select(Job)
+            .where(Job.estado == "pendiente")
+            .order_by(Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )).scalars().first()
+        if not job:
+            await db.rollback()
+            return None
+        job.estado = "en_curso"
+        job.started_at = job.heartbeat_at = _now()
+        job.worker = worker
+        await db.commit()
+        return job.id
+
+
+async def _actualizar(job_id: int, **values: Any) -> None:
+    # sesión aparte: el progreso se ve desde otros procesos aunque el job no haya commiteado
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Job).where(Job.id == job_id).values(**values))
+        await db.commit()
+
+
+async def _latir(job_id: int) -> None:
+    while True:
+        await asyncio.sleep(settings.JOBS_HEARTBEAT_SEG)
+        try:
+            await _actualizar(job_id, heartbeat_at=_now())
+        except Exception:
+            log.warning("Job %s: no se pudo renovar el heartbeat", job_id, exc_info=True)
+
+
+async def _ejecutar(job_id: int) -> None:
+    async def progreso(actual: int, total: Optional[int] = None) -> None:
+        values: Dict[str, Any] = {"progreso_actual": int(actual), "heartbeat_at": _now()}
+        if total is not None:
+            values["progreso_total"] = int(total)
+        await _actualizar(job_id, **values)
+
+    async with AsyncSessionLocal() as db:
+        job = await db.get(Job, job_id)
+        if job is None:
+            log.warning("Job %s: no existe (¿borrado después de tomarlo?)", job_id)
+            return
+        handler = _HANDLERS.get(job.tipo)
+        latido = asyncio.create_task(_latir(job_id))
+        try:
+            if handler is None:
+                raise ValueError(f"Tipo de job desconocido: {job.tipo}")
+            resultado = await handler(db, dict(job.params or {}), progreso)
+        except Exception as e:
+            await db.rollback()
+            log.exception("Job %s (%s) falló", job_id, job.tipo)
+            await _actualizar(job_id, estado="error", error=str(getattr(e, "detail", None) or e), finished_at=_now())
+            return
+        finally:
+            latido.cancel()
+
+    await _actualizar(job_id, estado="ok", resultado=resultado, finished_at=_now())
+
+
+async def _worker_loop(nombre: str) -> None:
+    while not _stop.is_set():
+        try:
+            job_id = await _tomar_siguiente(nombre)
+        except Exception:
+            log.exception("Worker %s: no se pudo tomar job", nombre)
+            job_id = None
+        if job_id is None:
+            try:
+                await asyncio.wait_for(_stop.wait(), timeout=settings.JOBS_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        try:
+            await _ejecutar(job_id)
+        except Exception:
+            # p.ej. la base se cayó y no se pudo marcar el error: el worker sigue vivo y el
+            # job queda 'en_curso' sin heartbeat hasta que lo levante _recuperar_huerfanos
+            log.exception("Worker %s: falló la ejecución del job %s", nombre, job_id)
+
+
+async def _recuperar_huerfanos() -> None:
+    limite = _now() - datetime.timedelta(seconds=settings.JOBS_HEARTBEAT_VENCIDO_SEG)
+    huerfano = and_(
+        Job.estado == "en_curso",
+        or_(
+            Job.heartbeat_at < limite,
+            and_(Job.heartbeat_at.is_(None), Job.started_at < limite),   # tomados antes del heartbeat
+        ),
+    )
+    reintentables = sorted(_REINTENTABLES)
+    async with AsyncSessionLocal() as db:
+        reencolados = await db.execute(
+            update(Job)
+            .where(huerfano, Job.tipo.in_(reintentables))
+            .values(estado="pendiente", worker=None, started_at=None, heartbeat_at=None, progreso_actual=0)
+        )
+        fallados = await db.execute(
+            update(Job)
+            .where(huerfano, Job.tipo.not_in(reintentables))
+            .values(
+                estado="error",
+                error="Interrumpido: el worker dejó de responder. Revisar lo creado antes de volver a encolar.",
+                finished_at=_now(),
+            )
+        )
+        await db.commit()
+    if reencolados.rowcount:
+        log.warning("Jobs: %s huérfanos vuelven a pendiente", reencolados.rowcount)
+    if fallados.rowcount:
+        log.warning("Jobs: %s huérfanos no reintentables pasan a error", fallados.rowcount)
+
+
+async def _vigilar_huerfanos() -> None:
+    while not _stop.is_set():
+        try:
+            await _recuperar_huerfanos()
+        except Exception:
+            log.exception("Jobs: no se pudieron recuperar los huérfanos")
+        try:
+            await asyncio.wait_for(_stop.wait(), timeout=settings.JOBS_HEARTBEAT_VENCIDO_SEG)
+        except asyncio.TimeoutError:
+            pass
+
+
+def iniciar_workers(n: Optional[int] = None) -> None:
+    n = settings.JOBS_WORKERS if n is None else n
+    _stop.clear()
+    if n <= 0:
+        return
+    _tasks.append(asyncio.create_task(_vigilar_huerfanos()))
+    base = f"{socket.gethostname()}:{os.getpid()}"
+    for i in range(n):
+        _tasks.append(asyncio.create_task(_worker_loop(f"{base}:{i}")))
+
+
+async def detener_workers() -> None:
+    # los jobs en curso terminan; los workers dejan de tomar nuevos
+    _stop.set()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -1,13 +1,17 @@
 # app/services/liquidaciones.py
-from typing import Dict, Any, List, Optional, Set, Tuple
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Set, Tuple
 from decimal import Decimal
 import re, datetime
-from app.services.liquidaciones_calc import calcular_version_y_formatear_nro
-from sqlalchemy import select, or_, and_, exists, func, case
+import asyncio
+from app.services.liquidaciones_calc import calcular_version_y_formatear_nro, construir_detalles_y_totales
+from sqlalchemy import select, or_, and_, exists, func, case, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 
-from app.db.models import DeduccionAplicacion, DeduccionColegio, Descuentos, GuardarAtencion, LiquidacionResumen, ObrasSociales, ListadoMedico, DetalleLiquidacion, Debito_Credito, DetalleLiquidacion, Liquidacion
+from app.db.database import AsyncSessionLocal
+from app.services import exports_cache
+
+from app.db.models import DeduccionAplicacion, DeduccionColegio, Descuentos, GuardarAtencion, LiquidacionResumen, ObrasSociales, ListadoMedico, DetalleLiquidacion, Debito_Credito, DetalleLiquidacion, Liquidacion, Periodos
 
 
 
@@ -155,7 +159,94 @@ async def recomputar_totales_de_liquidacion(db: AsyncSession, liquidacion_id: in
 
     await db.flush()  
 
-async def recomputar_pagados_de_liquidacion(db: AsyncSession, liquidacion_id: int) -> None:
+def _delta_dc(
+    antes: Optional[Tuple[str, Any]],
+    despues: Optional[Tuple[str, Any]],
+) -> Tuple[Decimal, Decimal]:
+    """
+    (Δdébitos, Δcréditos) al pasar de un DC (tipo, monto) a otro. None = sin DC.
+    """
+    d_deb = Decimal("0")
+    d_cre = Decimal("0")
+    for signo, dc in ((-1, antes), (1, despues)):
+        if not dc:
+            continue
+        tipo, monto = dc
+        monto = to_decimal(monto) * signo
+        if tipo == "c":
+            d_cre += monto
+        else:
+            d_deb += monto
+    return d_deb, d_cre
+
+async def aplicar_delta_dc(
+    db: AsyncSession,
+    liq: Liquidacion,
+    antes: Optional[Tuple[str, Any]],
+    despues: Optional[Tuple[str, Any]],
+) -> None:
+    """
+    Mantiene incrementalmente los totales de la liquidación y su resumen cuando cambia
+    el DC de UN detalle (O(1), sin re-sumar detalles ni liquidaciones):
+      liq.total_debitos += Δd ; liq.total_neto += Δc - Δd ; resumen.total_debitos += Δd
+    El UPDATE es atómico (total = total + Δ), pero el delta sólo es correcto si `antes` se
+    leyó con el detalle y su DC bloqueados (SELECT ... FOR UPDATE) hasta el commit: sin el
+    lock, dos ediciones simultáneas del mismo detalle aplican dos deltas desde el mismo
+    `antes` y los totales derivan. `reconciliar_totales` verifica que no haya deriva.
+    """
+    d_deb, d_cre = _delta_dc(antes, despues)
+    if d_deb == 0 and d_cre == 0:
+        return
+
+    await db.execute(
+        update(Liquidacion)
+        .where(Liquidacion.id == liq.id)
+        .values(
+            total_debitos=func.coalesce(Liquidacion.total_debitos, 0) + d_deb,
+            total_neto=func.coalesce(Liquidacion.total_neto, 0) + d_cre - d_deb,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if d_deb != 0:
+        await db.execute(
+            update(LiquidacionResumen)
+            .where(LiquidacionResumen.id == liq.resumen_id)
+            .values(total_debitos=func.coalesce(LiquidacionResumen.total_debitos, 0) + d_deb)
+            .execution_options(synchronize_session=False)
+        )
+    await db.refresh(liq, attribute_names=["total_bruto", "total_debitos", "total_neto"])
+
+async def recomputar_pagados_de_liquidacion(db: AsyncSession, liquidacion_id: int, *, bulk: bool = True) -> None:
+    """
+    Fija `pagado` en todos los detalles de la liquidación con las reglas de
+    `recomputar_pagado_detalle`.
+      - bulk=True: un único UPDATE ... LEFT JOIN debito_credito LEFT JOIN detalle previo.
+      - bulk=False: detalle por detalle (camino original, ~3 round trips por fila).
+    """
+    if bulk:
+        det = DetalleLiquidacion.__table__
+        prev = det.alias("prev")
+        dc = Debito_Credito.__table__
+        base = case(
+            (det.c.prev_detalle_id.is_(None), func.coalesce(det.c.importe, 0)),
+            else_=func.coalesce(prev.c.pagado, 0),
+        )
+        ajuste = case(
+            (dc.c.tipo == "c", func.coalesce(dc.c.monto, 0)),
+            (dc.c.tipo == "d", -func.coalesce(dc.c.monto, 0)),
+            else_=0,
+        )
+        await db.execute(
+            update(
+                det.outerjoin(dc, dc.c.id == det.c.debito_credito_id)
+                   .outerjoin(prev, prev.c.id == det.c.prev_detalle_id)
+            )
+            .values({det.c.pagado: base + ajuste})
+            .where(det.c.liquidacion_id == liquidacion_id)
+        )
+        await db.flush()
+        return
+
     ids = (
         await db.execute(
             select(DetalleLiquidacion.id)
@@ -213,15 +304,248 @@ async def recomputar_totales_de_resumen(db: AsyncSession, resumen_id: int) -> No
 
     await db.flush()
 
-async def recomputar_todo_de_liquidacion(db: AsyncSession, liquidacion_id: int) -> None:
+async def recomputar_todo_de_liquidacion(
+    db: AsyncSession,
+    liquidacion_id: int,
+    *,
+    avance: Optional[Callable[[], Awaitable[None]]] = None,
+) -> None:
     # 1) fijar pagados (según reglas arriba)
     await recomputar_pagados_de_liquidacion(db, liquidacion_id)
+    if avance is not None:
+        await avance()
     # 2) recalcular totales de la liquidación (bruto, débitos, créditos, neto)
     await recomputar_totales_de_liquidacion(db, liquidacion_id)
     
     liq = await db.get(Liquidacion, liquidacion_id)
     await recomputar_totales_de_resumen(db, int(liq.resumen_id))
 
+async def crear_liquidacion_con_detalles(
+    db: AsyncSession,
+    *,
+    resumen_id: int,
+    obra_social_id: int,
+    anio_periodo: int,
+    mes_periodo: int,
+    nro_liquidacion: str,
+    recomputar_resumen: bool = True,
+    avance: Optional[Callable[[], Awaitable[None]]] = None,
+) -> Liquidacion:
+    """
+    Crea la liquidación (versión siguiente para OS+período), genera sus detalles y totales.
+    Hace commit. Con recomputar_resumen=False el llamador recalcula el resumen después.
+    `avance` se llama cuando los detalles están insertados (ver construir_detalles_y_totales).
+    """
+    version, nro_fmt = await calcular_version_y_formatear_nro(
+        db, obra_social_id, anio_periodo, mes_periodo, nro_liquidacion
+    )
+    liq = Liquidacion(
+        resumen_id=resumen_id,
+        obra_social_id=obra_social_id,
+        mes_periodo=mes_periodo,
+        anio_periodo=anio_periodo,
+        version=version,
+        nro_liquidacion=nro_fmt,
+        total_bruto=Decimal("0"),
+        total_debitos=Decimal("0"),
+        total_neto=Decimal("0"),
+    )
+    db.add(liq)
+    await db.flush()  # para obtener liq.id
+
+    # construir detalles + actualizar totales
+    await construir_detalles_y_totales(db, liq.id, avance=avance)
+    await recomputar_totales_de_liquidacion(db, liq.id)
+    if recomputar_resumen:
+        await recomputar_totales_de_resumen(db, liq.resumen_id)
+
+    await db.commit()
+    await db.refresh(liq)
+    return liq
+
+async def cerrar_liquidacion(
+    db: AsyncSession,
+    liquidacion_id: int,
+    *,
+    avance: Optional[Callable[[], Awaitable[None]]] = None,
+) -> Liquidacion:
+    """
+    Fija los pagados, recalcula totales (liquidación y resumen) y sella estado 'C'. Hace commit.
+    `avance` se llama con los pagados ya fijados.
+    """
+    liq = await db.get(Liquidacion, liquidacion_id)
+    if not liq:
+        raise HTTPException(404, "Liquidación no encontrada")
+    if liq.estado == "C":
+        raise HTTPException(409, "La liquidación ya está cerrada")
+
+    # 1) calcular pagados con la lógica nueva
+    await recomputar_todo_de_liquidacion(db, liquidacion_id, avance=avance)
+
+    # 2) sellar estado
+    liq.estado = "C"
+    liq.cierre_timestamp = now_string()
+    await db.commit()
+    return liq
+
+async def _nro_desde_periodo(db: AsyncSession, obra_social_id: int, anio: int, mes: int) -> str:
+    """
+    Nro de factura del período cerrado (Periodos.NRO_FACT_1-NRO_FACT_2) cuando no viene en el pedido.
+    """
+    row = (await db.execute(
+        select(Periodos.NRO_FACT_1, Periodos.NRO_FACT_2).where(
+            Periodos.NRO_OBRA_SOCIAL == obra_social_id,
+            Periodos.ANIO == anio,
+            Periodos.MES == mes,
+        ).limit(1)
+    )).first()
+    if not row:
+        raise HTTPException(404, f"Periodo {anio:04d}-{mes:02d} inexistente para la OS {obra_social_id}")
+    return f"{(row.NRO_FACT_1 or '').strip()}-{(row.NRO_FACT_2 or '').strip()}"
+
+async def _generar_liquidaciones_os(
+    resumen_id: int,
+    obra_social_id: int,
+    periodos: List[str],
+    nro_base: Optional[str],
+    sem: asyncio.Semaphore,
+) -> List[Dict[str, Any]]:
+    """
+    Crea las liquidaciones de UNA obra social (sus períodos en serie) con sesión propia.
+    Un error en un período se reporta y no frena al resto.
+    """
+    out: List[Dict[str, Any]] = []
+    async with sem:
+        async with AsyncSessionLocal() as db:
+            for periodo in periodos:
+                item: Dict[str, Any] = {"obra_social_id": obra_social_id, "periodo": str(periodo)}
+                try:
+                    anio, mes, item["periodo"] = normalizar_periodo_flexible(periodo)
+                    nro = nro_base if nro_base is not None else await _nro_desde_periodo(db, obra_social_id, anio, mes)
+                    liq = await crear_liquidacion_con_detalles(
+                        db,
+                        resumen_id=resumen_id,
+                        obra_social_id=obra_social_id,
+                        anio_periodo=anio,
+                        mes_periodo=mes,
+                        nro_liquidacion=nro,
+                        recomputar_resumen=False,
+                    )
+                    item.update(
+                        status="ok",
+                        liquidacion_id=liq.id,
+                        nro_liquidacion=liq.nro_liquidacion,
+                        total_bruto=liq.total_bruto,
+                        total_debitos=liq.total_debitos,
+                        total_neto=liq.total_neto,
+                    )
+                except Exception as e:
+                    await db.rollback()
+                    item.update(status="error", detail=str(getattr(e, "detail", None) or e))
+                out.append(item)
+    return out
+
+async def generar_liquidaciones_resumen(
+    resumen_id: int,
+    obra_sociales_con_periodos: Dict[int, List[str]],
+    nros_liquidacion: Optional[Dict[int, str]] = None,
+    max_concurrencia: int = 4,
+) -> List[Dict[str, Any]]:
+    """
+    Genera en paralelo las liquidaciones de varias OS para un resumen.
+      - cada OS corre en su propia AsyncSession; como mucho `max_concurrencia` a la vez
+        (no debe superar el pool del engine)
+      - los totales del resumen se recalculan UNA vez al final
+    Devuelve un item por (OS, período) con status "ok" | "error".
+    """
+    nros_liquidacion = nros_liquidacion or {}
+    sem = asyncio.Semaphore(max(1, max_concurrencia))
+
+    por_os = await asyncio.gather(*(
+        _generar_liquidaciones_os(resumen_id, int(os_id), periodos, nros_liquidacion.get(os_id), sem)
+        for os_id, periodos in obra_sociales_con_periodos.items()
+    ))
+
+    async with AsyncSessionLocal() as db:
+        await recomputar_totales_de_resumen(db, resumen_id)
+        await db.commit()
+
+    return [item for items in por_os for item in items]
+
+async def reconciliar_totales(
+    db: AsyncSession,
+    resumen_id: int,
+    corregir: bool = False,
+) -> Dict[str, Any]:
+    """
+    Re-agrega desde cero los totales del resumen y de cada liquidación (una consulta agrupada)
+    y los compara contra lo guardado. Con corregir=True pisa los valores con deriva (sólo flush).
+    """
+    resumen = await db.get(LiquidacionResumen, resumen_id)
+    if not resumen:
+        raise HTTPException(404, "LiquidacionResumen no encontrado")
+
+    DL, DC = DetalleLiquidacion, Debito_Credito
+    esperados = {
+        int(r.liquidacion_id): r
+        for r in (await db.execute(
+            select(
+                DL.liquidacion_id,
+                func.coalesce(func.sum(DL.importe), 0).label("bruto"),
+                func.coalesce(func.sum(case((DC.tipo == "d", DC.monto), else_=0)), 0).label("debitos"),
+                func.coalesce(func.sum(case((DC.tipo == "c", DC.monto), else_=0)), 0).label("creditos"),
+            )
+            .select_from(DL)
+            .join(Liquidacion, Liquidacion.id == DL.liquidacion_id)
+            .join(DC, DL.debito_credito_id == DC.id, isouter=True)
+            .where(Liquidacion.resumen_id == resumen_id)
+            .group_by(DL.liquidacion_id)
+        )).all()
+    }
+
+    liqs = (await db.execute(
+        select(Liquidacion).where(Liquidacion.resumen_id == resumen_id)
+    )).scalars().all()
+
+    diferencias: List[Dict[str, Any]] = []
+
+    def _comparar(entidad: str, ent_id: int, obj, campo: str, esperado: Decimal) -> None:
+        actual = to_decimal(getattr(obj, campo))
+        if actual != esperado:
+            diferencias.append({
+                "entidad": entidad, "id": ent_id, "campo": campo,
+                "guardado": str(actual), "esperado": str(esperado),
+            })
+            if corregir:
+                setattr(obj, campo, esperado)
+
+    suma_bruto = Decimal("0")
+    suma_debitos = Decimal("0")
+    for liq in liqs:
+        r = esperados.get(liq.id)
+        bruto = to_decimal(r.bruto if r else 0)
+        debitos = to_decimal(r.debitos if r else 0)
+        creditos = to_decimal(r.creditos if r else 0)
+        _comparar("liquidacion", liq.id, liq, "total_bruto", bruto)
+        _comparar("liquidacion", liq.id, liq, "total_debitos", debitos)
+        _comparar("liquidacion", liq.id, liq, "total_neto", bruto - debitos + creditos)
+        suma_bruto += bruto
+        suma_debitos += debitos
+
+    _comparar("resumen", resumen.id, resumen, "total_bruto", suma_bruto)
+    _comparar("resumen", resumen.id, resumen, "total_debitos", suma_debitos)
+
+    if corregir and diferencias:
+        await db.flush()
+
+    return {
+        "resumen_id": resumen_id,
+        "liquidaciones": len(liqs),
+        "ok": not diferencias,
+        "corregido": bool(corregir and diferencias),
+        "diferencias": diferencias,
+    }
+
 def now_string() -> str:
     return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -230,8 +554,13 @@ async def reabrir_liquidacion_creando_version(
     db: AsyncSession,
     liquidacion_id: int,
     nro_base: str,  # ej: "000123"
+    *,
+    avance: Optional[Callable[[], Awaitable[None]]] = None,
 ) -> Liquidacion:
-    """Crea nueva versión (version+1) clonando detalles (prev_detalle_id=old.id, pagado=old.pagado)."""
+    """
+    Crea nueva versión (version+1) clonando detalles (prev_detalle_id=old.id, pagado=old.pagado).
+    `avance` se llama con los detalles ya clonados, antes de los totales.
+    """
     old = await db.get(Liquidacion, liquidacion_id)
     if not old:
         raise HTTPException(404, "Liquidación no encontrada")
@@ -269,6 +598,7 @@ async def reabrir_liquidacion_creando_version(
             medico_id=d.medico_id,
             obra_social_id=d.obra_social_id,
             prestacion_id=d.prestacion_id,
+            atencion_id=d.atencion_id,
             prev_detalle_id=d.id,             # << enlace a la versión previa
             importe=d.importe,
             debito_credito_id=None,           # arranca sin DC
@@ -276,7 +606,10 @@ async def reabrir_liquidacion_creando_version(
         ))
 
     await db.flush()
+    if avance is not None:
+        await avance()
     await recomputar_totales_de_liquidacion(db, new_liq.id)
+    exports_cache.invalidar_liquidacion(old.id, old.resumen_id)
     return new_liq
 
 async def reabrir_liquidacion_simple(db: AsyncSession, liquidacion_id: int) -> Liquidacion:
@@ -289,6 +622,7 @@ async def reabrir_liquidacion_simple(db: AsyncSession, liquidacion_id: int) -> L
     liq.cierre_timestamp = None
     await db.flush()
     await db.refresh(liq)
+    exports_cache.invalidar_liquidacion(liq.id, liq.resumen_id)
     return liq
 
 async def _base_bruto_por_medico_en_resumen(db: AsyncSession, resumen_id: int) -> dict[int, Decimal]:
@@ -1,9 +1,9 @@
 # services/liquidaciones_v2.py
 
-from sqlalchemy import select, func, and_, or_, literal, String, cast,case
+from sqlalchemy import select, func, and_, or_, literal, String, cast, case, insert, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 from decimal import Decimal
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 import re
 
 from app.db.models import (
@@ -23,7 +23,7 @@ def to_dec(x) -> Decimal:
 def desdoblar_en_actores(row: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     row: mapping con las columnas de GuardarAtencion ya seleccionadas.
-    Devuelve piezas: {prestacion_id, medico_id, importe}
+    Devuelve piezas: {prestacion_id, atencion_id, medico_id, importe}
     """
     piezas: List[Dict[str, Any]] = []
     factor = int(row.get("cantidad") or 1) * int(row.get("cantidad_tratamiento") or 1)
@@ -37,6 +37,7 @@ def desdoblar_en_actores(row: Dict[str, Any]) -> List[Dict[str, Any]]:
         if bruto > 0:
             piezas.append({
                 "prestacion_id": str(id_atencion),
+                "atencion_id": int(id_atencion),
                 "medico_id": int(medico_id),
                 "importe": bruto,
             })
@@ -50,6 +51,7 @@ def desdoblar_en_actores(row: Dict[str, Any]) -> List[Dict[str, Any]]:
         if imp > 0:
             piezas.append({
                 "prestacion_id": str(id_atencion),
+                "atencion_id": int(id_atencion),
                 "medico_id": int(ayud1),
                 "importe": imp,
             })
@@ -62,6 +64,7 @@ def desdoblar_en_actores(row: Dict[str, Any]) -> List[Dict[str, Any]]:
         if imp > 0:
             piezas.append({
                 "prestacion_id": str(id_atencion),
+                "atencion_id": int(id_atencion),
                 "medico_id": int(ayud2),
                 "importe": imp,
             })
@@ -84,14 +87,97 @@ async def calcular_version_y_formatear_nro(
     return version, nro_fmt
 
 # -------- 3) Construir detalles y actualizar totales --------
-async def construir_detalles_y_totales(db: AsyncSession, liquidacion_id: int) -> None:
-    liq = (await db.execute(select(Liquidacion).where(Liquidacion.id == liquidacion_id))).scalars().first()
-    if not liq:
-        return
+def _filtros_atenciones(os_id: int, anio: int, mes: int) -> tuple:
+    return (
+        GuardarAtencion.NRO_OBRA_SOCIAL == os_id,
+        GuardarAtencion.ANIO_PERIODO == anio,
+        GuardarAtencion.MES_PERIODO == mes,
+        GuardarAtencion.EXISTE == "S",
+    )
 
-    anio, mes = int(liq.anio_periodo), int(liq.mes_periodo)
-    os_id = int(liq.obra_social_id)
-    periodo = period_str(anio, mes)
+def _prev_detalles_subq(liq: Liquidacion):
+    """
+    (atencion_id, MAX(detalle.id)) de las versiones anteriores del mismo OS+periodo.
+    """
+    return (
+        select(
+            DetalleLiquidacion.atencion_id.label("atencion_id"),
+            func.max(DetalleLiquidacion.id).label("prev_id"),
+        )
+        .join(Liquidacion, Liquidacion.id == DetalleLiquidacion.liquidacion_id)
+        .where(
+            Liquidacion.obra_social_id == liq.obra_social_id,
+            Liquidacion.anio_periodo == liq.anio_periodo,
+            Liquidacion.mes_periodo == liq.mes_periodo,
+            Liquidacion.version < liq.version,
+        )
+        .group_by(DetalleLiquidacion.atencion_id)
+    )
+
+async def _insertar_detalles_bulk(db: AsyncSession, liq: Liquidacion) -> Decimal:
+    """
+    Mismo desdoble que `desdoblar_en_actores`, pero en un único INSERT ... SELECT:
+    una rama del UNION ALL por actor (principal, ayudante, ayudante 2).
+    Devuelve el total bruto insertado.
+    """
+    GA = GuardarAtencion
+    os_id, anio, mes = int(liq.obra_social_id), int(liq.anio_periodo), int(liq.mes_periodo)
+    filtros = _filtros_atenciones(os_id, anio, mes)
+
+    # factor = (cantidad or 1) * (cantidad_tratamiento or 1)
+    factor = func.coalesce(func.nullif(GA.CANTIDAD, 0), 1) * func.coalesce(func.nullif(GA.CANT_TRATAMIENTO, 0), 1)
+    bruto_principal = GA.VALOR_CIRUJIA * factor
+
+    piezas = union_all(
+        select(
+            GA.ID.label("atencion_id"), literal(0).label("actor"),
+            GA.NRO_SOCIO.label("medico_id"), bruto_principal.label("importe"),
+        ).where(*filtros, GA.NRO_SOCIO != 0, bruto_principal > 0),
+        select(
+            GA.ID, literal(1), GA.AYUDANTE, GA.VALOR_AYUDANTE,
+        ).where(*filtros, GA.AYUDANTE != 0, GA.VALOR_AYUDANTE > 0),
+        select(
+            GA.ID, literal(2), GA.AYUDANTE_2, GA.VALOR_AYUDANTE_2,
+        ).where(*filtros, GA.AYUDANTE_2 != 0, GA.VALOR_AYUDANTE_2 > 0),
+    ).subquery("piezas")
+
+    prestacion_col = cast(piezas.c.atencion_id, String(16))
+    origen = piezas
+    if liq.version > 0:
+        prev = _prev_detalles_subq(liq).subquery("prev")
+        origen = piezas.outerjoin(prev, prev.c.atencion_id == piezas.c.atencion_id)
+        prev_col = prev.c.prev_id
+    else:
+        prev_col = literal(None)
+
+    src = (
+        select(
+            literal(liq.id), piezas.c.medico_id, literal(os_id), prestacion_col,
+            piezas.c.atencion_id, prev_col, piezas.c.importe, literal(0),
+        )
+        .select_from(origen)
+        .order_by(piezas.c.atencion_id, piezas.c.actor)
+    )
+    await db.execute(
+        insert(DetalleLiquidacion).from_select(
+            ["liquidacion_id", "medico_id", "obra_social_id", "prestacion_id",
+             "atencion_id", "prev_detalle_id", "importe", "pagado"],
+            src,
+        )
+    )
+
+    q = await db.execute(
+        select(func.coalesce(func.sum(DetalleLiquidacion.importe), 0))
+        .where(DetalleLiquidacion.liquidacion_id == liq.id)
+    )
+    return to_dec(q.scalar_one())
+
+async def _insertar_detalles_por_fila(db: AsyncSession, liq: Liquidacion) -> Decimal:
+    """
+    Camino original: un DetalleLiquidacion ORM por pieza. Se mantiene para
+    comparar contra el modo bulk.
+    """
+    os_id, anio, mes = int(liq.obra_social_id), int(liq.anio_periodo), int(liq.mes_periodo)
 
     # traer atenciones del periodo
     rows = (await db.execute(
@@ -109,48 +195,26 @@ async def construir_detalles_y_totales(db: AsyncSession, liquidacion_id: int) ->
             GuardarAtencion.CANT_TRATAMIENTO.label("cantidad_tratamiento"),
             GuardarAtencion.AYUDANTE.label("nro_socio_ayudante"),
             GuardarAtencion.AYUDANTE_2.label("nro_socio_ayudante_2"),
-        ).where(
-            GuardarAtencion.NRO_OBRA_SOCIAL == os_id,
-            GuardarAtencion.ANIO_PERIODO == anio,
-            GuardarAtencion.MES_PERIODO == mes,
-            GuardarAtencion.EXISTE == "S",
-        )
+        ).where(*_filtros_atenciones(os_id, anio, mes))
     )).mappings().all()
 
-    # mapa para buscar el último detalle anterior por prestacion_id
-    prev_detalle_by_prest: Dict[str, int] = {}
-
+    # mapa para buscar el último detalle anterior por atencion_id
+    prev_detalle_by_atencion: Dict[int, int] = {}
     if liq.version > 0:
-        # buscar el último detalle anterior (máxima version < liq.version) para mismas prestaciones
-        # primero obtengo ids de liquidaciones previas para el mismo OS+periodo
-        prev_liq_ids = (await db.execute(
-            select(Liquidacion.id).where(
-                Liquidacion.obra_social_id == os_id,
-                Liquidacion.anio_periodo == anio,
-                Liquidacion.mes_periodo == mes,
-                Liquidacion.version < liq.version
-            )
-        )).scalars().all()
-
-        if prev_liq_ids:
-            prev_detalles = (await db.execute(
-                select(DetalleLiquidacion.prestacion_id, func.max(DetalleLiquidacion.id))
-                .where(DetalleLiquidacion.liquidacion_id.in_(prev_liq_ids))
-                .group_by(DetalleLiquidacion.prestacion_id)
-            )).all()
-            prev_detalle_by_prest = {str(p): int(did) for (p, did) in prev_detalles}
+        prev_detalles = (await db.execute(_prev_detalles_subq(liq))).all()
+        prev_detalle_by_atencion = {int(a): int(did) for (a, did) in prev_detalles if a is not None}
 
     total_bruto = Decimal("0")
-
     for r in rows:
         piezas = desdoblar_en_actores(dict(r))
         for p in piezas:
-            prev_id = prev_detalle_by_prest.get(p["prestacion_id"])
+            prev_id = prev_detalle_by_atencion.get(p["atencion_id"])
             det = DetalleLiquidacion(
                 liquidacion_id=liq.id,
                 medico_id=p["medico_id"],
                 obra_social_id=os_id,
                 prestacion_id=p["prestacion_id"],
+                atencion_id=p["atencion_id"],
                 prev_detalle_id=prev_id,
                 importe=p["importe"],
             )
@@ -158,26 +222,55 @@ async def construir_detalles_y_totales(db: AsyncSession, liquidacion_id: int) ->
             total_bruto += p["importe"]
 
     await db.flush()
+    return total_bruto
+
+async def construir_detalles_y_totales(
+    db: AsyncSession,
+    liquidacion_id: int,
+    *,
+    bulk: bool = True,
+    avance: Optional[Callable[[], Awaitable[None]]] = None,
+) -> None:
+    """
+    Genera los DetalleLiquidacion de la liquidación a partir de guardar_atencion
+    y actualiza sus totales.
+      - bulk=True: INSERT ... SELECT en el servidor (sin objetos ORM por fila).
+      - bulk=False: desdoble en Python fila por fila (camino original).
+    `avance` (opcional) se llama con los detalles ya insertados, antes de los totales.
+    """
+    liq = (await db.execute(select(Liquidacion).where(Liquidacion.id == liquidacion_id))).scalars().first()
+    if not liq:
+        return
+
+    anio, mes = int(liq.anio_periodo), int(liq.mes_periodo)
+    os_id = int(liq.obra_social_id)
+    periodo = period_str(anio, mes)
+
+    if bulk:
+        total_bruto = await _insertar_detalles_bulk(db, liq)
+    else:
+        total_bruto = await _insertar_detalles_por_fila(db, liq)
+    if avance is not None:
+        await avance()
 
     # Débitos/Créditos del periodo actual para las atenciones incluidas
-    atencion_ids = [str(r["id_atencion"]) for r in rows]
+    atenciones_subq = select(GuardarAtencion.ID).where(*_filtros_atenciones(os_id, anio, mes))
     sum_debitos = Decimal("0")
     sum_creditos = Decimal("0")
-    if atencion_ids:
-        dc = (await db.execute(
-            select(Debito_Credito.tipo, func.sum(Debito_Credito.monto))
-            .where(
-                Debito_Credito.obra_social_id == os_id,
-                Debito_Credito.periodo == periodo,
-                Debito_Credito.id_atencion.in_(atencion_ids),
-            )
-            .group_by(Debito_Credito.tipo)
-        )).all()
-        for tipo, total in dc:
-            if tipo == "d":
-                sum_debitos += to_dec(total)
-            else:
-                sum_creditos += to_dec(total)
+    dc = (await db.execute(
+        select(Debito_Credito.tipo, func.sum(Debito_Credito.monto))
+        .where(
+            Debito_Credito.obra_social_id == os_id,
+            Debito_Credito.periodo == periodo,
+            Debito_Credito.id_atencion.in_(atenciones_subq),
+        )
+        .group_by(Debito_Credito.tipo)
+    )).all()
+    for tipo, total in dc:
+        if tipo == "d":
+            sum_debitos += to_dec(total)
+        else:
+            sum_creditos += to_dec(total)
 
     liq.total_bruto = total_bruto
     liq.total_debitos = sum_debitos   # (separado de créditos)
@@ -186,11 +279,7 @@ async def construir_detalles_y_totales(db: AsyncSession, liquidacion_id: int) ->
     await db.commit()
 
 # -------- 4) Vista de filas para InsuranceDetail --------
-async def vista_detalles_liquidacion(
-    db: AsyncSession,
-    liquidacion_id: int,
-    medico_id: Optional[int] = None,
-) -> Tuple[List[Dict[str, Any]], int]:
+def _vista_detalles_stmt(liquidacion_id: int, medico_id: Optional[int] = None):
     DL, GA, DC = DetalleLiquidacion, GuardarAtencion, Debito_Credito
 
     NRO_AFILIADO = getattr(GA, "NRO_AFILIADO", literal(""))
@@ -233,47 +322,96 @@ async def vista_detalles_liquidacion(
             monto_ui_col,
         )
         .select_from(DL)
-        .join(GA, DL.prestacion_id == cast(GA.ID, String(16)), isouter=True)
+        .join(GA, DL.atencion_id == GA.ID, isouter=True)
         .join(DC, DL.debito_credito_id == DC.id, isouter=True)
         .where(DL.liquidacion_id == liquidacion_id)
         .order_by(DL.id)
     )
     if medico_id is not None:
         stmt = stmt.where(DL.medico_id == medico_id)
+    return stmt
+
+def _fila_vista(r) -> Dict[str, Any]:
+    importe = Decimal(str(r["importe"] or "0"))
+    tipo = (r["tipo"] or "N").upper()
+    monto = Decimal(str(r["monto"] or "0"))
+    total = importe - monto if tipo == "D" else importe + monto if tipo == "C" else importe
+    xCant = f'{int(r.get("cantidad") or 1)}-{int(r.get("cantidad_tratamiento") or 1)}'
+
+    return {
+        "det_id": r["det_id"],
+        "socio": r["socio"],
+        "nombreSocio": (r["nombreSocio"] or "").strip(),
+        "matri": r["matri"],
+        "nroOrden": r["nroOrden"],
+        "fecha": str(r["fecha"]) if r["fecha"] is not None else "",
+        "codigo": r["codigo"],
+        "nroAfiliado": r.get("nroAfiliado") or "",
+        "afiliado": r.get("afiliado") or "",
+        "xCant": xCant,
+        "porcentaje": float(r["porcentaje"] or 0),
+        "honorarios": float(r["honorarios"] or 0),
+        "gastos": float(r["gastos"] or 0),
+        "coseguro": 0.0,
+        "importe": float(importe),
+        "pagado": 0.0,
+        "tipo": tipo,
+        "monto": float(monto),
+        "obs": r.get("obs_dc") or None,
+        "total": float(total),
+    }
+
+async def contar_detalles_liquidacion(
+    db: AsyncSession,
+    liquidacion_id: int,
+    medico_id: Optional[int] = None,
+) -> int:
+    """
+    COUNT sólo sobre detalle_liquidacion: los joins de la vista son 1:1 y no cambian el total.
+    """
+    stmt = select(func.count(DetalleLiquidacion.id)).where(DetalleLiquidacion.liquidacion_id == liquidacion_id)
+    if medico_id is not None:
+        stmt = stmt.where(DetalleLiquidacion.medico_id == medico_id)
+    return int((await db.execute(stmt)).scalar_one() or 0)
+
+async def vista_detalles_liquidacion(
+    db: AsyncSession,
+    liquidacion_id: int,
+    medico_id: Optional[int] = None,
+    cursor: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Paginación keyset sobre DetalleLiquidacion.id:
+      - cursor: último det_id recibido (se devuelven ids > cursor)
+      - limit: tamaño de página (None = todas las filas)
+    Devuelve (filas, total) con total de un COUNT aparte.
+    """
+    stmt = _vista_detalles_stmt(liquidacion_id, medico_id)
+    if cursor is not None:
+        stmt = stmt.where(DetalleLiquidacion.id > cursor)
+    if limit is not None:
+        stmt = stmt.limit(limit)
 
     rows = (await db.execute(stmt)).mappings().all()
+    out = [_fila_vista(r) for r in rows]
+    total = await contar_detalles_liquidacion(db, liquidacion_id, medico_id)
+    return out, total
 
-    out: List[Dict[str, Any]] = []
-    for r in rows:
-        importe = Decimal(str(r["importe"] or "0"))
-        tipo = (r["tipo"] or "N").upper()
-        monto = Decimal(str(r["monto"] or "0"))
-        total = importe - monto if tipo == "D" else importe + monto if tipo == "C" else importe
-        xCant = f'{int(r.get("cantidad") or 1)}-{int(r.get("cantidad_tratamiento") or 1)}'
-
-        out.append({
-            "det_id": r["det_id"],
-            "socio": r["socio"],
-            "nombreSocio": (r["nombreSocio"] or "").strip(),
-            "matri": r["matri"],
-            "nroOrden": r["nroOrden"],
-            "fecha": str(r["fecha"]) if r["fecha"] is not None else "",
-            "codigo": r["codigo"],
-            "nroAfiliado": r.get("nroAfiliado") or "",
-            "afiliado": r.get("afiliado") or "",
-            "xCant": xCant,
-            "porcentaje": float(r["porcentaje"] or 0),
-            "honorarios": float(r["honorarios"] or 0),
-            "gastos": float(r["gastos"] or 0),
-            "coseguro": 0.0,
-            "importe": float(importe),
-            "pagado": 0.0,
-            "tipo": tipo,
-            "monto": float(monto),
-            "obs": r.get("obs_dc") or None,
-            "total": float(total),
-        })
-    return out, len(out)
+async def stream_vista_detalles_liquidacion(
+    db: AsyncSession,
+    liquidacion_id: int,
+    medico_id: Optional[int] = None,
+    chunk: int = 1000,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Igual que `vista_detalles_liquidacion` pero con cursor del lado del servidor:
+    las filas se leen de a `chunk` y nunca se materializa la liquidación entera.
+    """
+    stmt = _vista_detalles_stmt(liquidacion_id, medico_id).execution_options(yield_per=chunk)
+    result = await db.stream(stmt)
+    async for r in result.mappings():
+        yield _fila_vista(r)
 
 async def _ajuste_por_dc(db: AsyncSession, debito_credito_id: Optional[int]) -> Decimal:
     """
@@ -123,7 +123,7 @@ async def calcular_bruto_y_actores(
 ) -> Dict[str, Any]:
     """
     Suma el BRUTO por actores (médico/ayudantes) para una OS+período.
-    Excluye prestaciones ya liquidadas según DetalleLiquidacion.prestacion_id.
+    Excluye prestaciones ya liquidadas según DetalleLiquidacion.atencion_id.
     """
     where = [
         GuardarAtencion.NRO_OBRA_SOCIAL == obra_social_id,
@@ -132,9 +132,9 @@ async def calcular_bruto_y_actores(
     ]
 
     if excluir_ya_liquidadas:
-        # DetalleLiquidacion.prestacion_id es String; la fuente es INT ⇒ CAST
+        # join por la columna entera indexada (prestacion_id es String y requeriría CAST)
         existe = exists().where(
-            DetalleLiquidacion.prestacion_id == cast(GuardarAtencion.ID, String)
+            DetalleLiquidacion.atencion_id == GuardarAtencion.ID
         )
         where.append(~existe)
 
@@ -310,6 +310,7 @@ async def crear_liquidacion_con_totales(
                 medico_id=int(a["actor_id"]),
                 obra_social_id=obra_social_id,
                 prestacion_id=str(int(a["id_atencion"])),  # UNIQUE
+                atencion_id=int(a["id_atencion"]),
                 debito_credito_id=None,
                 bruto=to_decimal(a["bruto"]),
                 debito_monto=Decimal("0.00"),
@@ -0,0 +1,162 @@
+"""
+Backfills de mantenimiento sobre tablas grandes (hoy: listado_medico), reanudables.
+
+- Paginación keyset por ID (WHERE ID > :ultimo ORDER BY ID LIMIT n) en lugar de OFFSET: cada
+  lote cuesta lo mismo aunque vaya por la fila 400.000.
+- Checkpoint en `mantenimiento_checkpoint`: el UPDATE del lote y el avance se commitean en la
+  misma transacción; si el proceso se corta, la próxima corrida sigue desde `ultimo_id`.
+- Lo CPU-bound (pbkdf2 de 480k rondas) va a un pool de procesos (spawn). Mientras el pool
+  procesa un lote se lee el siguiente.
+- Escritura: un UPDATE por fila con bindparams, todo el lote en un solo executemany.
+- dry_run: lee y calcula todo pero no escribe ni mueve el checkpoint.
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.passwords import hash_password
+from app.db.database import AsyncSessionLocal
+from app.db.models import MantenimientoCheckpoint
+
+T = TypeVar("T")
+
+# filas de un lote -> cambios [{"ID": ..., columna: valor}]; sólo las filas que cambian
+Procesar = Callable[[Sequence[Any], Executor], Awaitable[List[Dict[str, Any]]]]
+Reportar = Callable[[str], None]
+
+
+@dataclass
+class Tarea:
+    nombre: str                 # clave del checkpoint
+    modelo: Any                 # modelo ORM con PK `ID`
+    columnas: Sequence[Any]     # se leen después del ID
+    procesar: Procesar
+
+
+@dataclass
+class Avance:
+    ultimo_id: int = 0
+    procesados: int = 0
+    actualizados: int = 0
+    pendientes: int = 0         # filas con ID > ultimo_id al arrancar
+    segundos: float = 0.0
+
+
+def crear_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    # spawn: los hijos no heredan el engine ni el loop del padre
+    return ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count() or 1,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+async def en_pool(pool: Executor, fn: Callable[[Any], T], items: Sequence[Any]) -> List[T]:
+    loop = asyncio.get_running_loop()
+    return list(await asyncio.gather(*(loop.run_in_executor(pool, fn, x) for x in items)))
+
+
+def hashear_todos(plains: Sequence[str], workers: Optional[int] = None) -> List[str]:
+    """Versión sincrónica para migraciones de Alembic: hash_password de todo en paralelo."""
+    if not plains:
+        return []
+    workers = workers or os.cpu_count() or 1
+    with crear_pool(workers) as pool:
+        return list(pool.map(hash_password, plains, chunksize=max(1, len(plains) // (workers * 4))))
+
+
+def _duracion(seg: float) -> str:
+    seg = int(seg)
+    return f"{seg // 3600}h{seg % 3600 // 60:02d}m" if seg >= 3600 else f"{seg // 60}m{seg % 60:02d}s"
+
+
+async def _leer(db: AsyncSession, tarea: Tarea, desde_id: int, batch: int) -> Sequence[Any]:
+    pk = tarea.modelo.ID
+    stmt = select(pk, *tarea.columnas).where(pk > desde_id).order_by(pk).limit(batch)
+    return (await db.execute(stmt)).all()
+
+
+async def _checkpoint(db: AsyncSession, nombre: str, reiniciar: bool, dry_run: bool) -> MantenimientoCheckpoint:
+    cp = await db.get(MantenimientoCheckpoint, nombre)
+    if cp is None:
+        cp = MantenimientoCheckpoint(tarea=nombre, ultimo_id=0, procesados=0, actualizados=0, terminado=False)
+        db.add(cp)
+    if reiniciar:
+        cp.ultimo_id, cp.procesados, cp.actualizados = 0, 0, 0
+    cp.terminado = False
+    if dry_run:
+        db.expunge(cp)      # no se persiste nada
+    else:
+        await db.commit()
+    return cp
+
+
+async def correr(
+    tarea: Tarea,
+    *,
+    batch: int = 500,
+    workers: Optional[int] = None,
+    dry_run: bool = False,
+    reiniciar: bool = False,
+    reportar: Reportar = print,
+) -> Avance:
+    """
+    Corre `tarea` desde su checkpoint hasta el final de la tabla. Una tarea terminada se puede
+    volver a correr: sigue desde su último ID (sólo filas nuevas); reiniciar=True arranca de cero.
+    """
+    t0 = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        cp = await _checkpoint(db, tarea.nombre, reiniciar, dry_run)
+        av = Avance(ultimo_id=cp.ultimo_id)
+        pk = tarea.modelo.ID
+        av.pendientes = int((await db.execute(
+            select(func.count()).select_from(tarea.modelo).where(pk > av.ultimo_id)
+        )).scalar_one())
+        modo = " (dry-run)" if dry_run else ""
+        reportar(f"[{tarea.nombre}]{modo} desde ID>{av.ultimo_id}: {av.pendientes} filas")
+
+        with crear_pool(workers) as pool:
+            filas = await _leer(db, tarea, av.ultimo_id, batch)
+            while filas:
+                # el pool procesa este lote mientras se lee el siguiente
+                siguientes, cambios = await asyncio.gather(
+                    _leer(db, tarea, filas[-1][0], batch),
+                    tarea.procesar(filas, pool),
+                )
+                av.ultimo_id = filas[-1][0]
+                av.procesados += len(filas)
+                av.actualizados += len(cambios)
+                if not dry_run:
+                    if cambios:
+                        await db.execute(update(tarea.modelo), cambios)
+                    cp.ultimo_id = av.ultimo_id
+                    cp.procesados += len(filas)
+                    cp.actualizados += len(cambios)
+                    await db.commit()
+
+                dur = time.perf_counter() - t0
+                ritmo = av.procesados / dur if dur else 0.0
+                resto = (av.pendientes - av.procesados) / ritmo if ritmo else 0.0
+                pct = 100.0 * av.procesados / av.pendientes if av.pendientes else 100.0
+                reportar(
+                    f"[{tarea.nombre}]{modo} {av.procesados}/{av.pendientes} ({pct:.1f}%) "
+                    f"ID<={av.ultimo_id} actualizados={av.actualizados} "
+                    f"{ritmo:.0f} filas/s ETA {_duracion(resto)}"
+                )
+                filas = siguientes
+
+        if not dry_run:
+            cp.terminado = True
+            await db.commit()
+
+    av.segundos = time.perf_counter() - t0
+    reportar(f"[{tarea.nombre}]{modo} listo: {av.actualizados} actualizados en {_duracion(av.segundos)}")
+    return av
@@ -0,0 +1,301 @@
+"""
+Índice en memoria para el type-ahead de médicos (GET /medicos?q= y /publicidad-medicos/medicos/buscar).
+
+listado_medico son unos pocos miles de filas: se cargan enteras al arrancar y la búsqueda
+se resuelve en memoria, sin ir a MySQL. /medicos/count responde con el mismo índice (contar()).
+
+- Nombres: token -> ids, con tokens sin acentos y en minúscula de NOMBRE, apellido, nombre_ y
+  mail. Cada palabra de la consulta tiene que estar contenida en algún token: la misma
+  semántica que el FULLTEXT ngram de app/services/medicos_busqueda.py, así que el resultado no
+  depende de si respondió el índice o la base. La palabra más larga recorre los tokens
+  distintos; las demás sólo filtran esos candidatos.
+- Números: (texto, id) ordenado de nro socio, matrícula provincial y documento; una palabra
+  de dígitos es prefijo de alguno (el número completo es el caso exacto).
+- Escrituras por el ORM: un listener de la sesión junta los IDs de ListadoMedico tocados en
+  cada flush y, al commitear, los vuelve a leer y actualiza el índice.
+- Lo que no pasa por este proceso (otro worker uvicorn, el sistema viejo) sólo se ve en la
+  recarga completa: si el índice tiene más de MEDICOS_AUTOCOMPLETE_MAX_EDAD_SEG, buscar()
+  devuelve None (el caller va a la base) y dispara la recarga en segundo plano.
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.db.models import ListadoMedico
+from app.services.medicos_busqueda import palabras
+
+log = logging.getLogger(__name__)
+
+_FIN = "\U0010ffff"   # cota superior para rangos de prefijo
+
+M = ListadoMedico
+_COLUMNAS = (
+    M.ID, M.NOMBRE, M.apellido, M.nombre_, M.NRO_SOCIO, M.MATRICULA_PROV, M.MATRICULA_NAC,
+    M.DOCUMENTO, M.MAIL_PARTICULAR, M.TELE_PARTICULAR, M.FECHA_INGRESO, M.EXISTE,
+)
+
+
+def plegar(s: Optional[str]) -> str:
+    """
+    Minúsculas y sin diacríticos, salvo la ñ ("Núñez" -> "nuñez"): igual que utf8_spanish2_ci,
+    la collation de la búsqueda en la base, donde ñ es una letra distinta de n.
+    """
+    out: List[str] = []
+    for c in unicodedata.normalize("NFKD", (s or "").lower()):
+        if not unicodedata.combining(c):
+            out.append(c)
+        elif c == "\u0303" and out and out[-1] == "n":
+            out[-1] = "ñ"
+    return "".join(out)
+
+
+@dataclass
+class _Fila:
+    datos: Dict[str, Any]        # mismas claves que la consulta de listar_medicos
+    orden: Tuple[str, int]       # ORDER BY NOMBRE
+    tokens: Set[str]
+    numeros: Set[str]
+
+
+def _fila(r: Any) -> _Fila:
+    existe = (r.EXISTE or "").strip()
+    numeros = {str(n) for n in (r.NRO_SOCIO, r.MATRICULA_PROV) if n}
+    doc = (r.DOCUMENTO or "").strip()
+    if doc and doc != "0":
+        numeros.add(doc)
+    return _Fila(
+        datos={
+            "id": r.ID,
+            "nro_socio": r.NRO_SOCIO,
+            "nombre": r.NOMBRE,
+            "matricula_prov": r.MATRICULA_PROV,
+            "matricula_nac": r.MATRICULA_NAC,
+            "documento": r.DOCUMENTO,
+            "mail_particular": r.MAIL_PARTICULAR,
+            "tele_particular": r.TELE_PARTICULAR,
+            "fecha_ingreso": r.FECHA_INGRESO.strftime("%Y-%m-%d") if r.FECHA_INGRESO else None,
+            "activo": 1 if existe.upper() == "S" else 0,
+            "existe": existe,
+        },
+        orden=(plegar(r.NOMBRE).replace("ñ", "n\x7f"), r.ID),   # ñ entre n y o, como en la base
+        tokens={t for campo in (r.NOMBRE, r.apellido, r.nombre_, r.MAIL_PARTICULAR) for t in palabras(plegar(campo))},
+        numeros=numeros,
+    )
+
+
+@dataclass
+class _Indice:
+    filas: Dict[int, _Fila] = field(default_factory=dict)
+    tokens: Dict[str, Set[int]] = field(default_factory=dict)
+    numeros: List[Tuple[str, int]] = field(default_factory=list)
+    cargado: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def construir(cls, rows: Iterable[Any]) -> "_Indice":
+        idx = cls()
+        for r in rows:
+            f = _fila(r)
+            idx.filas[r.ID] = f
+            for t in f.tokens:
+                idx.tokens.setdefault(t, set()).add(r.ID)
+            idx.numeros.extend((n, r.ID) for n in f.numeros)
+        idx.numeros.sort()
+        return idx
+
+    def quitar(self, medico_id: int) -> None:
+        f = self.filas.pop(medico_id, None)
+        if f is None:
+            return
+        for t in f.tokens:
+            ids = self.tokens.get(t)
+            if ids is not None:
+                ids.discard(medico_id)
+                if not ids:
+                    del self.tokens[t]
+        for k in f.numeros:
+            i = bisect.bisect_left(self.numeros, (k, medico_id))
+            if i < len(self.numeros) and self.numeros[i] == (k, medico_id):
+                del self.numeros[i]
+
+    def poner(self, r: Any) -> None:
+        self.quitar(r.ID)
+        f = _fila(r)
+        self.filas[r.ID] = f
+        for t in f.tokens:
+            self.tokens.setdefault(t, set()).add(r.ID)
+        for n in f.numeros:
+            bisect.insort(self.numeros, (n, r.ID))
+
+    @staticmethod
+    def _prefijo(arr: List[Tuple[str, int]], pref: str) -> Set[int]:
+        i = bisect.bisect_left(arr, (pref,))
+        j = bisect.bisect_left(arr, (pref + _FIN,))
+        return {mid for _, mid in arr[i:j]}
+
+    def _contiene(self, sub: str) -> Set[int]:
+        return {mid for tok, ids in self.tokens.items() if sub in tok for mid in ids}
+
+    def buscar(self, terminos: List[str]) -> List[_Fila]:
+        # números: prefijo (bisect). Texto: el término más largo recorre los tokens (es el que
+        # deja menos candidatos); el resto se verifica sobre los tokens de cada candidato.
+        ids: Optional[Set[int]] = None
+        for t in (t for t in terminos if t.isdigit()):
+            hits = self._prefijo(self.numeros, t)
+            ids = hits if ids is None else ids & hits
+            if not ids:
+                return []
+        texto = sorted((t for t in terminos if not t.isdigit()), key=len, reverse=True)
+        if texto:
+            hits = self._contiene(texto[0]) if ids is None else {
+                i for i in ids if any(texto[0] in tok for tok in self.filas[i].tokens)
+            }
+            ids = {
+                i for i in hits
+                if all(any(t in tok for tok in self.filas[i].tokens) for t in texto[1:])
+            }
+        return sorted((self.filas[i] for i in ids or ()), key=lambda f: f.orden)
+
+
+_indice: Optional[_Indice] = None
+_recarga: Optional[asyncio.Task] = None
+_tocados_en_recarga: Set[int] = set()
+
+
+def _fresco() -> bool:
+    max_edad = settings.MEDICOS_AUTOCOMPLETE_MAX_EDAD_SEG
+    return _indice is not None and max_edad > 0 and time.monotonic() - _indice.cargado <= max_edad
+
+
+async def cargar() -> None:
+    """Carga completa (arranque y cuando el índice venció)."""
+    global _indice
+    _tocados_en_recarga.clear()
+    t0 = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(*_COLUMNAS))).all()
+    _indice = _Indice.construir(rows)
+    log.info("Índice de médicos: %s filas en %.0f ms", len(rows), (time.perf_counter() - t0) * 1000)
+    # lo commiteado mientras leíamos puede no estar en `rows`
+    if _tocados_en_recarga:
+        await refrescar(set(_tocados_en_recarga))
+
+
+async def iniciar() -> None:
+    """Carga inicial en el lifespan; si falla la API arranca igual y busca en la base."""
+    if settings.MEDICOS_AUTOCOMPLETE_MAX_EDAD_SEG <= 0:
+        return
+    try:
+        await cargar()
+    except Exception:
+        log.exception("Índice de médicos: no se pudo cargar al iniciar")
+
+
+def _disparar_recarga() -> None:
+    global _recarga
+    if _recarga is None or _recarga.done():
+        _recarga = asyncio.create_task(cargar())
+        _recarga.add_done_callback(_log_error)
+
+
+def _log_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception():
+        log.error("Índice de médicos: falló la actualización", exc_info=task.exception())
+
+
+async def refrescar(ids: Set[int]) -> None:
+    """Relee de la base los médicos `ids` (los que ya no existen se quitan)."""
+    if _indice is None or not ids:
+        return
+    if _recarga is not None and not _recarga.done():
+        _tocados_en_recarga.update(ids)
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(*_COLUMNAS).where(M.ID.in_(ids)))).all()
+    encontrados = set()
+    for r in rows:
+        _indice.poner(r)
+        encontrados.add(r.ID)
+    for mid in ids - encontrados:
+        _indice.quitar(mid)
+
+
+def _filtrar(q: Optional[str], estado: str) -> Optional[List[_Fila]]:
+    if not _fresco():
+        if settings.MEDICOS_AUTOCOMPLETE_MAX_EDAD_SEG > 0:
+            _disparar_recarga()
+        return None
+    terminos = [plegar(t) for t in palabras(q)]
+    if not terminos:
+        return None
+    filas = _indice.buscar(terminos)
+    if estado == "activos":
+        filas = [f for f in filas if f.datos["activo"]]
+    elif estado == "inactivos":
+        filas = [f for f in filas if not f.datos["activo"]]
+    return filas
+
+
+def buscar(
+    q: Optional[str],
+    *,
+    estado: str = "todos",
+    skip: int = 0,
+    limit: int = 50,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Filas (mismas claves que la consulta de listar_medicos) ordenadas por nombre, o None si el
+    índice no está cargado o venció, o `q` no tiene nada buscable: en ese caso hay que ir a la base.
+    """
+    filas = _filtrar(q, estado)
+    if filas is None:
+        return None
+    return [dict(f.datos) for f in filas[skip:skip + limit]]
+
+
+def contar(q: Optional[str], *, estado: str = "todos") -> Optional[int]:
+    """Total de buscar() sin paginar (para /medicos/count); None en los mismos casos."""
+    filas = _filtrar(q, estado)
+    return None if filas is None else len(filas)
+
+
+# ---------------------------
+# Escrituras por el ORM
+# ---------------------------
+_CLAVE = "medicos_autocomplete_ids"
+
+
+@event.listens_for(Session, "after_flush")
+def _juntar_tocados(session: Session, flush_context: Any) -> None:
+    ids = {
+        obj.ID for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, ListadoMedico) and obj.ID is not None
+    }
+    if ids:
+        session.info.setdefault(_CLAVE, set()).update(ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _al_commitear(session: Session) -> None:
+    ids = session.info.pop(_CLAVE, None)
+    if not ids or _indice is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:           # commit fuera del loop (scripts sync): lo verá la recarga
+        return
+    loop.create_task(refrescar(ids)).add_done_callback(_log_error)
+
+
+@event.listens_for(Session, "after_rollback")
+def _al_rollback(session: Session) -> None:
+    session.info.pop(_CLAVE, None)
@@ -0,0 +1,66 @@
+"""
+Búsqueda de médicos (listado_medico), compartida por listar/contar médicos, solicitudes y
+el buscador de publicidad.
+
+- Texto: MATCH(busqueda) AGAINST(... IN BOOLEAN MODE) sobre un índice FULLTEXT con parser
+  ngram. `busqueda` es una columna generada STORED (nombre, apellido, nombre_, mail) que
+  mantiene MySQL en cada INSERT/UPDATE, incluidos los que no pasan por el ORM. Con ngram
+  una palabra buscada como frase ("perez") equivale a un "contiene"; acentos y mayúsculas
+  los resuelve la collation utf8_spanish2_ci.
+- Dígitos: prefijo (LIKE '123%') sobre nro_socio_txt, matricula_prov_txt y DOCUMENTO, cada
+  uno con su índice: un rango del índice en lugar de CAST + '%q%' sobre toda la tabla.
+"""
+from __future__ import annotations
+
+import re
+from typing import List, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db.models import ListadoMedico
+
+# ngram_token_size del servidor (default de MySQL); palabras más cortas van como prefijo
+NGRAM_TOKEN_SIZE = 2
+
+# todo lo que no sea letra/dígito separa palabras (también los operadores del modo booleano)
+_SEPARADORES = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def palabras(q: Optional[str]) -> List[str]:
+    return [p for p in _SEPARADORES.split((q or "").strip().lower()) if p]
+
+
+def _like_prefijo(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def expresion_fulltext(terminos: List[str]) -> str:
+    """'+"juan" +"per"' : todas las palabras, cada una como subcadena."""
+    return " ".join(f'+"{t}"' if len(t) >= NGRAM_TOKEN_SIZE else f"+{t}*" for t in terminos)
+
+
+def condicion_busqueda(q: Optional[str]) -> Optional[ColumnElement[bool]]:
+    """
+    Condición WHERE para `q` sobre ListadoMedico, o None si `q` no tiene nada buscable.
+    Cada palabra de dígitos es prefijo de nro socio / matrícula / documento; el resto va al
+    índice FULLTEXT. Todas las palabras tienen que coincidir.
+    """
+    terminos = palabras(q)
+    if not terminos:
+        return None
+
+    M = ListadoMedico
+    conds: List[ColumnElement[bool]] = []
+    for t in (t for t in terminos if t.isdigit()):
+        pref = _like_prefijo(t)
+        conds.append(or_(
+            M.nro_socio_txt.like(pref),
+            M.matricula_prov_txt.like(pref),
+            M.DOCUMENTO.like(pref),
+        ))
+    texto = [t for t in terminos if not t.isdigit()]
+    if texto:
+        conds.append(match(M.busqueda, against=expresion_fulltext(texto)).in_boolean_mode())
+    return and_(*conds) if len(conds) > 1 else conds[0]
@@ -5,7 +5,8 @@ from typing import Optional, List, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.db.models import ListadoMedico, SolicitudRegistro, Especialidad
-from app.core.passwords import hash_password
+from app.services import solicitudes_stats
+from app.core.passwords import hash_password_async
 from app.utils.main import _parse_date
 
 def _int_or_zero(v: Optional[str]) -> int:
@@ -108,7 +109,7 @@ async def create_medico_and_solicitud(db: AsyncSession, body, *, existe="N"):
         # SEXO normalizado
         SEXO = (getattr(body, "gender", None) or "M")[:1].upper(),
     )
-    medico.hashed_password = hash_password(str(getattr(body, "documentNumber", "")))
+    medico.hashed_password = await hash_password_async(str(getattr(body, "documentNumber", "")))
 
     medico.conceps_espec = {
         "conceps": [],
@@ -136,6 +137,7 @@ async def create_medico_and_solicitud(db: AsyncSession, body, *, existe="N"):
     db.add(solicitud)
     await db.commit()
     await db.refresh(solicitud)
+    solicitudes_stats.invalidar()
 
     return medico, solicitud
 
@@ -250,7 +252,7 @@ async def save_medico_admin_draft(
         )
 
         # hashed_password igual que público (usa DNI). Si no hay DNI, hasheá "0"
-        med.hashed_password = hash_password(_nn(getattr(body, "documentNumber", None), "0"))
+        med.hashed_password = await hash_password_async(_nn(getattr(body, "documentNumber", None), "0"))
 
         # conceps_espec default
         med.conceps_espec = {
@@ -284,7 +286,7 @@ async def save_medico_admin_draft(
         med.DOCUMENTO = new_doc
         # si no tenía hash, generalo ahora
         if not getattr(med, "hashed_password", None):
-            med.hashed_password = hash_password(new_doc)
+            med.hashed_password = await hash_password_async(new_doc)
 
     # Contacto
     for attr, src in [
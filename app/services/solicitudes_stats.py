@@ -0,0 +1,95 @@
+"""
+Conteos del dashboard de solicitudes (GET /solicitudes/stats/counts).
+
+- Una sola consulta con SUM(CASE ...) por estado en lugar de cinco COUNT(*); el JOIN a
+  listado_medico sólo se hace cuando hay `q`.
+- Caché por filtro (q, desde, hasta, nuevos_dias) con TTL corto (SOLICITUDES_STATS_TTL_SEG):
+  el polling del dashboard no llega a MySQL. invalidar() se llama al aprobar, rechazar y
+  registrar. Es por proceso: en otro worker uvicorn el dato puede atrasar hasta el TTL.
+"""
+from __future__ import annotations
+
+import time
+from datetime import UTC, datetime, timedelta
+from typing import Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import ListadoMedico, SolicitudRegistro
+from app.services.medicos_busqueda import condicion_busqueda
+
+MAX_ENTRADAS = 256
+
+_cache: Dict[Hashable, Tuple[float, Dict[str, int]]] = {}
+
+
+def invalidar() -> None:
+    _cache.clear()
+
+
+def _guardar(clave: Hashable, valor: Dict[str, int]) -> None:
+    ahora = time.monotonic()
+    if len(_cache) >= MAX_ENTRADAS:
+        for k in [k for k, (expira, _) in _cache.items() if expira <= ahora]:
+            del _cache[k]
+        if len(_cache) >= MAX_ENTRADAS:
+            _cache.clear()
+    _cache[clave] = (ahora + settings.SOLICITUDES_STATS_TTL_SEG, valor)
+
+
+async def _consultar(
+    db: AsyncSession,
+    q: Optional[str],
+    desde: Optional[datetime],
+    hasta: Optional[datetime],
+    nuevos_dias: int,
+) -> Dict[str, int]:
+    S = SolicitudRegistro
+    limite = datetime.now(UTC) - timedelta(days=nuevos_dias)
+
+    def contar(cond):
+        return func.coalesce(func.sum(case((cond, 1), else_=0)), 0)
+
+    stmt = select(
+        func.count(),
+        contar(S.estado == "pendiente"),
+        contar(and_(S.estado == "pendiente", S.created_at >= limite)),
+        contar(S.estado == "aprobada"),
+        contar(S.estado == "rechazada"),
+    ).select_from(S)
+
+    cond = condicion_busqueda(q)
+    if cond is not None:   # medico_id tiene FK con cascade: sin q el JOIN no filtra nada
+        stmt = stmt.join(ListadoMedico, ListadoMedico.ID == S.medico_id).where(cond)
+    if desde:
+        stmt = stmt.where(S.created_at >= desde)
+    if hasta:
+        stmt = stmt.where(S.created_at <= hasta)
+
+    total, pend_total, nueva, aprobada, rechazada = (await db.execute(stmt)).one()
+    return {
+        "total": int(total or 0),
+        "nueva": int(nueva),
+        "pendiente": max(int(pend_total) - int(nueva), 0),
+        "aprobada": int(aprobada),
+        "rechazada": int(rechazada),
+    }
+
+
+async def contar_por_estado(
+    db: AsyncSession,
+    q: Optional[str],
+    desde: Optional[datetime],
+    hasta: Optional[datetime],
+    nuevos_dias: int,
+) -> Dict[str, int]:
+    clave = ((q or "").strip().lower(), desde, hasta, nuevos_dias)
+    hit = _cache.get(clave)
+    if hit is not None and hit[0] > time.monotonic():
+        return dict(hit[1])
+    valor = await _consultar(db, q, desde, hasta, nuevos_dias)
+    if settings.SOLICITUDES_STATS_TTL_SEG > 0:
+        _guardar(clave, valor)
+    return dict(valor)
@@ -0,0 +1,98 @@
+"""
+Guardado de archivos subidos (documentos de médicos, noticias, publicidades).
+
+- El UploadFile se lee de a CHUNK bytes; la escritura a disco (y el sha256 del chunk) corre
+  en un thread, así un PDF escaneado de 50 MB no pasa entero por RAM ni frena el event loop.
+- Límite por tipo (PDF / imagen / resto, UPLOAD_MAX_MB_*) controlado mientras se lee: se
+  corta con 413 apenas se pasa, sin esperar al final.
+- Se escribe a un temporal en la misma carpeta y se renombra con os.replace: el archivo
+  final aparece completo o no aparece. Si algo falla el temporal se borra.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException, UploadFile
+
+from app.core.config import settings
+
+CHUNK = 1024 * 1024
+
+
+@dataclass
+class ArchivoGuardado:
+    nombre: str             # nombre en disco
+    ruta: Path              # ruta en disco
+    size: int
+    sha256: str
+    content_type: str
+    original_name: str
+
+
+def limite_bytes(content_type: Optional[str], filename: Optional[str]) -> int:
+    ct = (content_type or "").lower()
+    ext = Path(filename or "").suffix.lower()
+    if ct == "application/pdf" or ext == ".pdf":
+        mb = settings.UPLOAD_MAX_MB_PDF
+    elif ct.startswith("image/"):
+        mb = settings.UPLOAD_MAX_MB_IMAGEN
+    else:
+        mb = settings.UPLOAD_MAX_MB_OTROS
+    return int(mb * 1024 * 1024)
+
+
+def _escribir(f: BinaryIO, h: "hashlib._Hash", chunk: bytes) -> None:
+    h.update(chunk)
+    f.write(chunk)
+
+
+def _cerrar(f: BinaryIO, tmp: Path, destino: Path) -> None:
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+    os.replace(tmp, destino)
+
+
+def _descartar(f: BinaryIO, tmp: Path) -> None:
+    f.close()
+    tmp.unlink(missing_ok=True)
+
+
+async def guardar_upload(up: UploadFile, carpeta: Path, nombre: str) -> ArchivoGuardado:
+    """Guarda `up` como carpeta/nombre (pisa si existe). 413 si supera el límite de su tipo."""
+    limite = limite_bytes(up.content_type, up.filename)
+    if up.size is not None and up.size > limite:
+        raise HTTPException(413, f"El archivo supera el máximo de {limite // (1024 * 1024)} MB")
+
+    carpeta.mkdir(parents=True, exist_ok=True)
+    destino = carpeta / nombre
+    tmp = carpeta / f".{uuid4().hex}.part"
+    h = hashlib.sha256()
+    size = 0
+
+    f = await asyncio.to_thread(open, tmp, "wb")
+    try:
+        while chunk := await up.read(CHUNK):
+            size += len(chunk)
+            if size > limite:
+                raise HTTPException(413, f"El archivo supera el máximo de {limite // (1024 * 1024)} MB")
+            await asyncio.to_thread(_escribir, f, h, chunk)
+        await asyncio.to_thread(_cerrar, f, tmp, destino)
+    except BaseException:
+        await asyncio.to_thread(_descartar, f, tmp)
+        raise
+
+    return ArchivoGuardado(
+        nombre=nombre,
+        ruta=destino,
+        size=size,
+        sha256=h.hexdigest(),
+        content_type=up.content_type or "application/octet-stream",
+        original_name=up.filename or nombre,
+    )
@@ -0,0 +1,182 @@
+"""
+Vencimientos de médicos materializados en `medico_vencimiento` (malapraxis / anssal / cobertura).
+
+- Una fila por (medico_id, tipo) con fecha válida; índice (tipo, fecha_vencimiento, medico_id).
+  "Vencido" es fecha < hoy y "por vencer" es hoy..hoy+N: ambos son un rango sobre el índice,
+  así que el paso de los días no obliga a recalcular nada.
+- Incremental: un listener after_flush de la sesión re-sincroniza, dentro de la misma
+  transacción, los médicos nuevos o cuyas fechas VENCIMIENTO_* cambiaron. Las bajas se van
+  por ON DELETE CASCADE.
+- Nocturno: `python -m app.scripts.reconstruir_vencimientos` (o el job "reconstruir_vencimientos")
+  rehace la tabla entera, para lo que se escribe por fuera del ORM (sistema viejo).
+"""
+from __future__ import annotations
+
+import datetime
+from typing import Any, Collection, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, event, func, insert, inspect, literal, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db.models import ListadoMedico, MedicoVencimiento
+
+M, MV = ListadoMedico, MedicoVencimiento
+
+TIPOS = {
+    "malapraxis": M.VENCIMIENTO_MALAPRAXIS,
+    "anssal": M.VENCIMIENTO_ANSSAL,
+    "cobertura": M.VENCIMIENTO_COBERTURA,
+}
+_ATRIBUTOS = tuple(col.key for col in TIPOS.values())
+
+# descarta NULL y las fechas '0000-00-00' de datos legacy
+_FECHA_MINIMA = datetime.date(1900, 1, 1)
+
+
+# ---------------------------
+# Sincronización
+# ---------------------------
+def _origen(ids: Optional[Collection[int]]):
+    partes = []
+    for tipo, col in TIPOS.items():
+        s = select(M.ID, literal(tipo), col).where(col > _FECHA_MINIMA)
+        if ids is not None:
+            s = s.where(M.ID.in_(ids))
+        partes.append(s)
+    return union_all(*partes)
+
+
+def sentencias_sincronizar(ids: Optional[Collection[int]] = None):
+    """(DELETE, INSERT ... SELECT) que dejan la tabla igual a listado_medico; ids=None = todos."""
+    borrar = delete(MV)
+    if ids is not None:
+        borrar = borrar.where(MV.medico_id.in_(ids))
+    insertar = insert(MV).from_select(["medico_id", "tipo", "fecha_vencimiento"], _origen(ids))
+    return borrar, insertar
+
+
+async def sincronizar(db: AsyncSession, ids: Optional[Collection[int]] = None) -> int:
+    """Re-sincroniza (sin commit). Devuelve las filas insertadas."""
+    borrar, insertar = sentencias_sincronizar(ids)
+    await db.execute(borrar)
+    res = await db.execute(insertar)
+    return int(res.rowcount or 0)
+
+
+@event.listens_for(Session, "after_flush")
+def _sincronizar_tocados(session: Session, flush_context: Any) -> None:
+    ids = [
+        obj.ID for obj in (*session.new, *session.dirty)
+        if isinstance(obj, ListadoMedico) and obj.ID is not None
+        and (obj in session.new or any(inspect(obj).attrs[a].history.has_changes() for a in _ATRIBUTOS))
+    ]
+    if not ids:
+        return
+    conn = session.connection()
+    for stmt in sentencias_sincronizar(ids):
+        conn.execute(stmt)
+
+
+# ---------------------------
+# Consultas
+# ---------------------------
+def condicion_rango(
+    estado: Optional[str],
+    hoy: datetime.date,
+    hasta_por_vencer: datetime.date,
+) -> ColumnElement[bool]:
+    f = MV.fecha_vencimiento
+    if estado == "vencido":
+        return f < hoy
+    if estado == "por_vencer":
+        return and_(f >= hoy, f <= hasta_por_vencer)
+    return f <= hasta_por_vencer          # vencidos + por vencer
+
+
+def condicion_vencimientos(
+    marcados: Iterable[Tuple[str, str]],
+    *,
+    hoy: datetime.date,
+    hasta_por_vencer: datetime.date,
+    desde: Optional[Any] = None,
+    hasta: Optional[Any] = None,
+) -> Optional[ColumnElement[bool]]:
+    """
+    Filtro para listado_medico: médicos con alguno de los (tipo, "vencido"|"por_vencer")
+    marcados, opcionalmente acotado a [desde, hasta]. None si no hay nada marcado.
+    """
+    ramas = []
+    for tipo, estado in marcados:
+        cond = and_(MV.tipo == tipo, condicion_rango(estado, hoy, hasta_por_vencer))
+        if desde:
+            cond = and_(cond, MV.fecha_vencimiento >= desde)
+        if hasta:
+            cond = and_(cond, MV.fecha_vencimiento <= hasta)
+        ramas.append(cond)
+    if not ramas:
+        return None
+    return M.ID.in_(select(MV.medico_id).where(or_(*ramas)))
+
+
+async def listar(
+    db: AsyncSession,
+    *,
+    tipo: Optional[str],
+    estado: Optional[str],
+    por_vencer_dias: int,
+    solo_activos: bool,
+    skip: int,
+    limit: int,
+) -> List[Dict[str, Any]]:
+    hoy = datetime.date.today()
+    stmt = (
+        select(
+            MV.medico_id, M.NOMBRE, M.NRO_SOCIO, MV.tipo, MV.fecha_vencimiento,
+        )
+        .join(M, M.ID == MV.medico_id)
+        .where(condicion_rango(estado, hoy, hoy + datetime.timedelta(days=por_vencer_dias)))
+        .order_by(MV.fecha_vencimiento, MV.medico_id, MV.tipo)
+        .offset(skip)
+        .limit(limit)
+    )
+    if tipo:
+        stmt = stmt.where(MV.tipo == tipo)
+    if solo_activos:
+        stmt = stmt.where(M.EXISTE == "S")
+    rows = await db.execute(stmt)
+    return [
+        {
+            "medico_id": medico_id,
+            "nombre": nombre,
+            "nro_socio": nro_socio or None,
+            "tipo": t,
+            "fecha_vencimiento": fecha,
+            "dias_restantes": (fecha - hoy).days,
+            "vencido": fecha < hoy,
+        }
+        for medico_id, nombre, nro_socio, t, fecha in rows
+    ]
+
+
+async def resumen(db: AsyncSession, *, por_vencer_dias: int, solo_activos: bool) -> Dict[str, Dict[str, int]]:
+    """{tipo: {"vencidos": n, "por_vencer": m}} en un solo GROUP BY."""
+    hoy = datetime.date.today()
+    hasta = hoy + datetime.timedelta(days=por_vencer_dias)
+    f = MV.fecha_vencimiento
+    stmt = (
+        select(
+            MV.tipo,
+            func.coalesce(func.sum(case((f < hoy, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((f >= hoy, 1), else_=0)), 0),
+        )
+        .where(f <= hasta)
+        .group_by(MV.tipo)
+    )
+    if solo_activos:
+        stmt = stmt.join(M, M.ID == MV.medico_id).where(M.EXISTE == "S")
+    out = {t: {"vencidos": 0, "por_vencer": 0} for t in TIPOS}
+    for t, vencidos, por_vencer in await db.execute(stmt):
+        out[t] = {"vencidos": int(vencidos), "por_vencer": int(por_vencer)}
+    return out